@@ -0,0 +1,136 @@
+"""
+Runs the crawler against the local mock Handelsregister and reports throughput and step latencies.
+
+    python -m benchmarks.crawl_benchmark --limit 50 --workers 2 --latency 0.2
+    python main.py benchmark crawl --limit 50
+
+Nothing goes to the real portal, the crawl runs in a temporary directory with a cold search cache.
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+from benchmarks.mockportal import MockPortal, MockProxy, Registry, read_companies
+from src.browserprofile import PROFILES
+from src.metrics import format_steps
+
+STEPS = [
+    "search",
+    "results_count",
+    "wait_search_page",
+    "wait_results",
+    "wait_charge_page",
+    "save_results",
+    "save_result_xml",
+    "save_result_pdf",
+    "download_in_tab",
+    "collect_downloads",
+    "back_to_search",
+    "open_search_page",
+    "reset_search",
+    "phase_search",
+    "phase_files",
+    "phase_extract",
+    "phase_write",
+    "company",
+]
+
+
+def write_input(path, companies):
+    fields = ["Firma", "Bundesland", "PLZ", "Ort", "Straße"]
+    with open(path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=fields, delimiter=";", extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(companies)
+
+
+def report(metrics, companies, elapsed, portal):
+    counters = metrics["counters"]
+    resolved = counters.get("resolved", 0)
+    searches = counters.get("search_sent", 0)
+    print(f"\n{companies} Firmen in {elapsed:.1f}s, {companies / elapsed * 3600:.0f} Firmen pro Stunde")
+    print(f"{resolved} gefunden, {searches} Suchen ans Portal", end="")
+    print(f", {searches / resolved:.2f} Suchen pro gefundener Firma" if resolved else "")
+    print(f"Seitenabrufe am Portal: {json.dumps(portal.counts, ensure_ascii=False)}")
+    print(f"{counters.get('page_loads_saved', 0)} Seitenaufrufe durch Tabs gespart")
+    print(f"{counters.get('page_no_hits', 0)} Seiten ohne Treffer, {counters.get('page_error', 0)} Fehlerseiten erkannt")
+    print("\n" + "\n".join(format_steps(metrics, STEPS)))
+    for error in metrics["errors"]:
+        print(f"Fehler {error['step']}: {error['type']} x{error['count']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", default="mitglieder.csv")
+    parser.add_argument("--limit", type=int, default=25, help="Anzahl Firmen aus der Liste")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--missing", type=float, default=0.1)
+    parser.add_argument("--decoys", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--headed", action="store_true", help="Browserfenster anzeigen")
+    parser.add_argument("--no-fast-form", action="store_true")
+    parser.add_argument("--no-tabs", action="store_true")
+    parser.add_argument("--browser-profile", choices=list(PROFILES), default="default")
+    parser.add_argument("--no-event-waits", action="store_true", help="Seiten abfragen wie WebDriverWait")
+    parser.add_argument("--proxies", type=int, default=0, help="Anzahl lokaler Proxys, über die die Browser laufen")
+    args = parser.parse_args(argv)
+
+    # imported before leaving the repository, the crawl itself runs in a scratch directory
+    import main as crawler
+
+    all_companies = read_companies(args.companies)
+    companies = all_companies[: args.limit]
+    registry = Registry(all_companies, missing=args.missing, decoys=args.decoys)
+    portal = MockPortal(
+        ("127.0.0.1", 0),
+        registry,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    portal.start()
+    proxies = [MockProxy() for _ in range(args.proxies)]
+    for proxy in proxies:
+        proxy.start()
+
+    workdir = tempfile.mkdtemp(prefix="crawl-benchmark-")
+    write_input(os.path.join(workdir, "shortlist.csv"), companies)
+    os.chdir(workdir)
+    start = time.time()
+    try:
+        crawler.crawl(
+            input_file="shortlist.csv",
+            link=portal.link,
+            workers=args.workers,
+            rate_limit=10**9,
+            fast_form=not args.no_fast_form,
+            tabs=not args.no_tabs,
+            event_waits=not args.no_event_waits,
+            browser_profile=args.browser_profile,
+            metrics_interval=3600,
+            chrome_args=() if args.headed else ("--headless=new",),
+            egress="proxies" if proxies else "none",
+            proxies=[proxy.url for proxy in proxies],
+        )
+    finally:
+        elapsed = time.time() - start
+        portal.shutdown()
+        for proxy in proxies:
+            proxy.shutdown()
+
+    with open(crawler.METRICS_JSON, mode="r", encoding="utf-8") as file:
+        metrics = json.load(file)
+    report(metrics, len(companies), elapsed, portal)
+    for proxy in proxies:
+        print(f"Proxy {proxy.url}: {proxy.requests} Verbindungen")
+    print(f"\nErgebnisse unter {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures how long importing main takes and makes sure it doesn't pull in selenium.
+Only a crawl needs a browser, extract and report have to start without one.
+
+    python -m benchmarks.import_benchmark --repeat 10 --budget 0.5
+    python main.py benchmark import --importtime
+
+Exits with an error when selenium gets imported or the fastest import takes longer than the budget.
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+# imports main and parses a command that doesn't crawl, then lists the heavy modules that got loaded
+PROBE = """
+import sys
+import main
+main.main(["report", "--results", sys.argv[1]])
+print("LOADED", ",".join(name for name in ("selenium", "dotenv") if name in sys.modules))
+"""
+
+
+def import_seconds(repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], check=True)
+        timings.append(time.perf_counter() - start)
+    # the interpreter start alone, so only the import of main is left
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return min(timings), time.perf_counter() - start
+
+
+def loaded_modules():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, "nonexistent-results"], check=True, capture_output=True, text=True
+    ).stdout
+    line = [line for line in output.splitlines() if line.startswith("LOADED")][-1]
+    return [name for name in line[len("LOADED") :].strip().split(",") if name]
+
+
+def slowest_imports(count):
+    # -X importtime writes one line per module to stderr: self and cumulative microseconds
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None, help="Sekunden, die der Import höchstens dauern darf")
+    parser.add_argument("--importtime", action="store_true", help="die langsamsten Module laut -X importtime zeigen")
+    args = parser.parse_args(argv)
+
+    seconds, interpreter = import_seconds(args.repeat)
+    print(f"import main: {seconds * 1000:.0f} ms, davon {interpreter * 1000:.0f} ms Interpreterstart")
+    if args.importtime:
+        for cumulative, module in slowest_imports(15):
+            print(f"{cumulative / 1000:10.1f} ms {module}")
+
+    failures = []
+    loaded = loaded_modules()
+    if loaded:
+        failures.append(f"ohne Crawl geladen: {', '.join(loaded)}")
+    if args.budget is not None and seconds - interpreter > args.budget:
+        failures.append(f"Import dauert {seconds - interpreter:.2f}s, erlaubt sind {args.budget:.2f}s")
+    if failures:
+        raise SystemExit("; ".join(failures))
+    print("selenium wird erst beim Crawl geladen")
+
+
+if __name__ == "__main__":
+    main()
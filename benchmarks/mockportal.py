@@ -0,0 +1,516 @@
+"""
+Local stand-in for the Handelsregister search, serving pages with the element ids MyConnector relies on.
+
+    python -m benchmarks.mockportal --companies mitglieder.csv --port 8765 --latency 0.2
+
+The search form stores the query in a cookie and opens ergebnisse.xhtml by GET, the result links do the same
+for chargeinfo.xhtml, so browser back navigation works without form resubmission prompts.
+"""
+import argparse
+import csv
+import html
+import json
+import random
+import re
+import select
+import socket
+import socketserver
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+from benchmarks.samples import xjustiz_document
+
+BUNDESLAENDER = [
+    "Baden-Württemberg",
+    "Bayern",
+    "Berlin",
+    "Brandenburg",
+    "Bremen",
+    "Hamburg",
+    "Hessen",
+    "Mecklenburg-Vorpommern",
+    "Niedersachsen",
+    "Nordrhein-Westfalen",
+    "Rheinland-Pfalz",
+    "Saarland",
+    "Sachsen",
+    "Sachsen-Anhalt",
+    "Schleswig-Holstein",
+    "Thüringen",
+]
+DECOY_WORDS = ["Verein", "Sport", "Gesundheit", "Service", "Holding", "Beratung", "Reha", "Zentrum", "Berlin"]
+NO_HITS = "Keine Daten gefunden."
+THROTTLED = "Sie haben die maximal zulässige Anzahl an Abrufen überschritten."
+PDF = b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n2 0 obj<</Type/Pages/Count 0/Kids[]>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n"
+
+# what a real portal page pulls in besides its html: stylesheet with a webfont, a logo and a tracking pixel
+# from another host, the crawler needs none of it
+ASSETS = """<link rel="stylesheet" href="assets/portal.css">
+<img src="assets/logo.png" alt="Logo" width="120" height="40">
+<img src="{third_party}/assets/pixel.png" alt="" width="1" height="1">"""
+PORTAL_CSS = """@font-face {{ font-family: "Portal"; src: url("{font}") format("woff2"); }}
+body {{ font-family: "Portal", sans-serif; }}
+"""
+PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89"
+    b"\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+ASSET_SIZE = 64 * 1024
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Erweiterte Suche</title>
+<style>.ui-chkbox, .ui-chkbox-box, .radio {{ display: inline-block; min-width: 12px; min-height: 12px; }}</style>
+</head><body>
+{assets}
+<form id="form" onsubmit="return false;">
+  <input type="text" id="form:schlagwoerter" name="schlagwoerter">
+  <div id="form:schlagwortOptionen">
+    <div class="ui-g"><div class="ui-g-12"><div class="radio" data-mode="all">alle</div></div></div>
+    <div class="ui-g"><div class="ui-g-12"><div class="radio" data-mode="min">mindestens eines</div></div></div>
+    <div class="ui-g"><div class="ui-g-12"><div class="radio" data-mode="exact">exakt</div></div></div>
+  </div>
+  {similar}
+  <div id="states">{states}</div>
+  <input type="text" id="form:postleitzahl">
+  <input type="text" id="form:ort">
+  <input type="text" id="form:strasse">
+  <input type="text" id="form:registerNummer">
+  <button type="button" id="form:btnSuche">Suchen</button>
+</form>
+<script>
+var mode = "all";
+Array.prototype.forEach.call(document.querySelectorAll(".radio"), function (radio) {{
+  radio.addEventListener("click", function () {{ mode = radio.getAttribute("data-mode"); }});
+}});
+Array.prototype.forEach.call(document.querySelectorAll(".ui-chkbox"), function (box) {{
+  box.addEventListener("click", function () {{
+    var input = document.getElementById(box.id + "_input");
+    var checked = input.getAttribute("aria-checked") !== "true";
+    input.setAttribute("aria-checked", checked ? "true" : "false");
+    input.checked = checked;
+  }});
+}});
+function value(id) {{ return document.getElementById(id).value; }}
+document.getElementById("form:btnSuche").addEventListener("click", function () {{
+  var states = [];
+  Array.prototype.forEach.call(document.querySelectorAll("#states input"), function (input) {{
+    if (input.getAttribute("aria-checked") === "true") {{ states.push(input.getAttribute("data-state")); }}
+  }});
+  var query = {{
+    keyword: value("form:schlagwoerter"), mode: mode, states: states,
+    similar: document.getElementById("form:aenlichLautendeSchlagwoerterBoolChkbox_input").checked,
+    zip: value("form:postleitzahl"), city: value("form:ort"), street: value("form:strasse"),
+    register: value("form:registerNummer")
+  }};
+  document.cookie = "query=" + encodeURIComponent(JSON.stringify(query)) + "; path=/";
+  window.location.href = "ergebnisse.xhtml";
+}});
+</script>
+</body></html>
+"""
+
+CHECKBOX = """<div id="form:{name}" class="ui-chkbox"><input type="checkbox" id="form:{name}_input" data-state="{state}"
+aria-checked="false" style="display:none"><div class="ui-chkbox-box"></div> {label}</div>"""
+
+RESULT_TABLE = """<table class="result">
+  <tr><td>{state}</td><td>Amtsgericht {court} {register}</td></tr>
+  <tr><td>{name}</td><td>{city}</td><td>aktuell</td><td>
+    <a href="chargeinfo.xhtml" onclick="document.cookie='doc={row}:pdf; path=/'">AD</a>
+    <a href="chargeinfo.xhtml" onclick="document.cookie='doc={row}:xml; path=/'">SI</a>
+  </td></tr>
+</table>"""
+
+RESULTS_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Suchergebnisse</title></head><body>
+{assets}
+<table id="ergebnisseForm:layout"><tr><td>Suchergebnisse: {count}</td></tr></table>
+{message}
+{tables}
+</body></html>
+"""
+
+CHARGE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Kostenpflichtiger Abruf</title></head><body>
+{assets}
+<p>{name}: {kind}</p>
+<button type="button" id="form:kostenpflichtigabrufen"
+  onclick="window.location.href='download/{row}/{kind}'">Kostenpflichtig abrufen</button>
+</body></html>
+"""
+
+MESSAGE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Hinweis</title></head><body><p>{message}</p></body></html>
+"""
+
+
+def tokens(text):
+    return [token for token in re.split(r"[^\w]+", str(text).lower()) if token]
+
+
+class Registry:
+    """
+    Companies the stand-in knows, built from an input list.
+
+    :param companies: list of dicts with Firma, Bundesland, PLZ, Ort, Straße
+    :param missing: float, share of the companies that are not registered at all
+    :param decoys: int, additional registered companies sharing common words, they cause multi-hit pages
+    """
+
+    def __init__(self, companies, missing=0.1, decoys=200, seed=0) -> None:
+        rng = random.Random(seed)
+        self.entries = []
+        for company in companies:
+            if rng.random() < missing:
+                continue
+            self.add(company, rng)
+        for number in range(decoys):
+            real = rng.choice(companies) if companies else {}
+            name = " ".join(rng.sample(DECOY_WORDS, 2) + [rng.choice(tokens(real.get("Firma", "x")) or ["x"])])
+            self.add(
+                {
+                    "Firma": f"{name} {number} GmbH",
+                    "Bundesland": real.get("Bundesland", rng.choice(BUNDESLAENDER)),
+                    "PLZ": real.get("PLZ", ""),
+                    "Ort": real.get("Ort", ""),
+                    "Straße": "",
+                },
+                rng,
+            )
+
+    def add(self, company, rng):
+        self.entries.append(
+            {
+                "name": company["Firma"],
+                "tokens": set(tokens(company["Firma"])),
+                "state": company.get("Bundesland", ""),
+                "zip": str(company.get("PLZ", "")),
+                "city": company.get("Ort", ""),
+                "street": company.get("Straße", ""),
+                "register": f"{rng.choice(['HRB', 'VR', 'HRA'])} {rng.randint(1000, 99999)}",
+                "court": company.get("Ort", "") or "Berlin",
+                "persons": rng.randint(1, 6),
+            }
+        )
+
+    def matches(self, entry, query):
+        words = tokens(query.get("keyword", ""))
+        if not words:
+            return False
+        names = entry["tokens"]
+        if query.get("similar"):
+            # prefixes stand in for the portal's phonetic search
+            names = names | {name[:5] for name in names}
+            words = [word[:5] if len(word) > 5 else word for word in words]
+        mode = query.get("mode", "all")
+        if mode == "exact":
+            if str(query.get("keyword", "")).strip().lower() != entry["name"].lower():
+                return False
+        elif mode == "min":
+            if not any(word in names for word in words):
+                return False
+        elif not all(word in names for word in words):
+            return False
+        if query.get("states") and entry["state"] not in query["states"]:
+            return False
+        for field in ("zip", "city", "street"):
+            if query.get(field) and str(query[field]).strip().lower() != str(entry[field]).strip().lower():
+                return False
+        return True
+
+    def search(self, query):
+        return [index for index, entry in enumerate(self.entries) if self.matches(entry, query)]
+
+
+class MockPortal(ThreadingHTTPServer):
+    """
+    :param registry: Registry
+    :param latency: float, seconds every response is delayed
+    :param jitter: float, random extra delay up to this many seconds
+    :param error_rate: float, share of result pages answered with a server error
+    :param throttle_rate: float, share of result pages answered with the throttling notice
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, registry, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, seed=0):
+        super().__init__(address, MockHandler)
+        self.registry = registry
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    @property
+    def link(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/rp_web/erweitertesuche.xhtml"
+
+    @property
+    def assets(self):
+        # the same server under another host name stands in for a third-party server
+        return ASSETS.format(third_party=f"http://localhost:{self.server_address[1]}")
+
+    def chance(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self):
+        with self.lock:
+            wait = self.latency + self.random.random() * self.jitter
+        if wait:
+            time.sleep(wait)
+
+    def count(self, page):
+        with self.lock:
+            self.counts[page] = self.counts.get(page, 0) + 1
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="mockportal", daemon=True)
+        thread.start()
+        return thread
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockHandelsregister/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def cookie(self, name):
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        return unquote(cookies[name].value) if name in cookies else None
+
+    def send(self, body, status=200, content_type="text/html; charset=utf-8", headers=None):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        portal = self.server
+        portal.delay()
+        path = self.path.split("?", 1)[0]
+        page = path.rsplit("/", 1)[-1]
+        if "/assets/" in path:
+            third_party = self.headers.get("Host", "").startswith("localhost")
+            portal.count("third_party" if third_party else "asset")
+            self.asset(page)
+            return
+        portal.count(page if "/download/" not in path else "download")
+        if path.endswith("/erweitertesuche.xhtml"):
+            self.send(self.search_page())
+        elif path.endswith("/ergebnisse.xhtml"):
+            if portal.chance(portal.throttle_rate):
+                self.send(MESSAGE_PAGE.format(message=THROTTLED))
+            elif portal.chance(portal.error_rate):
+                self.send(MESSAGE_PAGE.format(message="Interner Fehler"), status=500)
+            else:
+                self.send(self.results_page())
+        elif path.endswith("/chargeinfo.xhtml"):
+            self.send(self.charge_page())
+        elif "/download/" in path:
+            self.download(path)
+        else:
+            self.send(MESSAGE_PAGE.format(message="Nicht gefunden"), status=404)
+
+    def search_page(self):
+        states = "\n".join(
+            CHECKBOX.format(name=html.escape(state), state=html.escape(state), label=html.escape(state))
+            for state in BUNDESLAENDER
+        )
+        similar = CHECKBOX.format(name="aenlichLautendeSchlagwoerterBoolChkbox", state="", label="ähnlich lautende")
+        return SEARCH_PAGE.format(states=states, similar=similar, assets=self.server.assets)
+
+    def query(self):
+        try:
+            return json.loads(self.cookie("query") or "{}")
+        except json.JSONDecodeError:
+            return {}
+
+    def results_page(self):
+        registry = self.server.registry
+        rows = registry.search(self.query())
+        tables = []
+        for row in rows:
+            entry = registry.entries[row]
+            tables.append(
+                RESULT_TABLE.format(
+                    state=html.escape(entry["state"]),
+                    court=html.escape(entry["court"]),
+                    register=html.escape(entry["register"]),
+                    name=html.escape(entry["name"]),
+                    city=html.escape(entry["city"]),
+                    row=row,
+                )
+            )
+        message = f"<p>{NO_HITS}</p>" if not rows else ""
+        return RESULTS_PAGE.format(
+            count=len(rows), message=message, tables="\n".join(tables), assets=self.server.assets
+        )
+
+    def charge_page(self):
+        row, kind = (self.cookie("doc") or "0:xml").split(":")
+        entry = self.server.registry.entries[int(row)]
+        return CHARGE_PAGE.format(
+            name=html.escape(entry["name"]), kind=kind, row=int(row), assets=self.server.assets
+        )
+
+    def asset(self, name):
+        if name.endswith(".css"):
+            self.send(PORTAL_CSS.format(font="portal.woff2"), content_type="text/css")
+        elif name.endswith(".png"):
+            # padded to the size of a real logo, chrome ignores what follows IEND
+            self.send(PNG + bytes(ASSET_SIZE if name == "logo.png" else 0), content_type="image/png")
+        elif name.endswith(".woff2"):
+            self.send(bytes(ASSET_SIZE), content_type="font/woff2")
+        else:
+            self.send(MESSAGE_PAGE.format(message="Nicht gefunden"), status=404)
+
+    def download(self, path):
+        _, row, kind = path.rsplit("/", 2)
+        entry = self.server.registry.entries[int(row)]
+        filename = quote(entry["register"].replace(" ", "_"))
+        if kind == "xml":
+            body = xjustiz_document(entry["name"], entry["register"], entry["city"], entry["persons"], seed=int(row))
+            content_type = "application/xml"
+        else:
+            body = PDF
+            content_type = "application/pdf"
+        self.send(
+            body,
+            content_type=content_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}.{kind}"'},
+        )
+
+
+class MockProxy(socketserver.ThreadingTCPServer):
+    """
+    Minimal HTTP proxy standing in for an egress: tunnels CONNECT and forwards absolute-URL requests.
+    Setting down makes it drop every connection, like a proxy that went away.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, MockProxyHandler)
+        self.down = False
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="mockproxy", daemon=True)
+        thread.start()
+        return thread
+
+
+class MockProxyHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if self.server.down:
+            return
+        request_line = self.rfile.readline().decode("latin-1")
+        headers = []
+        while True:
+            line = self.rfile.readline().decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            headers.append(line)
+        try:
+            method, target, version = request_line.split()
+        except ValueError:
+            return
+        with self.server.lock:
+            self.server.requests += 1
+
+        if method == "CONNECT":
+            host, _, port = target.rpartition(":")
+            upstream = socket.create_connection((host, int(port)))
+            self.wfile.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            self.wfile.flush()
+            self.relay(upstream)
+            return
+
+        parts = urlsplit(target)
+        upstream = socket.create_connection((parts.hostname, parts.port or 80))
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        kept = [line for line in headers if not line.lower().startswith(("connection:", "proxy-connection:"))]
+        head = f"{method} {path} {version}\r\n" + "".join(kept) + "Connection: close\r\n\r\n"
+        upstream.sendall(head.encode("latin-1"))
+        length = next((int(line.split(":", 1)[1]) for line in kept if line.lower().startswith("content-length:")), 0)
+        if length:
+            upstream.sendall(self.rfile.read(length))
+        self.relay(upstream)
+
+    def relay(self, upstream):
+        client = self.connection
+        sockets = [client, upstream]
+        try:
+            while True:
+                readable, _, _ = select.select(sockets, [], [], 30)
+                if not readable:
+                    return
+                for sock in readable:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    (upstream if sock is client else client).sendall(data)
+        except OSError:
+            # one side hung up, the other one gets closed as well
+            return
+        finally:
+            upstream.close()
+
+
+def read_companies(path, limit=None):
+    """Reads a company list, comma or semicolon separated like mitglieder.csv and shortlist.csv."""
+    with open(path, mode="r", newline="", encoding="utf-8") as file:
+        sample = file.read(2048)
+        file.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        companies = list(csv.DictReader(file, delimiter=delimiter))
+    return companies[:limit] if limit else companies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", default="mitglieder.csv")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--missing", type=float, default=0.1)
+    parser.add_argument("--decoys", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    registry = Registry(read_companies(args.companies), missing=args.missing, decoys=args.decoys)
+    portal = MockPortal(
+        ("127.0.0.1", args.port),
+        registry,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    print(f"Mock-Handelsregister unter {portal.link}, {len(registry.entries)} Firmen")
+    try:
+        portal.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
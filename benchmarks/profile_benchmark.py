@@ -0,0 +1,134 @@
+"""
+Compares the browser profiles: memory per Chrome instance and page load time against the local mock portal.
+
+    python -m benchmarks.profile_benchmark --instances 3 --loads 10 --latency 0.05
+    python main.py benchmark profile --profiles default,lean
+
+Memory is the proportional set size (PSS) of chromedriver, Chrome and all their child processes, read from /proc,
+so shared pages are split between the instances instead of being counted for each of them. Linux only.
+"""
+import argparse
+import os
+import statistics
+import time
+from benchmarks.mockportal import MockPortal, Registry, read_companies
+from src.browserprofile import PROFILES
+
+
+def children(pid):
+    found = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", mode="r", encoding="ascii") as file:
+                found += [int(child) for child in file.read().split()]
+        except OSError:
+            continue
+    return found
+
+
+def process_tree(pid):
+    tree = [pid]
+    for child in children(pid):
+        tree += process_tree(child)
+    return tree
+
+
+def pss_kib(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", mode="r", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def memory_mib(driver):
+    """:return: float or None, PSS of the browser in MiB, None where /proc isn't available"""
+    if not os.path.isdir("/proc"):
+        return None
+    try:
+        tree = process_tree(driver.service.process.pid)
+    except OSError:
+        return None
+    return sum(pss_kib(pid) for pid in tree) / 1024
+
+
+def measure(profile, link, instances, loads, headed):
+    """
+    :return: (list of float, list of float), MiB per instance and seconds per page load
+    """
+    # imported here, so --help works without selenium
+    from src.connector import launch_browser
+
+    results_link = link.rsplit("/", 1)[0] + "/ergebnisse.xhtml"
+    args = profile.chrome_args(link)
+    if not headed and not profile.headless:
+        args.append("--headless=new")
+    drivers = []
+    timings = []
+    try:
+        for _ in range(instances):
+            drivers.append(launch_browser(args, link, profile=profile))
+        for _ in range(loads):
+            for driver in drivers:
+                for page in (link, results_link):
+                    start = time.perf_counter()
+                    driver.get(page)
+                    timings.append(time.perf_counter() - start)
+        # let every instance settle before reading its memory
+        time.sleep(1)
+        memory = [memory_mib(driver) for driver in drivers]
+    finally:
+        for driver in drivers:
+            driver.quit()
+    return memory, timings
+
+
+def quantile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="Profile, durch Komma getrennt")
+    parser.add_argument("--companies", default="mitglieder.csv")
+    parser.add_argument("--instances", type=int, default=2, help="gleichzeitig laufende Browser je Profil")
+    parser.add_argument("--loads", type=int, default=5, help="Aufrufe von Such- und Ergebnisseite je Browser")
+    parser.add_argument("--latency", type=float, default=0.05, help="Verzögerung jeder Antwort des Mock-Portals")
+    parser.add_argument("--headed", action="store_true", help="Profile ohne headless mit Fenster starten")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.profiles.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROFILES]
+    if unknown:
+        raise SystemExit(f"Unbekannte Profile: {', '.join(unknown)}, vorhanden sind {', '.join(PROFILES)}")
+
+    registry = Registry(read_companies(args.companies, limit=50), decoys=20)
+    portal = MockPortal(("127.0.0.1", 0), registry, latency=args.latency)
+    portal.start()
+    rows = []
+    try:
+        for name in names:
+            before = dict(portal.counts)
+            memory, timings = measure(PROFILES[name], portal.link, args.instances, args.loads, args.headed)
+            pages = len(timings) + args.instances
+            requests = {key: portal.counts.get(key, 0) - before.get(key, 0) for key in ("asset", "third_party")}
+            rows.append((name, memory, timings, requests, pages))
+    finally:
+        portal.shutdown()
+
+    print(f"\n{'Profil':<10}{'MiB/Browser':>12}{'Laden p50 ms':>14}{'p95 ms':>10}{'Dateien/Seite':>15}{'fremd':>8}")
+    for name, memory, timings, requests, pages in rows:
+        known = [value for value in memory if value is not None]
+        mib = f"{statistics.mean(known):.0f}" if known else "n/a"
+        print(
+            f"{name:<10}{mib:>12}{quantile(timings, 0.5) * 1000:>14.0f}{quantile(timings, 0.95) * 1000:>10.0f}"
+            f"{requests['asset'] / pages:>15.1f}{requests['third_party']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
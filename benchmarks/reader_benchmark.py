@@ -0,0 +1,58 @@
+"""
+Compares the three DataXML passes main() used to make with the single iterparse pass of StreamingDataXML.
+
+    python -m benchmarks.reader_benchmark --persons 2000 --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from benchmarks.samples import xjustiz_document
+from src.reader import DataXML, StreamingDataXML
+
+
+def three_passes(path):
+    data = DataXML(xmlpath=path)
+    return data.extract_person_info(), data.extract_organization_info(), data.extract_vertretung()
+
+
+def single_pass(path):
+    return StreamingDataXML(path).extract_all()
+
+
+def measure(function, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(path)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persons", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sample.xml")
+        with open(path, mode="w", encoding="utf-8") as file:
+            file.write(xjustiz_document(persons=args.persons))
+
+        if three_passes(path) != single_pass(path):
+            raise SystemExit("StreamingDataXML liefert andere Ergebnisse als DataXML")
+
+        print(f"{args.persons} Beteiligte, {os.path.getsize(path) / 1024:.0f} KiB")
+        for name, function in (("DataXML, drei Durchläufe", three_passes), ("StreamingDataXML", single_pass)):
+            seconds, peak = measure(function, path, args.repeat)
+            print(f"{name:<26} {seconds * 1000:8.1f} ms  {peak / 1024:8.0f} KiB Spitze")
+
+
+if __name__ == "__main__":
+    main()
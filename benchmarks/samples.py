@@ -0,0 +1,93 @@
+import random
+
+PERSON = """
+      <tns:beteiligung>
+        <tns:rolle>
+          <tns:rollenbezeichnung><code>{code}</code></tns:rollenbezeichnung>
+          <tns:rollennummer>{number}</tns:rollennummer>
+        </tns:rolle>
+        <tns:beteiligter>
+          <tns:auswahl_beteiligter>
+            <tns:natuerlichePerson>
+              <tns:vollerName>
+                <tns:vorname>{vorname}</tns:vorname>
+                <tns:nachname>{nachname}</tns:nachname>
+              </tns:vollerName>
+            </tns:natuerlichePerson>
+          </tns:auswahl_beteiligter>
+        </tns:beteiligter>
+      </tns:beteiligung>"""
+
+ORGANIZATION = """
+      <tns:beteiligung>
+        <tns:rolle>
+          <tns:rollenbezeichnung><code>{code}</code></tns:rollenbezeichnung>
+          <tns:rollennummer>{number}</tns:rollennummer>
+        </tns:rolle>
+        <tns:beteiligter>
+          <tns:auswahl_beteiligter>
+            <tns:organisation>
+              <tns:bezeichnung><tns:bezeichnung.aktuell>{name}</tns:bezeichnung.aktuell></tns:bezeichnung>
+              <tns:angabenZurRechtsform><tns:rechtsform><code>{form}</code></tns:rechtsform></tns:angabenZurRechtsform>
+              <tns:sitz><tns:ort>{city}</tns:ort></tns:sitz>
+              <tns:registereintragung><tns:registernummer>{register}</tns:registernummer></tns:registereintragung>
+            </tns:organisation>
+          </tns:auswahl_beteiligter>
+        </tns:beteiligter>
+      </tns:beteiligung>"""
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<tns:nachricht.reg.0400003 xmlns:tns="http://www.xjustiz.de">
+  <tns:nachrichtenkopf>
+    <tns:erstellungszeitpunkt>2024-01-01T00:00:00</tns:erstellungszeitpunkt>
+  </tns:nachrichtenkopf>
+  <tns:grunddaten>
+    <tns:verfahrensdaten>{beteiligungen}
+    </tns:verfahrensdaten>
+  </tns:grunddaten>
+  <tns:fachdatenRegister>
+    <tns:basisdatenRegister>
+      <tns:vertretung>
+        <tns:allgemeineVertretungsregelung>
+          <tns:auswahl_vertretungsbefugnis>
+            <tns:vertretungsbefugnisFreitext>{freitext}</tns:vertretungsbefugnisFreitext>
+          </tns:auswahl_vertretungsbefugnis>
+        </tns:allgemeineVertretungsregelung>
+        <tns:besondereVertretungsregelung>
+          <tns:code>{vertretung_code}</tns:code>
+          <tns:text>Einzelvertretung</tns:text>
+        </tns:besondereVertretungsregelung>
+      </tns:vertretung>
+    </tns:basisdatenRegister>
+  </tns:fachdatenRegister>
+</tns:nachricht.reg.0400003>
+"""
+
+FIRST_NAMES = ["Anna", "Bernd", "Clara", "Dieter", "Eva", "Frank", "Greta", "Hans"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker"]
+
+
+def xjustiz_document(name="Beispiel GmbH", register="HRB 12345", city="Berlin", persons=5, seed=0):
+    """
+    Builds a small XJustiz register extract with the elements DataXML reads.
+
+    :param persons: int, number of natural persons taking part besides the company itself
+    """
+    rng = random.Random(seed)
+    beteiligungen = [
+        ORGANIZATION.format(code="287", number=1, name=name, form="GmbH", city=city, register=register)
+    ]
+    for number in range(persons):
+        beteiligungen.append(
+            PERSON.format(
+                code=rng.choice(["086", "085", "288"]),
+                number=number + 2,
+                vorname=rng.choice(FIRST_NAMES),
+                nachname=rng.choice(LAST_NAMES),
+            )
+        )
+    return DOCUMENT.format(
+        beteiligungen="".join(beteiligungen),
+        freitext="Jeder Geschäftsführer vertritt einzeln.",
+        vertretung_code="EV",
+    )
@@ -1,462 +1,809 @@
+from collections import deque
 from datetime import datetime
+import argparse
+import importlib
+import json
 import os, shutil
+import sys
+import tempfile
+import threading
+import time
 from src.utility import (
     recreate_directory,
     write_to_terminal,
-    clean_list,
-    read_csv,
     append_to_csv,
-    initialize_csv,
-    move_and_rename_files,
-    countdown,
+    move_and_rename,
+    result_filename,
 )
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from src.reader import DataXML
-from dotenv import load_dotenv
-
-load_dotenv()
+from src.pool import WorkerPool
+from src.journal import Journal, CompanyState, SEARCHED, HIT, DOWNLOADED, WRITTEN
+from src.cache import SearchCache, is_known_hit, is_known_miss
+from src.scheduler import SearchScheduler
+from src.ratelimit import RateLimiter, Throttled, PortalError
+from src.sink import open_sink, BACKENDS
+from src.downloads import collect as collect_downloads, release as release_downloads
+from src.metrics import METRICS, format_steps
+from src.results import best_match
+from src.registry import RegisterIndex
+from src.keywords import KeywordEngine
+from src.companies import StateBatches
+from src.pipeline import Pipeline, Stage
+from src.supervisor import Supervisor, BrowserDied, check_alive
+from src.browserprofile import PROFILES
+from src.egress import DirectEgress, FritzboxEgress, ProxyEgress, read_proxies
+from src.store import RegisterStore
+from src.session import SessionRecorder, SessionArchive, ReplayConnector, RecordedOrder
+from src.extract import RESULT_HEADERS, result_lines, error_line, extract
+from src.reader import StreamingDataXML
 
+INPUT_CSV = "shortlist.csv"
 DOWNLOAD_DIR = "downloads"
 RESULTS_DIR = "results"
 BACKUP_DIR = "storage"
 PDF_DIR = os.path.join(RESULTS_DIR, "PDF")
 XML_DIR = os.path.join(RESULTS_DIR, "XML")
 RESULT_CSV = os.path.join(RESULTS_DIR, "results.csv")
+# next to results.csv, which belongs to the last crawl and is only moved away by the next one
+EXPORT_CSV = os.path.join(RESULTS_DIR, "export.csv")
+JOURNAL = os.path.join(RESULTS_DIR, "journal.jsonl")
+METRICS_JSON = os.path.join(RESULTS_DIR, "metrics.json")
+METRICS_PROM = os.path.join(RESULTS_DIR, "metrics.prom")
+CACHE_DIR = "cache"
+SEARCH_CACHE = os.path.join(CACHE_DIR, "searches.json")
+SEARCH_STATS = os.path.join(CACHE_DIR, "searchstats.json")
+REGISTER_INDEX = os.path.join(CACHE_DIR, "register_index.json")
+# outside of RESULTS_DIR, so it isn't moved to BACKUP_DIR with every run
+STORE = "register.sqlite"
 TIME_MIN = 45
-TIMTE_BREAK = 5
+DOWNLOAD_TIMEOUT = 60
+RATE_LIMIT = 60  # Anfragen pro Stunde und IP
+MATCH_THRESHOLD = 0.8  # Mindestwert, ab dem ein Treffer einer Mehrfachliste geladen wird
+MAX_THROTTLED = 3  # Drosselungen pro Firma, bevor aufgegeben wird
+MAX_PORTAL_ERRORS = 2  # Fehlerseiten pro Firma, bevor aufgegeben wird
 LINK = "https://www.handelsregister.de/rp_web/erweitertesuche.xhtml"
 ROUTER = "http://fritz.box/"  # momenta nur Fritzbox, sorry.
-ROUTER_KEY = os.getenv("FRITZ")
+EGRESS_KINDS = ["none", "fritzbox", "proxies"]
+COMMANDS = ["crawl", "replay", "extract", "export", "report", "benchmark"]
+BENCHMARKS = ["crawl", "reader", "import", "profile"]
 
 
-class MyConnector:
-    chrome_options = webdriver.ChromeOptions()
-    download_dir = os.path.join(os.getcwd(), DOWNLOAD_DIR)
-    prefs = {"download.default_directory": download_dir}
-    chrome_options.add_experimental_option("prefs", prefs)
-    driver = webdriver.Chrome(options=chrome_options)
+SEARCHMODES = [
+    {"msg": "Suche nach Keywords: ", "mode": "all", "similar": False, "address": True},
+    {"msg": "Suche nach Keywords: ", "mode": "all", "similar": False, "address": False},
+    {"msg": "Suche nach Keywords und ähnlichen: ", "mode": "all", "similar": True, "address": True},
+    {"msg": "Suche nach Keywords und ähnlichen: ", "mode": "all", "similar": True, "address": False},
+    {"msg": "Suche nach allen Keywrods: ", "mode": "min", "similar": False, "address": True},
+    {"msg": "Suche nach allen Keywrods: ", "mode": "min", "similar": False, "address": False},
+    {"msg": "Suche nach allen Keywords und ähnlichen: ", "mode": "min", "similar": True, "address": False},
+    {"msg": "Suche nach allen Keywords und ähnlichen: ", "mode": "min", "similar": True, "address": True},
+    {"msg": "Suche genau nach Keyword: ", "mode": "exact", "similar": False, "address": True},
+    {"msg": "Suche genau nach Keyword: ", "mode": "exact", "similar": False, "address": False},
+    {
+        "msg": "Suche genau nach Keyword und ähnlichen: ",
+        "mode": "exact",
+        "similar": True,
+        "address": True,
+    },
+    {
+        "msg": "Suche genau nach Keyword und ähnlichen: ",
+        "mode": "exact",
+        "similar": True,
+        "address": False,
+    },
+]
 
-    def __init__(self, link) -> None:
-        self.driver.get(link)
+# the workers share the result file
+csv_lock = threading.Lock()
 
-    def init_wait(self):
-        self.wait = WebDriverWait(self.driver, 50)
 
-    # #.until(EC.url_to_be(destination))
-    # until(EC.element_to_be_clickable((By.ID, 'form:btnSuche')))
+def write_error(run, company, msg, written=True):
+    """
+    Writes the error row of a company and notes the error in the register store.
 
-    def search(
-        self,
-        search_key: str,
-        searchfieldID="form:schlagwoerter",
-        mode="all",
-        similar=False,
-        submitID="form:btnSuche",
-        state=None,
-        zip_code=None,
-        zip_ID="form:postleitzahl",
-        city=None,
-        city_ID="form:ort",
-        street=None,
-        street_ID="form:strasse",
-        register=None,
-        register_ID="form:registerNummer",
-    ):
-        self.wait.until(EC.url_to_be(LINK))
-        searchfield = self.driver.find_element(By.ID, searchfieldID)
-        searchfield.clear()
-        searchfield.send_keys(search_key)
-
-        if state:
-            state_input_id = f"form:{state}_input"
-            state_input = self.driver.find_element(By.ID, state_input_id)
-            if state_input.get_attribute("aria-checked") == "false":
-                state_id = f"form:{state}"
-                state_checkbox = self.driver.find_element(By.ID, state_id)
-                self.wait.until(EC.element_to_be_clickable(state_checkbox))
-                state_checkbox.click()
-
-        zip_input = self.driver.find_element(By.ID, zip_ID)
-        zip_input.clear()
-        if zip_code:
-            zip_input.send_keys(zip_code)
-
-        city_input = self.driver.find_element(By.ID, city_ID)
-        city_input.clear()
-        if city:
-            city_input.send_keys(city)
-
-        street_input = self.driver.find_element(By.ID, street_ID)
-        street_input.clear()
-        if street:
-            street_input.send_keys(street)
-
-        register_input = self.driver.find_element(By.ID, register_ID)
-        register_input.clear()
-        if register:
-            register_input.send_keys(register)
-
-        self.select_search_options(mode, similar)
-
-        submit_button = self.driver.find_element(By.ID, submitID)
-        self.driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-        self.wait.until(EC.element_to_be_clickable(submit_button))
-
-        submit_button.click()
-
-    def reset_search(
+    :param written: bool, mark the company as written in the journal once the row is on disk
+    """
+    if run.store:
+        run.store.put_error(company, msg)
+    write_lines(run, [error_line(company, msg)], company if written else None)
+
+
+def write_lines(run, lines, company=None):
+    """
+    Hands result rows to the sink of the run. Passing the company marks it as written in the journal
+    once its rows are on disk, so a resumed run neither loses nor repeats them.
+    """
+    on_flushed = None
+    if company is not None and run.journal:
+        on_flushed = lambda: run.journal.record(company, WRITTEN)
+    if run.sink:
+        run.sink.write(lines, on_flushed)
+        return
+    with csv_lock:
+        for line in lines:
+            append_to_csv(RESULT_CSV, line)
+    if on_flushed:
+        on_flushed()
+
+
+class CrawlRun:
+    """
+    Shared state of one crawl, used by all workers.
+
+    :param journal: Journal, checkpoint file or None
+    :param cache: SearchCache, known search outcomes or None
+    :param scheduler: SearchScheduler, learned order of the search cascade or None
+    :param egress: EgressRotation, ways out to the portal with their request budgets or None
+    :param sink: ResultSink, writer of the result rows or None to append to RESULT_CSV directly
+    :param index: RegisterIndex, documents bought in earlier runs or None
+    :param keywords: KeywordEngine, search words ranked over the whole input list or None
+    :param recorder: SessionRecorder, archive of every page and file the crawl sees or None
+    :param store: RegisterStore, normalized results of all runs or None
+    """
+
+    def __init__(
         self,
-        state=None,
-        searchfieldID="form:schlagwoerter",
-        zip_ID="form:postleitzahl",
-        city_ID="form:ort",
-        street_ID="form:strasse",
-        register_ID="form:registerNummer",
-    ):
-        self.wait.until(EC.url_to_be(LINK))
-        searchfield = self.driver.find_element(By.ID, searchfieldID)
-        searchfield.clear()
-
-        if state:
-            state_input_id = f"form:{state}_input"
-            state_input = self.driver.find_element(By.ID, state_input_id)
-            check_state = state_input.get_attribute("aria-checked")
-            if check_state == "true":
-                state_id = f"form:{state}"
-                state_checkbox = self.driver.find_element(By.ID, state_id)
-                self.wait.until(EC.element_to_be_clickable(state_checkbox))
-                state_checkbox.click()
-
-        zip_input = self.driver.find_element(By.ID, zip_ID)
-        zip_input.clear()
-        city_input = self.driver.find_element(By.ID, city_ID)
-        city_input.clear()
-        street_input = self.driver.find_element(By.ID, street_ID)
-        street_input.clear()
-        register_input = self.driver.find_element(By.ID, register_ID)
-        register_input.clear()
-        self.select_search_options("all", False)
-
-    def select_search_options(self, mode="all", similar=False):
-        options_form = self.driver.find_element(By.ID, "form:schlagwortOptionen")
-        radio_buttons = options_form.find_elements(By.CLASS_NAME, "ui-g")
-        if mode == "all":
-            childdivs = radio_buttons[0].find_elements(By.CSS_SELECTOR, "div")
-            self.wait.until(EC.element_to_be_clickable(childdivs[1]))
-            childdivs[1].click()
-        elif mode == "exact":
-            childdivs = radio_buttons[2].find_elements(By.CSS_SELECTOR, "div")
-            self.wait.until(EC.element_to_be_clickable(childdivs[1]))
-            childdivs[1].click()
-        elif mode == "min":
-            childdivs = radio_buttons[1].find_elements(By.CSS_SELECTOR, "div")
-            self.wait.until(EC.element_to_be_clickable(childdivs[1]))
-            childdivs[1].click()
-        else:
-            self.log_error("search mode not available")
-
-        if similar:
-            similar_checkbox = self.driver.find_element(By.ID, "form:aenlichLautendeSchlagwoerterBoolChkbox")
-            self.wait.until(EC.element_to_be_clickable(similar_checkbox))
-            similar_checkbox.click()
-
-    def close_connection(self):
-        self.driver.close()
-
-    def results_count(self):
-        self.wait.until(EC.url_to_be("https://www.handelsregister.de/rp_web/ergebnisse.xhtml"))
-        self.wait.until(EC.presence_of_all_elements_located((By.TAG_NAME, "table")))
-        count = len(self.driver.find_elements(By.TAG_NAME, "table")) - 1
-        return count
-
-    def save_results(self, tablenumber: int = 1):
-        try:
-            self.save_result_xml(tablenumber)
-        except Exception as e:
-            self.log_error(f"PDF konnte nicht gespeichert werden: {str(e)}")
-
-        self.driver.back()
-        try:
-            self.save_result_pdf(tablenumber)
-        except Exception as e:
-            self.log_error(f"PDF konnte nicht gespeichert werden: {str(e)}")
-        self.driver.back()
-        return True
-
-    def save_result_xml(self, tablenumber: int = 1):
-        tables = self.driver.find_elements(By.TAG_NAME, "table")
-        rows = tables[tablenumber].find_elements(By.TAG_NAME, "tr")
-        colums = rows[1].find_elements(By.TAG_NAME, "td")
-        links = colums[3].find_elements(By.TAG_NAME, "a")
-        links[-1].click()
-        self.wait.until(EC.url_to_be("https://www.handelsregister.de/rp_web/chargeinfo.xhtml"))
-        download_button = self.driver.find_element(By.ID, "form:kostenpflichtigabrufen")
-        download_button.click()
-
-    def save_result_pdf(self, tablenumber: int = 1):
-        tables = self.driver.find_elements(By.TAG_NAME, "table")
-        rows = tables[tablenumber].find_elements(By.TAG_NAME, "tr")
-        colums = rows[1].find_elements(By.TAG_NAME, "td")
-        links = colums[3].find_elements(By.TAG_NAME, "a")
-        links[0].click()
-        self.wait.until(EC.url_to_be("https://www.handelsregister.de/rp_web/chargeinfo.xhtml"))
-        download_button = self.driver.find_element(By.ID, "form:kostenpflichtigabrufen")
-        download_button.click()
-
-    def log_error(self, msg):
-        print("error occurred:", msg)
-        raise Exception(msg)
-
-    def change_ip(self, link, psw, waiting_time):
-        self.driver.get(link)
-        self.wait.until(EC.url_to_be(link))
-        if link == "http://fritz.box/":
-            input_psw = self.driver.find_element(By.ID, "uiPassInput")
-            submit_psw = self.driver.find_element(By.ID, "submitLoginBtn")
-            input_psw.send_keys(psw)
-            self.wait.until(EC.element_to_be_clickable(submit_psw))
-            submit_psw.click()
-            self.wait.until(EC.url_to_be(str(link + "#overview")))
-            self.driver.get(str(ROUTER + "#netMoni"))
-            self.wait.until(EC.url_to_be(str(link + "#netMoni")))
-            self.wait.until(EC.presence_of_element_located((By.ID, "uiReconnectBtn")))
-            button_reconnect = self.driver.find_element(By.ID, "uiReconnectBtn")
-            self.wait.until(EC.element_to_be_clickable(button_reconnect))
-            button_reconnect.click()
-            return waiting_time
-        else:
-            return 200
-
-
-def main():
-    recreate_directory(DOWNLOAD_DIR)
-    searchmodes = [
-        {"msg": "Suche nach Keywords: ", "mode": "all", "similar": False, "address": True},
-        {"msg": "Suche nach Keywords: ", "mode": "all", "similar": False, "address": False},
-        {"msg": "Suche nach Keywords und ähnlichen: ", "mode": "all", "similar": True, "address": True},
-        {"msg": "Suche nach Keywords und ähnlichen: ", "mode": "all", "similar": True, "address": False},
-        {"msg": "Suche nach allen Keywrods: ", "mode": "min", "similar": False, "address": True},
-        {"msg": "Suche nach allen Keywrods: ", "mode": "min", "similar": False, "address": False},
-        {"msg": "Suche nach allen Keywords und ähnlichen: ", "mode": "min", "similar": True, "address": False},
-        {"msg": "Suche nach allen Keywords und ähnlichen: ", "mode": "min", "similar": True, "address": True},
-        {"msg": "Suche genau nach Keyword: ", "mode": "exact", "similar": False, "address": True},
-        {"msg": "Suche genau nach Keyword: ", "mode": "exact", "similar": False, "address": False},
-        {
-            "msg": "Suche genau nach Keyword und ähnlichen: ",
-            "mode": "exact",
-            "similar": True,
-            "address": True,
-        },
-        {
-            "msg": "Suche genau nach Keyword und ähnlichen: ",
-            "mode": "exact",
-            "similar": True,
-            "address": False,
-        },
+        journal=None,
+        cache=None,
+        scheduler=None,
+        egress=None,
+        sink=None,
+        index=None,
+        keywords=None,
+        recorder=None,
+        store=None,
+    ) -> None:
+        self.store = store
+        self.recorder = recorder
+        self.keywords = keywords
+        self.sink = sink
+        self.index = index
+        self.journal = journal
+        self.cache = cache
+        self.scheduler = scheduler
+        self.egress = egress
+
+
+def search_params(company, word, search):
+    # keyword arguments for MyConnector.search, also the key of the search cache
+    if search["address"]:
+        return {
+            "search_key": word,
+            "state": str(company["Bundesland"]),
+            "zip_code": str(company["PLZ"]),
+            "street": str(company["Straße"]),
+            "mode": search["mode"],
+            "similar": search["similar"],
+            "city": str(company["Ort"]),
+        }
+    return {
+        "search_key": word,
+        "state": str(company["Bundesland"]),
+        "zip_code": None,
+        "street": None,
+        "mode": search["mode"],
+        "similar": search["similar"],
+        "city": None,
+    }
+
+
+def search_attempts(company, state, run):
+    """
+    Lists the (keyword position, keyword, searchmode index) attempts for a company, best first.
+    Attempts a previous run already finished are left out, an unsaved or cached hit goes first.
+    """
+    keywords = (run.keywords or KeywordEngine()).keywords(company)
+
+    attempts = [
+        (position, word, index)
+        for position, word in enumerate(keywords)
+        for index in range(len(SEARCHMODES))
+        if (word, index) not in state.attempts
     ]
-    my_companies = read_csv("shortlist.csv")
-    unwanted_stuff = ["und", "e.", "V.", "GmbH", "gGmbH", "GBR", "GbR", "/", "&", "e.V.", "eV", '"']
+    if run.scheduler:
+        attempts = run.scheduler.order(company, attempts)
+    if run.cache:
+        known_hits = [
+            attempt
+            for attempt in attempts
+            if is_known_hit(run.cache.peek(search_params(company, attempt[1], SEARCHMODES[attempt[2]])), company)
+        ]
+        attempts = known_hits + [attempt for attempt in attempts if attempt not in known_hits]
+    unsaved_hit = [attempt for attempt in attempts if (attempt[1], attempt[2]) == state.hit]
+    return unsaved_hit + [attempt for attempt in attempts if attempt not in unsaved_hit]
+
+
+def search_company(connection, company, log, state, run):
+    """
+    Runs the search cascade until one search has exactly one hit and saves its documents.
+
+    :return: (int, bool, dict, str, dict), number of errors, whether the company was already finished with an error
+        row, the search parameters and the court of the hit and the RegisterIndex entry if the hit was bought before
+    """
     error_count = 0
+    hit_params = None
+    court = None
+    journal = run.journal
+    throttled = 0
+    portal_errors = 0
+    attempts = deque(search_attempts(company, state, run))
+    try:
+        while attempts:
+            position, word, index = attempts.popleft()
+            search = SEARCHMODES[index]
+            params = search_params(company, word, search)
+            cached = run.cache.get(params, company) if run.cache else None
+            if is_known_miss(cached, company):
+                METRICS.count("search_cached")
+                log(f"{search['msg']}{word} (bekannt: {cached['count']} Treffer)")
+                if journal:
+                    journal.record(company, SEARCHED, word=word, mode=index)
+                continue
+            try:
+                log(f"{search['msg']}{word}")
+                connection.set_step(company, word, index)
+                connection.search(**params)
+
+            except Exception as e:
+                check_alive(connection, e)
+                print(f"\n\nFehler: {e}\n")
+                error_count += 1
+                continue
+            METRICS.count("search_sent")
+
+            try:
+                count = connection.results_count()
+            except Throttled:
+                throttled += 1
+                if not connection.limiter or throttled > MAX_THROTTLED:
+                    raise
+                # same search again, through another egress or once the portal lets us back in
+                METRICS.count("retry_throttled")
+                if not (connection.egress and connection.egress.rotation.throttled(connection)):
+                    connection.limiter.throttled()
+                attempts.appendleft((position, word, index))
+                connection.open_search_page()
+                connection.reset_search(state=company["Bundesland"])
+                continue
+            except PortalError as e:
+                # an error page says nothing about the search word, so the same search is sent again
+                portal_errors += 1
+                error_count += 1
+                if portal_errors > MAX_PORTAL_ERRORS:
+                    raise
+                log(f"{e}, wiederhole Suche")
+                attempts.appendleft((position, word, index))
+                connection.open_search_page()
+                connection.reset_search(state=company["Bundesland"])
+                continue
+            table = 1 if count == 1 else None
+            rows = connection.result_rows() if count >= 1 else []
+            if count > 1:
+                # the right company is often on a multi-hit page, so look before searching again
+                with METRICS.time("match_results"):
+                    match = best_match(rows, company, MATCH_THRESHOLD)
+                if match:
+                    METRICS.count("multi_hit_matched")
+                    log(f"{count} Treffer, nehme {match.name} ({match.score:.2f})")
+                    table = match.table
+            if run.cache:
+                run.cache.put(params, count, company=company, matched=table is not None)
+            if run.scheduler:
+                run.scheduler.record(company, position, index, table is not None)
+            if table is not None:
+                hit_params = params
+                row = next((row for row in rows if row.table == table), None)
+                court = row.court if row else None
+                if run.index and row and row.register:
+                    stored = run.index.lookup(
+                        name=company["Firma"], register=row.register, city=company.get("Ort"), court=row.court
+                    )
+                    if stored:
+                        # already bought in an earlier run and still fresh
+                        METRICS.count("download_skipped")
+                        log(f"{company['Firma']}: {row.register} schon vorhanden, kein Abruf")
+                        connection.open_search_page()
+                        connection.reset_search(state=company["Bundesland"])
+                        return error_count, False, hit_params, court, stored
+                log(f"speicher für {company['Firma']}")
+                if journal:
+                    journal.record(company, HIT, word=word, mode=index)
+                try:
+                    connection.save_results(table)
+                    connection.open_search_page()
+                    connection.reset_search(state=company["Bundesland"])
+                except Exception as e:
+                    check_alive(connection, e)
+                    METRICS.count("retry_save")
+                    try:
+                        connection.save_results(table)
+                        connection.open_search_page()
+                        connection.reset_search(state=company["Bundesland"])
+                    except Exception as e:
+                        check_alive(connection, e)
+                        print(f"\n\n{company['Firma']} - Error: {e}\n\n")
+                        write_error(
+                            run,
+                            company,
+                            f"Fehler: Ergebnis gefunden, aber Selenium Treiber bricht beim Speichern der Dateien mehrfach ab.",
+                            written=False,
+                        )
+                        connection.open_search_page()
+                        connection.reset_search(state=company["Bundesland"])
+                        error_count += 1
+                break
+
+            if journal:
+                journal.record(company, SEARCHED, word=word, mode=index)
+            connection.back_to_search()
+
+    except BrowserDied:
+        raise
+    except Exception as e:
+        check_alive(connection, e)
+        print(f"\n\n{company['Firma']} - Error: {str(e)}\n")
+        write_error(run, company, f"Fehler: Selenium Treiber bricht ab bei Suche.")
+        connection.open_search_page()
+        connection.reset_search(state=company["Bundesland"])
+        return error_count + 1, True, hit_params, court, None
+    return error_count, False, hit_params, court, None
+
+
+class CompanyJob:
+    """
+    One company on its way from the search form to the result file.
+
+    :param company: dict, one row of the input list
+    :param log: callable, progress output of the worker that searched it
+    """
+
+    def __init__(self, company, log=write_to_terminal) -> None:
+        self.company = company
+        self.log = log
+        self.started = time.perf_counter()
+        self.errors = 0
+        # errors already reported to the worker pool
+        self.reported = 0
+        self.resumed = False
+        self.stored = None
+        self.hit_params = None
+        # Amtsgericht of the hit, the register number only names a company together with it
+        self.court = None
+        self.slots = []
+        self.xml_path = None
+        self.msg = None
+        self.extracted = None
+        self.downloaded = threading.Event()
+
+
+def search_stage(connection, job, run):
+    """
+    The browser part of a company: searches it and starts the downloads of the hit.
+
+    :return: CompanyJob for the file stage, None if the company is done already
+    """
+    company, log = job.company, job.log
+    journal = run.journal
+    state = journal.state(company) if journal else CompanyState()
+    if state.finished:
+        log(f"{company['Firma']} bereits erledigt")
+        return None
+
+    job.resumed = state.downloaded
+    if job.resumed:
+        log(f"{company['Firma']}: Dateien schon geladen, lese XML")
+        job.xml_path, job.msg = state.xml_path, state.msg
+        return job
+    job.stored = (
+        run.index.lookup(name=company["Firma"], city=company.get("Ort"), plz=company.get("PLZ")) if run.index else None
+    )
+    if job.stored:
+        log(f"{company['Firma']}: Dateien vom {job.stored['fetched'][:10]} vorhanden, keine Suche")
+        METRICS.count("index_reused")
+        return job
+    with METRICS.time("phase_search"):
+        errors, finished, job.hit_params, job.court, job.stored = search_company(connection, company, log, state, run)
+    job.errors += errors
+    if finished:
+        return None
+    job.slots = connection.take_downloads()
+    return job
+
+
+def files_stage(job, run):
+    """
+    Waits for the downloads of a company and moves them into the result folders.
+
+    :return: CompanyJob for the extraction, None if no XML arrived
+    """
+    company = job.company
+    if job.stored:
+        job.xml_path, job.msg = run.index.reuse(job.stored, XML_DIR, PDF_DIR, result_filename(company))
+    elif not job.resumed:
+        with METRICS.time("phase_files"):
+            try:
+                with METRICS.time("collect_downloads"):
+                    files = collect_downloads(job.slots, DOWNLOAD_TIMEOUT)
+                if run.recorder:
+                    run.recorder.record_downloads(job.slots)
+                job.xml_path, job.msg = move_and_rename(
+                    files.get(".xml"), files.get(".pdf"), XML_DIR, PDF_DIR, result_filename(company)
+                )
+            finally:
+                release_downloads(job.slots)
+                job.slots = []
+
+        if (job.xml_path == None) or (not os.path.exists(job.xml_path)):
+            print(f"{company['Firma']} - Kein Eintrag gefunden :(")
+            METRICS.count("not_found")
+            write_error(run, company, job.msg)
+            job.errors += 1
+            return None
+    if run.journal and not job.resumed:
+        run.journal.record(company, DOWNLOADED, xml=job.xml_path, msg=job.msg)
+    return job
+
+
+def extract_stage(job, run):
+    with METRICS.time("phase_extract"):
+        job.extracted = StreamingDataXML(job.xml_path).extract_all()
+    return job
+
+
+def write_stage(job, run):
+    company = job.company
+    associates, ass_companies, vertretung = job.extracted
+    # the rows hold everything needed from here on
+    job.extracted = None
+    lines = result_lines(company, associates, ass_companies, vertretung, job.msg)
+    with METRICS.time("phase_write"):
+        if run.store:
+            run.store.put(company, associates, ass_companies, vertretung, job.msg, job.xml_path)
+        write_lines(run, lines, company)
+    METRICS.count("resolved")
+    register = next((org["Registernummer"] for org in ass_companies if org["Registernummer"]), None)
+    if run.cache and not job.resumed and job.hit_params:
+        run.cache.set_register(job.hit_params, register)
+    if run.index and not job.resumed and not job.stored:
+        pdf_path = os.path.join(PDF_DIR, f"{result_filename(company)}.pdf")
+        run.index.add(
+            company["Firma"],
+            register,
+            job.xml_path,
+            pdf_path,
+            city=company.get("Ort"),
+            plz=company.get("PLZ"),
+            court=job.court,
+        )
+    METRICS.observe("company", time.perf_counter() - job.started)
+    return None
+
+
+LATER_STAGES = [("files", files_stage), ("extract", extract_stage), ("write", write_stage)]
+
+
+def crawl_company(connection, company, log=write_to_terminal, run=None):
+    """
+    Searches one company, downloads its documents and writes the result rows, all in the calling thread.
+
+    :param connection: MyConnector, browser of the calling worker
+    :param company: dict, one row of the input list
+    :param log: callable, progress output of the calling worker
+    :param run: CrawlRun, shared state of the crawl
+    :return: int, number of errors registered for this company
+    """
+    run = run or CrawlRun()
+    job = CompanyJob(company, log)
+    item = search_stage(connection, job, run)
+    for _, stage in LATER_STAGES:
+        if item is None:
+            break
+        item = stage(item, run)
+    # pacing is left to the rate limiter, the browser is back on the search form already
+    return job.errors
+
+
+class CrawlPipeline:
+    """
+    Runs the stages after the search in background threads, so a browser can search the next company while
+    the files of the previous one are collected, read and written. Queues between the stages are bounded.
+
+    :param run: CrawlRun, shared state of the crawl
+    :param workers: int, number of browsers feeding the pipeline
+    """
+
+    def __init__(self, run, workers=1) -> None:
+        self.run = run
+        self.lock = threading.Lock()
+        self.errors = 0
+        # jobs whose downloads the browser of a connection may still be writing
+        self.downloading = {}
+        self.pipeline = Pipeline(
+            [
+                Stage(name, self.handler(stage), workers=workers if name == "files" else 1, maxsize=2 * workers)
+                for name, stage in LATER_STAGES
+            ],
+            on_error=self.failed,
+        ).start()
+
+    def handler(self, stage):
+        def handle(job):
+            try:
+                item = stage(job, self.run)
+            finally:
+                if stage is files_stage:
+                    job.downloaded.set()
+            if item is None:
+                self.finished(job)
+            return item
+
+        return handle
+
+    def finished(self, job):
+        with self.lock:
+            self.errors += job.errors - job.reported
+
+    def failed(self, stage, job, e):
+        print(f"\n\n{job.company['Firma']} - Error in {stage}: {e}\n")
+        if job.slots:
+            release_downloads(job.slots)
+            job.slots = []
+        job.errors += 1
+        job.downloaded.set()
+        self.finished(job)
+
+    def crawl(self, connection, company, log):
+        """Search part for the WorkerPool, blocks while the later stages are full."""
+        job = CompanyJob(company, log)
+        item = search_stage(connection, job, self.run)
+        job.reported = job.errors
+        if item is not None:
+            with self.lock:
+                pending = self.downloading.setdefault(id(connection), [])
+                pending[:] = [waiting for waiting in pending if not waiting.downloaded.is_set()] + [item]
+            self.pipeline.put(item)
+        return job.errors
+
+    def finish(self, connection):
+        """Waits until the files of the last companies of a browser arrived, before the browser is closed."""
+        with self.lock:
+            pending = self.downloading.pop(id(connection), [])
+        for job in pending:
+            job.downloaded.wait()
+
+    def close(self):
+        self.pipeline.close()
+
+    def summary(self):
+        return self.pipeline.summary()
+
+
+def reconnect(connection):
+    """Gets a fresh request budget from the egress once the budget is used up. Returns whether it did."""
+    if not connection.egress or not connection.egress.rotation.rotate(connection):
+        return False
+    connection.driver.get(connection.link)
+    return True
+
+
+def make_connection(
+    number,
+    workers,
+    egress=None,
+    fast_form=True,
+    link=LINK,
+    chrome_args=(),
+    supervisor=None,
+    tabs=True,
+    event_waits=True,
+    profile=None,
+    recorder=None,
+):
+    # selenium is only imported once a browser is really needed
+    from src.connector import MyConnector
+
+    # every worker gets its own download directory, so files can't be mixed up
+    download_dir = DOWNLOAD_DIR if workers == 1 else os.path.join(DOWNLOAD_DIR, f"worker-{number}")
+    recreate_directory(download_dir)
+    pinned = egress.assign() if egress else None
+    if egress and pinned is None:
+        raise RuntimeError("kein erreichbarer Egress frei")
+    connection = MyConnector(
+        link,
+        download_dir,
+        fast_form=fast_form,
+        chrome_args=chrome_args,
+        egress=pinned,
+        tabs=tabs,
+        download_timeout=DOWNLOAD_TIMEOUT,
+        event_waits=event_waits,
+        profile=profile,
+        recorder=recorder,
+    )
+    connection.init_wait()
+    if supervisor:
+        supervisor.prepare(connection.browser_args())
+    return connection
+
+
+def replay_connection(number, workers, archive, link=LINK):
+    download_dir = DOWNLOAD_DIR if workers == 1 else os.path.join(DOWNLOAD_DIR, f"worker-{number}")
+    recreate_directory(download_dir)
+    return ReplayConnector(archive, download_dir, link)
+
+
+def open_egress(kind, link, rate_limit, proxies=None, cooldown=600, router_key=None):
+    """
+    :param kind: str, one of EGRESS_KINDS
+    :param proxies: list of str or None, proxy urls for kind "proxies"
+    :param router_key: str or None, password of the Fritzbox web interface
+    """
+    make_limiter = lambda: RateLimiter(budget=rate_limit, period=3600, on_exhausted=reconnect)
+    if kind == "proxies":
+        return ProxyEgress(proxies or [], link, make_limiter, cooldown=cooldown)
+    if kind == "fritzbox":
+        return FritzboxEgress(link, make_limiter(), password=router_key, wait=TIME_MIN, router=ROUTER, cooldown=cooldown)
+    return DirectEgress(link, make_limiter(), cooldown=cooldown)
+
+
+def prepare_results(resume, index=None):
     if not os.path.exists(RESULTS_DIR):
         os.makedirs(RESULTS_DIR)
         os.makedirs(PDF_DIR)
         os.makedirs(XML_DIR)
         print(f"Directory '{RESULTS_DIR}' created.")
-    else:
+    elif not resume:
         backup = os.path.join(BACKUP_DIR, str(datetime.now()))
         shutil.move(
             RESULTS_DIR,
             backup,
         )
+        if index:
+            index.relocate(RESULTS_DIR, backup)
         os.makedirs(RESULTS_DIR)
         os.makedirs(PDF_DIR)
         os.makedirs(XML_DIR)
-    initialize_csv(
-        RESULT_CSV,
-        [
-            "Name",
-            "Vorname",
-            "Rolle",
-            "Firma",
-            "Rechtsform",
-            "Registernummer",
-            "Bundesland",
-            "Ort",
-            "PLZ",
-            "Straße",
-            "Code_Vertretungsberechtigung",
-            "Freitext_Vertretungsberechtigung",
-            "Hinweis",
-        ],
+    else:
+        os.makedirs(PDF_DIR, exist_ok=True)
+        os.makedirs(XML_DIR, exist_ok=True)
+
+
+def crawl(
+    workers=1,
+    resume=False,
+    cache_ttl=30,
+    rate_limit=RATE_LIMIT,
+    output="csv",
+    fast_form=True,
+    metrics_interval=15,
+    input_file=INPUT_CSV,
+    link=LINK,
+    chrome_args=(),
+    max_age=180,
+    import_storage=False,
+    pipeline=True,
+    egress=None,
+    proxies=None,
+    egress_cooldown=600,
+    standby=True,
+    tabs=True,
+    event_waits=True,
+    browser_profile="default",
+    record=None,
+    replay=None,
+    store=STORE,
+):
+    """
+    :param record: str or None, path of a session archive every page and file of the crawl is written to
+    :param replay: SessionArchive or None, session played back instead of searching with a browser
+    :param store: str or None, SQLite file collecting the results of all runs, None to leave it out
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # a replay never reaches the portal, so it doesn't need the router either
+    router_key = os.getenv("FRITZ") if not replay else None
+    recreate_directory(DOWNLOAD_DIR)
+    my_companies = StateBatches(input_file)
+    keywords = KeywordEngine()
+    my_companies.read(on_company=keywords.add)
+    print(my_companies.summary())
+    egress = egress or ("fritzbox" if router_key else "none")
+    index = RegisterIndex(REGISTER_INDEX, max_age=max_age)
+    if import_storage or not index.exists:
+        imported = index.import_storage(BACKUP_DIR)
+        if imported:
+            print(f"{imported} Dokumente aus '{BACKUP_DIR}' in den Registerindex übernommen")
+    prepare_results(resume, index)
+    journal = Journal(JOURNAL)
+    if resume:
+        print(journal.summary())
+    run = CrawlRun(
+        journal=journal,
+        # a replay searches like the recording did, a cache or a learned order would skip recorded steps
+        cache=SearchCache(SEARCH_CACHE, ttl=cache_ttl * 24 * 3600) if not replay else None,
+        scheduler=SearchScheduler(SEARCH_STATS) if not replay else RecordedOrder(replay),
+        egress=open_egress(egress, link, rate_limit, proxies, egress_cooldown, router_key),
+        sink=open_sink(RESULTS_DIR, RESULT_HEADERS, output),
+        index=index,
+        keywords=keywords,
+        recorder=SessionRecorder(record, input_file) if record else None,
+        store=RegisterStore(store) if store else None,
     )
 
-    connection = MyConnector(LINK)
-    connection.init_wait()
-    action_count = 0
-    for company in my_companies:
-        success = False
-        splitted_str = str(company["Firma"]).split(" ")
-        unwanted_stuff.append(str(company["Ort"]))
-        keywords = clean_list(splitted_str, unwanted_stuff)
-        keywords.insert(0, str(company["Firma"]))
-
-        try:
-            for word in keywords:
-                if success:
-                    break
-                for search in searchmodes:
-                    try:
-                        write_to_terminal(f"{search['msg']}{word}")
-                        if search["address"]:
-                            connection.search(
-                                search_key=word,
-                                state=str(company["Bundesland"]),
-                                zip_code=str(company["PLZ"]),
-                                street=str(company["Straße"]),
-                                mode=search["mode"],
-                                similar=search["similar"],
-                                city=str(company["Ort"]),
-                            )
-                            action_count += 1
-                        else:
-                            connection.search(
-                                search_key=word,
-                                state=str(company["Bundesland"]),
-                                zip_code=None,
-                                street=None,
-                                mode=search["mode"],
-                                similar=search["similar"],
-                                city=None,
-                            )
-                            action_count += 1
+    METRICS.export_periodically(METRICS_PROM, metrics_interval)
 
-                    except Exception as e:
-                        print(f"\n\nFehler: {e}\n")
-                        error_count += 1
-                        continue
-
-                    if connection.results_count() == 1:
-                        write_to_terminal(f"speicher für {company['Firma']}")
-                        try:
-                            success = connection.save_results(1)
-                            connection.driver.get(LINK)
-                            connection.reset_search(state=company["Bundesland"])
-                            action_count += 3
-                            break
-                        except Exception as e:
-                            try:
-                                connection.save_results(1)
-                                connection.driver.get(LINK)
-                                connection.reset_search(state=company["Bundesland"])
-                                action_count += 3
-                                break
-                            except Exception as e:
-                                line = {
-                                    "Name": None,
-                                    "Vorname": None,
-                                    "Rolle": None,
-                                    "Firma": company["Firma"],
-                                    "Rechtsform": None,
-                                    "Registernummer": None,
-                                    "Bundesland": company["Bundesland"],
-                                    "Ort": company["Ort"],
-                                    "PLZ": company["PLZ"],
-                                    "Straße": company["Straße"],
-                                    "Code_Vertretungsberechtigung": None,
-                                    "Freitext_Vertretungsberechtigung": None,
-                                    "Hinweis": f"Fehler: Ergebnis gefunden, aber Selenium Treiber bricht beim Speichern der Dateien mehrfach ab.",
-                                }
-                                print(f"\n\n{company['Firma']} - Error: {e}\n\n")
-                                append_to_csv(RESULT_CSV, line)
-                                connection.driver.get(LINK)
-                                connection.reset_search(state=company["Bundesland"])
-                                error_count += 1
-                                success = True
-                                break
-                        break
-
-                    connection.driver.back()
-                    connection.wait.until(EC.url_to_be(LINK))
-
-        except Exception as e:
-            line = {
-                "Name": None,
-                "Vorname": None,
-                "Rolle": None,
-                "Firma": company["Firma"],
-                "Rechtsform": None,
-                "Registernummer": None,
-                "Bundesland": company["Bundesland"],
-                "Ort": company["Ort"],
-                "PLZ": company["PLZ"],
-                "Straße": company["Straße"],
-                "Code_Vertretungsberechtigung": None,
-                "Freitext_Vertretungsberechtigung": None,
-                "Hinweis": f"Fehler: Selenium Treiber bricht ab bei Suche.",
-            }
-            print(f"\n\n{company['Firma']} - Error: {str(e)}\n")
-            append_to_csv(RESULT_CSV, line)
-            connection.driver.get(LINK)
-            connection.reset_search(state=company["Bundesland"])
-            error_count += 1
-            continue
-
-        xml_path, msg = move_and_rename_files(DOWNLOAD_DIR, XML_DIR, PDF_DIR, str(company["Firma"]))
-
-        if (xml_path == None) or (not os.path.exists(xml_path)):
-            line = {
-                "Name": None,
-                "Vorname": None,
-                "Rolle": None,
-                "Firma": company["Firma"],
-                "Rechtsform": None,
-                "Registernummer": None,
-                "Bundesland": company["Bundesland"],
-                "Ort": company["Ort"],
-                "PLZ": company["PLZ"],
-                "Straße": company["Straße"],
-                "Code_Vertretungsberechtigung": None,
-                "Freitext_Vertretungsberechtigung": None,
-                "Hinweis": msg,
-            }
-            print(f"{company['Firma']} - Kein Eintrag gefunden :(")
-            append_to_csv(RESULT_CSV, line)
-            connection.driver.get(LINK)
-            connection.reset_search(state=company["Bundesland"])
-            error_count += 1
-            continue
-        data = DataXML(xmlpath=xml_path)
-        associates = data.extract_person_info()
-        ass_companies = data.extract_organization_info()
-        vertretung = data.extract_vertretung()
-        for ass_compony in ass_companies:
-            for associate in associates:
-                line = {
-                    "Name": associate["Nachname"],
-                    "Vorname": associate["Vorname"],
-                    "Rolle": associate["Code"],
-                    "Firma": ass_compony["Bezeichnung"],
-                    "Rechtsform": ass_compony["Rechtsform"],
-                    "Registernummer": ass_compony["Registernummer"],
-                    "Bundesland": company["Bundesland"],
-                    "Ort": company["Ort"],
-                    "PLZ": company["PLZ"],
-                    "Straße": company["Straße"],
-                    "Code_Vertretungsberechtigung": str(vertretung.get("codes")),
-                    "Freitext_Vertretungsberechtigung": str(vertretung["texts"]).replace("\n", " ").strip(),
-                    "Hinweis": msg,
-                }
-                append_to_csv(RESULT_CSV, line)
-
-        time = connection.change_ip(ROUTER, ROUTER_KEY, TIME_MIN)
-        countdown(time)
-
-        connection.driver.get(LINK)
-        connection.reset_search(state=str(company["Bundesland"]))
-        countdown(TIMTE_BREAK)
+    staged = CrawlPipeline(run, workers) if pipeline else None
+    profile = PROFILES[browser_profile]
+
+    def launch(args):
+        from src.connector import launch_browser
+
+        return launch_browser(args, link, profile=profile)
+
+    supervisor = Supervisor(launch, standby=standby and not replay)
+    if replay:
+        connect = lambda number: replay_connection(number, workers, replay, link)
+    else:
+        connect = lambda number: make_connection(
+            number,
+            workers,
+            run.egress,
+            fast_form,
+            link,
+            chrome_args,
+            supervisor,
+            tabs,
+            event_waits,
+            profile,
+            run.recorder,
+        )
+    pool = WorkerPool(
+        connect,
+        staged.crawl if staged else lambda connection, company, log: crawl_company(connection, company, log, run),
+        workers,
+        finish=staged.finish if staged else None,
+        recover=supervisor.recover,
+        give_up=lambda company, msg: write_error(run, company, msg),
+    )
+    error_count = 0
+    try:
+        error_count = pool.run(my_companies)
+    finally:
+        supervisor.close()
+        my_companies.close()
+        if staged:
+            # companies still in the pipeline are finished before anything is closed
+            staged.close()
+        # the sink reports flushed rows to the journal, so it closes first
+        run.sink.close()
+        journal.close()
+        if run.cache:
+            run.cache.save()
+        run.scheduler.save()
+        index.save()
+        if run.recorder:
+            run.recorder.close()
+        if run.store:
+            run.store.close()
+        METRICS.close()
+        METRICS.write_prometheus(METRICS_PROM)
+        METRICS.write_json(METRICS_JSON)
+    pool.report()
+    if staged:
+        error_count += staged.errors
+        print(f"Pipeline: {staged.summary()}")
+    if run.cache:
+        print(f"\n{run.cache.summary()}")
+    print(run.scheduler.summary())
+    for limiter in run.egress.limiters:
+        print(limiter.summary())
+    print(run.egress.summary())
+    print(supervisor.summary())
+    print(index.summary())
+    if run.recorder:
+        print(run.recorder.summary())
+    if run.store:
+        print(run.store.summary())
 
     if error_count > 0:
         print(
@@ -466,7 +813,218 @@ def main():
         print(
             f"\n\n###############################################\n\n  der crawler hat geslayed\n\n###############################################\n\n"
         )
-    connection.close_connection()
+
+
+def replay(archive_path, input_file=None, workdir=None, workers=1, pipeline=True):
+    """
+    Runs a recorded crawl again from its session archive, without browser and portal and at full speed,
+    e.g. to see what changes to parsing and matching do. Everything is written to a fresh working directory.
+
+    :param archive_path: str, session archive written by crawl(record=...)
+    :param input_file: str or None, company list to use instead of the recorded one
+    :param workdir: str or None, directory for results, cache and journal of the replay
+    """
+    archive = SessionArchive(archive_path)
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="replay-"))
+    os.makedirs(workdir, exist_ok=True)
+    if input_file:
+        input_file = os.path.abspath(input_file)
+    else:
+        input_file = os.path.join(workdir, INPUT_CSV)
+        if not archive.extract_input(input_file):
+            raise SystemExit(f"{archive_path} enthält keine Firmenliste, bitte mit --input angeben")
+    print(archive.summary())
+    os.chdir(workdir)
+    start = time.perf_counter()
+    try:
+        crawl(
+            input_file=input_file,
+            workers=workers,
+            rate_limit=10**9,
+            metrics_interval=3600,
+            pipeline=pipeline,
+            standby=False,
+            replay=archive,
+        )
+    finally:
+        archive.close()
+    print(f"Wiedergabe in {time.perf_counter() - start:.1f}s, Ergebnisse unter {workdir}")
+
+
+def export(store_path=STORE, output=EXPORT_CSV, person=None):
+    """
+    Writes the register store in the format of results.csv, with the rows of every run instead of only the last one.
+
+    :param person: str or None, "Nachname" or "Nachname, Vorname", only the companies of this person
+    """
+    if not os.path.exists(store_path):
+        raise SystemExit(f"{store_path} nicht gefunden, die Datenbank entsteht beim ersten Crawl")
+    store = RegisterStore(store_path)
+    try:
+        rows = store.export(output, person)
+        print(store.summary())
+    finally:
+        store.close()
+    print(f"{rows} Zeilen in {output}")
+
+
+def report(results_dir=RESULTS_DIR):
+    """Prints the state of the last crawl from its journal, results and metrics, without opening a browser."""
+    journal_path = os.path.join(results_dir, os.path.basename(JOURNAL))
+    if os.path.exists(journal_path):
+        print(Journal(journal_path, read_only=True).summary())
+    result_csv = os.path.join(results_dir, os.path.basename(RESULT_CSV))
+    if os.path.exists(result_csv):
+        with open(result_csv, mode="r", encoding="utf-8") as file:
+            print(f"{max(0, sum(1 for _ in file) - 1)} Zeilen in {result_csv}")
+    if os.path.exists(REGISTER_INDEX):
+        print(RegisterIndex(REGISTER_INDEX).summary())
+    metrics_json = os.path.join(results_dir, os.path.basename(METRICS_JSON))
+    if not os.path.exists(metrics_json):
+        print(f"Keine Metriken unter {metrics_json}")
+        return
+    with open(metrics_json, mode="r", encoding="utf-8") as file:
+        metrics = json.load(file)
+    print(f"Laufzeit {metrics['runtime']}s")
+    for event, count in metrics["counters"].items():
+        print(f"  {event}: {count}")
+    print("\n".join(format_steps(metrics)))
+    for error in metrics["errors"]:
+        print(f"Fehler {error['step']}: {error['type']} x{error['count']}")
+
+
+def add_crawl_arguments(parser):
+    parser.add_argument("--input", default=INPUT_CSV, help="Firmenliste, durch Semikolon getrennt")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl paralleler Browser")
+    parser.add_argument("--resume", action="store_true", help="abgebrochenen Lauf anhand des Journals fortsetzen")
+    parser.add_argument("--cache-ttl", type=float, default=30, help="Gültigkeit des Suchcaches in Tagen")
+    parser.add_argument("--rate-limit", type=int, default=RATE_LIMIT, help="erlaubte Anfragen ans Portal pro Stunde")
+    parser.add_argument("--output", choices=sorted(BACKENDS), default="csv", help="Format der Ergebnisse")
+    parser.add_argument(
+        "--metrics-interval", type=float, default=15, help="Sekunden zwischen zwei Prometheus-Exporten"
+    )
+    parser.add_argument(
+        "--no-fast-form", action="store_true", help="Suchformular Feld für Feld statt per JavaScript füllen"
+    )
+    parser.add_argument(
+        "--max-age", type=float, default=180, help="Tage, die bereits gekaufte Registerdokumente wiederverwendet werden"
+    )
+    parser.add_argument(
+        "--import-storage", action="store_true", help=f"Registerindex aus den Sicherungen in '{BACKUP_DIR}' ergänzen"
+    )
+    parser.add_argument(
+        "--no-pipeline", action="store_true", help="Dateien jeder Firma abwarten, bevor der Browser weitersucht"
+    )
+    parser.add_argument(
+        "--egress",
+        choices=EGRESS_KINDS,
+        default=None,
+        help="Weg ins Internet: eigene Leitung, Fritzbox mit Reconnect oder Proxyliste (Standard: fritzbox mit FRITZ)",
+    )
+    parser.add_argument("--proxies", default=None, help="Datei mit einer Proxy-URL pro Zeile für --egress proxies")
+    parser.add_argument(
+        "--egress-cooldown", type=float, default=600, help="Sekunden Pause für gedrosselte oder gestörte Egresse"
+    )
+    parser.add_argument(
+        "--no-standby", action="store_true", help="keinen Reservebrowser für abgestürzte Browser bereithalten"
+    )
+    parser.add_argument(
+        "--no-tabs", action="store_true", help="XML und PDF nacheinander im selben Fenster statt in eigenen Tabs abrufen"
+    )
+    parser.add_argument(
+        "--no-event-waits",
+        action="store_true",
+        help="Seiten alle 0,5 Sekunden abfragen statt auf Ereignisse im Browser zu warten",
+    )
+    parser.add_argument(
+        "--browser-profile",
+        choices=list(PROFILES),
+        default="default",
+        help="Chrome wie bisher, 'lean' ohne Bilder, Schriften und fremde Server, 'headless' zusätzlich ohne Fenster",
+    )
+    parser.add_argument(
+        "--record", default=None, help="alle Seiten und Dateien des Laufs in dieses Sitzungsarchiv (.zip) schreiben"
+    )
+    parser.add_argument("--store", default=STORE, help="SQLite-Datenbank, die die Ergebnisse aller Läufe sammelt")
+    parser.add_argument("--no-store", action="store_true", help="Ergebnisse nur in results.csv schreiben")
+
+
+def main(argv=None):
+    """
+    Command line of the crawler. Only crawl starts a browser, the other commands never import selenium.
+
+        python main.py crawl --workers 2 --record session.zip
+        python main.py replay session.zip
+        python main.py extract --input shortlist.csv
+        python main.py export --person "Mustermann, Max"
+        python main.py report
+        python main.py benchmark crawl --limit 20
+
+    Without a command the arguments go to crawl, like before there were commands.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS + ["-h", "--help"]:
+        argv = ["crawl"] + argv
+    parser = argparse.ArgumentParser(description="Handelsregister Crawler")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_crawl_arguments(commands.add_parser("crawl", help="Firmen im Handelsregister suchen und Dokumente laden"))
+    replay_parser = commands.add_parser("replay", help="aufgezeichnete Sitzung ohne Browser erneut durchlaufen")
+    replay_parser.add_argument("archive", help="Sitzungsarchiv aus crawl --record")
+    replay_parser.add_argument("--input", default=None, help="andere Firmenliste statt der aufgezeichneten")
+    replay_parser.add_argument("--workdir", default=None, help="Ordner für Ergebnisse, Standard ein neuer temporärer")
+    replay_parser.add_argument("--workers", type=int, default=1)
+    replay_parser.add_argument("--no-pipeline", action="store_true")
+    extract_parser = commands.add_parser("extract", help="results.csv aus den gespeicherten XML-Dateien neu bauen")
+    extract_parser.add_argument("--input", default=None, help="Firmenliste des Crawls für die Adressspalten")
+    extract_parser.add_argument("--output", default=RESULT_CSV)
+    extract_parser.add_argument("--processes", type=int, default=None, help="Anzahl Prozesse")
+    export_parser = commands.add_parser("export", help="Registerdatenbank im Format von results.csv ausgeben")
+    export_parser.add_argument("--store", default=STORE)
+    export_parser.add_argument("--output", default=EXPORT_CSV)
+    export_parser.add_argument(
+        "--person", default=None, help="nur Firmen dieser Person, 'Nachname' oder 'Nachname, Vorname'"
+    )
+    report_parser = commands.add_parser("report", help="Stand und Metriken des letzten Laufs anzeigen")
+    report_parser.add_argument("--results", default=RESULTS_DIR, help="Ergebnisordner des Laufs")
+    benchmark_parser = commands.add_parser("benchmark", help="Benchmarks aus benchmarks/ starten")
+    benchmark_parser.add_argument("name", choices=BENCHMARKS)
+    benchmark_parser.add_argument("arguments", nargs=argparse.REMAINDER, help="Argumente des Benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        replay(args.archive, args.input, args.workdir, args.workers, pipeline=not args.no_pipeline)
+    elif args.command == "extract":
+        total, parsed, failed = extract(args.input, args.output, RESULTS_DIR, BACKUP_DIR, processes=args.processes)
+        print(f"{total} XML-Dateien, {parsed} neu gelesen, {failed} fehlerhaft, Ergebnisse in {args.output}")
+    elif args.command == "export":
+        export(args.store, args.output, args.person)
+    elif args.command == "report":
+        report(args.results)
+    elif args.command == "benchmark":
+        importlib.import_module(f"benchmarks.{args.name}_benchmark").main(args.arguments)
+    else:
+        crawl(
+            input_file=args.input,
+            workers=args.workers,
+            resume=args.resume,
+            cache_ttl=args.cache_ttl,
+            rate_limit=args.rate_limit,
+            output=args.output,
+            fast_form=not args.no_fast_form,
+            metrics_interval=args.metrics_interval,
+            max_age=args.max_age,
+            import_storage=args.import_storage,
+            pipeline=not args.no_pipeline,
+            egress=args.egress,
+            proxies=read_proxies(args.proxies) if args.proxies else None,
+            egress_cooldown=args.egress_cooldown,
+            standby=not args.no_standby,
+            tabs=not args.no_tabs,
+            event_waits=not args.no_event_waits,
+            browser_profile=args.browser_profile,
+            record=args.record,
+            store=None if args.no_store else args.store,
+        )
 
 
 if __name__ == "__main__":
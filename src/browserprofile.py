@@ -0,0 +1,115 @@
+from urllib.parse import urlsplit
+
+# url patterns of webfonts, blocked with the DevTools protocol before chrome requests them
+FONT_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+# chrome features a crawler never uses, each of them costs memory or background traffic per instance
+MEMORY_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--renderer-process-limit=2",
+    "--disk-cache-size=33554432",
+    "--js-flags=--max-old-space-size=256",
+]
+
+
+class BrowserProfile:
+    """
+    How Chrome is started for the crawl. The default is a plain Chrome like the crawler always used,
+    the other switches leave out what the crawler never looks at.
+
+    :param name: str, shown in logs and benchmarks
+    :param headless: bool, run without a window
+    :param block_images: bool, don't load images
+    :param block_fonts: bool, don't load webfonts
+    :param block_third_party: bool, only resolve the portal, the router and the proxy, every other host fails
+    :param eager: bool, return from navigations at DOMContentLoaded instead of the load event
+    :param downloads: bool, save PDF and XML without asking and without opening the PDF viewer
+    :param lean: bool, chrome flags for many instances on one machine
+    """
+
+    def __init__(
+        self,
+        name="default",
+        headless=False,
+        block_images=False,
+        block_fonts=False,
+        block_third_party=False,
+        eager=False,
+        downloads=False,
+        lean=False,
+    ) -> None:
+        self.name = name
+        self.headless = headless
+        self.block_images = block_images
+        self.block_fonts = block_fonts
+        self.block_third_party = block_third_party
+        self.eager = eager
+        self.downloads = downloads
+        self.lean = lean
+
+    @property
+    def page_load_strategy(self):
+        return "eager" if self.eager else "normal"
+
+    def chrome_args(self, link, allowed_hosts=()):
+        """
+        :param link: str, the search page, its host is never blocked
+        :param allowed_hosts: list of str, further hosts to reach, e.g. the router or a proxy
+        :return: list of str, chrome command line switches
+        """
+        args = []
+        if self.headless:
+            args += ["--headless=new", "--window-size=1280,1024"]
+        if self.block_images:
+            args.append("--blink-settings=imagesEnabled=false")
+        if self.block_third_party:
+            hosts = [urlsplit(link).hostname] + [host for host in allowed_hosts if host]
+            exclusions = "".join(f", EXCLUDE {host}" for host in dict.fromkeys(hosts))
+            args.append(f"--host-resolver-rules=MAP * ~NOTFOUND{exclusions}")
+        if self.lean:
+            args += MEMORY_ARGS
+        return args
+
+    def prefs(self, download_dir=None):
+        prefs = {}
+        if download_dir:
+            prefs["download.default_directory"] = download_dir
+        if self.downloads:
+            prefs["download.prompt_for_download"] = False
+            prefs["download.directory_upgrade"] = True
+            prefs["plugins.always_open_pdf_externally"] = True
+            prefs["safebrowsing.enabled"] = False
+        if self.block_images:
+            prefs["profile.managed_default_content_settings.images"] = 2
+        return prefs
+
+    def blocked_urls(self):
+        return list(FONT_PATTERNS) if self.block_fonts else []
+
+    def __str__(self) -> str:
+        return self.name
+
+
+PROFILES = {
+    "default": BrowserProfile(),
+    "lean": BrowserProfile(
+        "lean", block_images=True, block_fonts=True, block_third_party=True, eager=True, downloads=True, lean=True
+    ),
+    "headless": BrowserProfile(
+        "headless",
+        headless=True,
+        block_images=True,
+        block_fonts=True,
+        block_third_party=True,
+        eager=True,
+        downloads=True,
+        lean=True,
+    ),
+}
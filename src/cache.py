@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from src.journal import company_key
+
+# fields of a search that decide what the portal answers
+KEY_FIELDS = ("search_key", "mode", "similar", "state", "zip_code", "city", "street")
+
+
+def matched(entry, company):
+    """:return: bool or None, whether the company was picked out of the multi-hit page, None if never tried"""
+    matches = entry.get("matched")
+    # caches of older runs hold one flag for whichever company searched first
+    return matches.get(company_key(company)) if isinstance(matches, dict) else None
+
+
+def is_known_hit(entry, company):
+    # a page whose hit was taken for this company. A single hit of a query shared with other companies,
+    # e.g. one keyword and the Bundesland, is another company's for all we know
+    return entry is not None and matched(entry, company) is True
+
+
+def is_known_miss(entry, company):
+    # no hit, or a multi-hit page without this company. Another company may well be on it
+    return entry is not None and (entry["count"] == 0 or (entry["count"] > 1 and matched(entry, company) is False))
+
+
+def search_key(params):
+    return json.dumps([params.get(field) for field in KEY_FIELDS], ensure_ascii=False)
+
+
+class SearchCache:
+    """
+    On-disk cache of search outcomes, so the same portal query is not sent twice.
+
+    :param path: str, json file holding the cache
+    :param ttl: float, seconds after which an outcome is considered stale
+    """
+
+    def __init__(self, path, ttl=30 * 24 * 3600) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, mode="r", encoding="utf-8") as file:
+                    self.entries = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Suchcache {path} konnte nicht gelesen werden: {e}")
+        self.expire()
+
+    def expire(self):
+        now = time.time()
+        self.entries = {key: entry for key, entry in self.entries.items() if now - entry["time"] < self.ttl}
+
+    def peek(self, params):
+        entry = self.entries.get(search_key(params))
+        if entry is None or time.time() - entry["time"] >= self.ttl:
+            return None
+        return entry
+
+    def get(self, params, company):
+        """
+        Looks up a search before it is sent. A known answer without a usable hit saves the portal query and counts
+        as a cache hit, everything else has to go to the portal and counts as a miss.
+
+        :param params: dict, keyword arguments of MyConnector.search
+        :param company: dict, the company searched for, multi-hit pages are judged for each company
+        :return: dict with "count" and "register" or None if the outcome is unknown
+        """
+        with self.lock:
+            entry = self.peek(params)
+            if is_known_miss(entry, company):
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, params, count, register=None, company=None, matched=None):
+        """
+        :param company: dict or None, the company searched for
+        :param matched: bool, whether a row of a multi-hit page was taken for the company
+        """
+        key = search_key(params)
+        with self.lock:
+            old = self.entries.get(key)
+            # other companies found on the same page stay known while the page is
+            matches = old["matched"] if old and old["count"] == count and isinstance(old.get("matched"), dict) else {}
+            if company is not None:
+                matches[company_key(company)] = count == 1 if matched is None else matched
+            self.entries[key] = {"count": count, "register": register, "matched": matches, "time": time.time()}
+
+    def set_register(self, params, register):
+        with self.lock:
+            entry = self.entries.get(search_key(params))
+            if entry is not None:
+                entry["register"] = register
+
+    def save(self):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, mode="w", encoding="utf-8") as file:
+                json.dump(self.entries, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def summary(self):
+        return f"Suchcache: {self.hits} Treffer, {self.misses} Fehlzugriffe, {len(self.entries)} Einträge"
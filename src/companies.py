@@ -0,0 +1,127 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+
+def iter_csv(file_path):
+    """Reads the company list row by row, like read_csv but without holding it in memory."""
+    with open(file_path, mode="r", newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file, delimiter=";"):
+            yield row
+
+
+def row_digest(row):
+    # exact duplicates only, every column has to match after trimming
+    text = "\x1f".join(f"{key}={str(value or '').strip()}" for key, value in sorted(row.items(), key=str))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class StateBatches:
+    """
+    The input list regrouped by Bundesland, so consecutive searches keep the same state filter.
+    The list is read once, duplicates are dropped and rows beyond memory_rows go to one temporary
+    JSON lines file per Bundesland, together with the digests seen so far. Iterating yields the companies
+    state after state, in the order the states first show up in the list and in file order within a state.
+    The owner removes the temporary files with close() once the crawl is done.
+
+    :param file_path: str, company list separated by semicolons
+    :param memory_rows: int, rows kept in memory before they are spilled to disk
+    :param spill_dir: str or None, parent directory of the temporary files
+    """
+
+    def __init__(self, file_path, memory_rows=10000, spill_dir=None) -> None:
+        self.file_path = file_path
+        self.memory_rows = memory_rows
+        self.spill_dir = spill_dir
+        self.directory = None
+        self.buffers = {}
+        self.buffered = 0
+        self.spilled = {}
+        self.seen = set()
+        self.digests = None
+        self.closed = False
+        self.counts = {}
+        self.rows = 0
+        self.duplicates = 0
+
+    def read(self, on_company=None):
+        """
+        Reads the whole list once.
+
+        :param on_company: callable(dict) or None, called for every company that is not a duplicate
+        :return: int, number of companies to crawl
+        """
+        for row in iter_csv(self.file_path):
+            self.rows += 1
+            digest = row_digest(row)
+            if self.is_duplicate(digest):
+                self.duplicates += 1
+                continue
+            self.seen.add(digest)
+            if on_company:
+                on_company(row)
+            state = str(row.get("Bundesland") or "")
+            self.counts[state] = self.counts.get(state, 0) + 1
+            self.buffers.setdefault(state, []).append(row)
+            self.buffered += 1
+            if self.buffered >= self.memory_rows:
+                self.spill()
+        return len(self)
+
+    def is_duplicate(self, digest):
+        if digest in self.seen:
+            return True
+        if self.digests is None:
+            return False
+        return self.digests.execute("SELECT 1 FROM seen WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def spill(self):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="companies-", dir=self.spill_dir)
+            self.digests = sqlite3.connect(os.path.join(self.directory, "seen.sqlite"))
+            self.digests.execute("CREATE TABLE seen (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        for state, rows in self.buffers.items():
+            if not rows:
+                continue
+            path = self.spilled.setdefault(state, os.path.join(self.directory, f"state-{len(self.spilled)}.jsonl"))
+            with open(path, mode="a", encoding="utf-8") as file:
+                for row in rows:
+                    file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            rows.clear()
+        # the digests follow the rows to disk, so memory stays bounded by memory_rows
+        with self.digests:
+            self.digests.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((digest,) for digest in self.seen))
+        self.seen.clear()
+        self.buffered = 0
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def __iter__(self):
+        if self.closed and self.spilled:
+            raise RuntimeError("StateBatches is closed, its spilled rows are gone")
+        for state in self.counts:
+            if state in self.spilled:
+                with open(self.spilled[state], mode="r", encoding="utf-8") as file:
+                    for line in file:
+                        yield json.loads(line)
+            yield from self.buffers.get(state, [])
+
+    def close(self):
+        self.closed = True
+        if self.digests is not None:
+            self.digests.close()
+            self.digests = None
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def summary(self):
+        return (
+            f"{self.rows} Zeilen gelesen, {self.duplicates} doppelte entfernt, "
+            f"{len(self)} Firmen in {len(self.counts)} Bundesländern"
+        )
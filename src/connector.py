@@ -0,0 +1,542 @@
+import os
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
+from src.browserprofile import BrowserProfile
+from src.downloads import DownloadWatcher, release as release_downloads
+from src.formfill import FILL_FORM, OPEN_IN_TAB, form_values
+from src.metrics import METRICS, timed
+from src.ratelimit import PortalError, Throttled
+from src.readiness import Readiness, NO_HITS, THROTTLED, ERROR, POLL_INTERVAL
+from src.results import parse_results
+from src.session import step_key
+
+# seconds for a result link to open its tab and for the download to begin there
+TAB_TIMEOUT = 10
+# seconds a portal page may take
+WAIT_TIMEOUT = 50
+SEARCH_BUTTON = '[id="form:btnSuche"]'
+DOWNLOAD_BUTTON = '[id="form:kostenpflichtigabrufen"]'
+
+
+def launch_browser(chrome_args, link, download_dir=None, profile=None):
+    """
+    Starts Chrome with the given arguments and opens link.
+
+    :param profile: BrowserProfile or None, preferences, load strategy and blocked urls, None for a plain Chrome
+    """
+    profile = profile or BrowserProfile()
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.page_load_strategy = profile.page_load_strategy
+    prefs = profile.prefs(download_dir)
+    if prefs:
+        chrome_options.add_experimental_option("prefs", prefs)
+    for argument in chrome_args:
+        chrome_options.add_argument(argument)
+    driver = webdriver.Chrome(options=chrome_options)
+    blocked = profile.blocked_urls()
+    if blocked:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+    driver.get(link)
+    return driver
+
+
+class MyConnector:
+    def __init__(
+        self,
+        link,
+        download_dir,
+        limiter=None,
+        fast_form=True,
+        chrome_args=(),
+        egress=None,
+        tabs=True,
+        download_timeout=60,
+        event_waits=True,
+        profile=None,
+        recorder=None,
+    ) -> None:
+        # the other portal pages live next to the search page, a local stand-in only has to keep the names
+        self.link = link
+        base = link.rsplit("/", 1)[0]
+        self.results_link = f"{base}/ergebnisse.xhtml"
+        self.charge_link = f"{base}/chargeinfo.xhtml"
+        self.egress = egress
+        self.limiter = egress.limiter if egress and egress.limiter else limiter
+        self.fast_form = fast_form
+        # fetch XML and PDF from one visit of the result page
+        self.tabs = tabs
+        # wait for pages with in-page events instead of polling through chromedriver
+        self.event_waits = event_waits
+        # calls and chromedriver round trips per way of filling the search form
+        self.form_stats = {"js": [0, 0], "elements": [0, 0]}
+        self.round_trips = 0
+        self.chrome_args = list(chrome_args)
+        self.profile = profile or BrowserProfile()
+        # SessionRecorder keeping every page seen, filed under the current search step
+        self.recorder = recorder
+        self.step = None
+        self.download_timeout = download_timeout
+        self.download_dir = os.path.join(os.getcwd(), download_dir)
+        self.downloads = DownloadWatcher(self.download_dir)
+        self.slots = []
+        # Bundesland ticked in the search form, it stays ticked while the next companies are in the same state
+        self.checked_state = None
+        self.start_browser()
+
+    def browser_args(self):
+        hosts = self.egress.hosts() if self.egress else []
+        args = self.profile.chrome_args(self.link, hosts) + self.chrome_args
+        return args + (self.egress.chrome_args() if self.egress else [])
+
+    def start_browser(self):
+        self.driver = launch_browser(self.browser_args(), self.link, self.download_dir, self.profile)
+        self.count_round_trips()
+
+    def adopt(self, driver):
+        """Takes over a browser started elsewhere, e.g. the standby browser of the Supervisor."""
+        self.driver = driver
+        self.count_round_trips()
+        try:
+            self.driver.execute_cdp_cmd(
+                "Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": self.download_dir}
+            )
+        except Exception:
+            pass
+        # whatever the dead browser was downloading won't arrive anymore
+        self.release_downloads()
+        self.checked_state = None
+        self.init_wait()
+
+    def switch_egress(self, egress):
+        """Restarts the browser on another egress, chrome can't change its proxy while running."""
+        if not self.downloads.wait_idle(self.download_timeout):
+            print("\nDownloads nicht fertig, Browser wird trotzdem neu gestartet")
+        self.driver.quit()
+        self.egress = egress
+        if egress.limiter:
+            self.limiter = egress.limiter
+        self.start_browser()
+        self.init_wait()
+
+    def init_wait(self):
+        self.wait = WebDriverWait(self.driver, WAIT_TIMEOUT, poll_frequency=POLL_INTERVAL)
+        self.ready = Readiness(self.driver, WAIT_TIMEOUT, events=self.event_waits)
+
+    def wait_for_search_page(self):
+        self.ready.until("search_page", url=self.link, selector=SEARCH_BUTTON)
+
+    def wait_for_charge_page(self):
+        self.ready.until("charge_page", url=self.charge_link, selector=DOWNLOAD_BUTTON, outcomes=(THROTTLED, ERROR))
+
+    def count_round_trips(self):
+        # every WebDriver command, including the ones of WebElements, goes through driver.execute
+        execute = self.driver.execute
+
+        def counted(driver_command, params=None):
+            self.round_trips += 1
+            return execute(driver_command, params)
+
+        self.driver.execute = counted
+
+    def record_form(self, path, start):
+        self.form_stats[path][0] += 1
+        self.form_stats[path][1] += self.round_trips - start
+
+    def form_summary(self):
+        parts = []
+        for path, (calls, round_trips) in self.form_stats.items():
+            if calls:
+                parts.append(f"{path}: {calls} Formulare, {round_trips / calls:.1f} Aufrufe je Formular")
+        return ", ".join(parts)
+
+    def set_step(self, company, word, mode):
+        """The company, search word and index in SEARCHMODES the next pages belong to."""
+        self.step = step_key(company, word, mode)
+
+    def record(self, kind, **data):
+        if self.recorder:
+            self.recorder.record(self.step, kind, **data)
+
+    def record_page(self, kind, **data):
+        # the page source is only fetched from the browser while recording
+        if self.recorder:
+            self.recorder.record(self.step, kind, page=self.driver.page_source, **data)
+
+    def fill_form(self, fields, states, mode="all", similar=False, submit=None):
+        self.driver.execute_script(FILL_FORM, form_values(fields, states, mode, similar, submit))
+
+    def request(self, kind, amount=1, rotate=False):
+        # every page the portal has to serve counts against the rate limit
+        if self.limiter:
+            self.limiter.acquire(kind, amount, self if rotate else None)
+
+    def expect_download(self, suffix, table=None):
+        # point chrome at a directory of its own for this one download
+        slot = self.downloads.expect(suffix)
+        try:
+            self.driver.execute_cdp_cmd(
+                "Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": slot.directory}
+            )
+        except Exception:
+            slot.release()
+            slot = self.downloads.expect(suffix, own_directory=False)
+        slot.label = {"step": self.step, "table": table}
+        self.slots.append(slot)
+
+    def take_downloads(self):
+        """Hands the pending downloads over to someone else to wait for, the browser can go on meanwhile."""
+        slots, self.slots = self.slots, []
+        return slots
+
+    def release_downloads(self):
+        release_downloads(self.slots)
+        self.slots = []
+
+    @timed("open_search_page")
+    def open_search_page(self):
+        self.request("page")
+        self.driver.get(self.link)
+
+    @timed("back_to_search")
+    def back_to_search(self):
+        self.request("page")
+        self.driver.back()
+        self.wait_for_search_page()
+
+    @timed("search")
+    def search(
+        self,
+        search_key: str,
+        searchfieldID="form:schlagwoerter",
+        mode="all",
+        similar=False,
+        submitID="form:btnSuche",
+        state=None,
+        zip_code=None,
+        zip_ID="form:postleitzahl",
+        city=None,
+        city_ID="form:ort",
+        street=None,
+        street_ID="form:strasse",
+        register=None,
+        register_ID="form:registerNummer",
+    ):
+        self.request("search", rotate=True)
+        self.record(
+            "search",
+            search_key=search_key,
+            mode=mode,
+            similar=similar,
+            state=state,
+            zip_code=zip_code,
+            city=city,
+            street=street,
+            register=register,
+        )
+        start = self.round_trips
+        self.wait_for_search_page()
+        if self.fast_form:
+            try:
+                fields = {
+                    searchfieldID: search_key,
+                    zip_ID: zip_code,
+                    city_ID: city,
+                    street_ID: street,
+                    register_ID: register,
+                }
+                self.fill_form(fields, self.state_changes(state), mode, similar, submitID)
+                self.record_form("js", start)
+                self.checked_state = state
+                return
+            except (WebDriverException, KeyError) as e:
+                print(f"\nFormular per JavaScript fehlgeschlagen, fülle Feld für Feld: {e}")
+                start = self.round_trips
+        searchfield = self.driver.find_element(By.ID, searchfieldID)
+        searchfield.clear()
+        searchfield.send_keys(search_key)
+
+        for changed_state, wanted in self.state_changes(state).items():
+            self.tick_state(changed_state, wanted)
+        self.checked_state = state
+
+        zip_input = self.driver.find_element(By.ID, zip_ID)
+        zip_input.clear()
+        if zip_code:
+            zip_input.send_keys(zip_code)
+
+        city_input = self.driver.find_element(By.ID, city_ID)
+        city_input.clear()
+        if city:
+            city_input.send_keys(city)
+
+        street_input = self.driver.find_element(By.ID, street_ID)
+        street_input.clear()
+        if street:
+            street_input.send_keys(street)
+
+        register_input = self.driver.find_element(By.ID, register_ID)
+        register_input.clear()
+        if register:
+            register_input.send_keys(register)
+
+        self.select_search_options(mode, similar)
+
+        submit_button = self.driver.find_element(By.ID, submitID)
+        self.driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
+        self.wait.until(EC.element_to_be_clickable(submit_button))
+
+        submit_button.click()
+        self.record_form("elements", start)
+
+    def state_changes(self, state):
+        """Checkboxes to change for a search in state, the previous state is unticked only when it differs."""
+        changes = {}
+        if self.checked_state and self.checked_state != state:
+            changes[self.checked_state] = False
+        if state:
+            changes[state] = True
+        return changes
+
+    def tick_state(self, state, wanted):
+        state_input = self.driver.find_element(By.ID, f"form:{state}_input")
+        if (state_input.get_attribute("aria-checked") == "true") != wanted:
+            state_checkbox = self.driver.find_element(By.ID, f"form:{state}")
+            self.wait.until(EC.element_to_be_clickable(state_checkbox))
+            state_checkbox.click()
+
+    @timed("reset_search")
+    def reset_search(
+        self,
+        state=None,
+        keep_state=True,
+        searchfieldID="form:schlagwoerter",
+        zip_ID="form:postleitzahl",
+        city_ID="form:ort",
+        street_ID="form:strasse",
+        register_ID="form:registerNummer",
+    ):
+        start = self.round_trips
+        self.wait_for_search_page()
+        # the state filter is left for the next search, which unticks it if that company is elsewhere
+        untick = {} if keep_state or not state else {state: False}
+        if self.fast_form:
+            try:
+                fields = {searchfieldID: None, zip_ID: None, city_ID: None, street_ID: None, register_ID: None}
+                self.fill_form(fields, untick)
+                self.record_form("js", start)
+                if untick:
+                    self.checked_state = None
+                return
+            except WebDriverException as e:
+                print(f"\nFormular per JavaScript fehlgeschlagen, leere Feld für Feld: {e}")
+                start = self.round_trips
+        searchfield = self.driver.find_element(By.ID, searchfieldID)
+        searchfield.clear()
+
+        for changed_state, wanted in untick.items():
+            self.tick_state(changed_state, wanted)
+            self.checked_state = None
+
+        zip_input = self.driver.find_element(By.ID, zip_ID)
+        zip_input.clear()
+        city_input = self.driver.find_element(By.ID, city_ID)
+        city_input.clear()
+        street_input = self.driver.find_element(By.ID, street_ID)
+        street_input.clear()
+        register_input = self.driver.find_element(By.ID, register_ID)
+        register_input.clear()
+        self.select_search_options("all", False)
+        self.record_form("elements", start)
+
+    def select_search_options(self, mode="all", similar=False):
+        options_form = self.driver.find_element(By.ID, "form:schlagwortOptionen")
+        radio_buttons = options_form.find_elements(By.CLASS_NAME, "ui-g")
+        if mode == "all":
+            childdivs = radio_buttons[0].find_elements(By.CSS_SELECTOR, "div")
+            self.wait.until(EC.element_to_be_clickable(childdivs[1]))
+            childdivs[1].click()
+        elif mode == "exact":
+            childdivs = radio_buttons[2].find_elements(By.CSS_SELECTOR, "div")
+            self.wait.until(EC.element_to_be_clickable(childdivs[1]))
+            childdivs[1].click()
+        elif mode == "min":
+            childdivs = radio_buttons[1].find_elements(By.CSS_SELECTOR, "div")
+            self.wait.until(EC.element_to_be_clickable(childdivs[1]))
+            childdivs[1].click()
+        else:
+            self.log_error("search mode not available")
+
+        if similar:
+            similar_checkbox = self.driver.find_element(By.ID, "form:aenlichLautendeSchlagwoerterBoolChkbox")
+            self.wait.until(EC.element_to_be_clickable(similar_checkbox))
+            similar_checkbox.click()
+
+    def summary(self):
+        return self.form_summary()
+
+    def close_connection(self):
+        self.driver.close()
+        if self.egress:
+            self.egress.rotation.release(self.egress)
+
+    @timed("results_count")
+    def results_count(self):
+        """
+        :raises Throttled: when the portal shows its throttling page
+        :raises PortalError: when the portal shows an error page
+        """
+        try:
+            state = self.ready.until(
+                "results", url=self.results_link, selector="table", outcomes=(THROTTLED, ERROR, NO_HITS)
+            )
+        except Throttled:
+            self.record("results", outcome=THROTTLED)
+            raise
+        except PortalError:
+            self.record_page("results", outcome=ERROR)
+            raise
+        if self.limiter:
+            self.limiter.passed()
+        count = 0 if state == NO_HITS else len(self.driver.find_elements(By.TAG_NAME, "table")) - 1
+        self.record_page("results", outcome=state, count=count)
+        return count
+
+    def result_rows(self):
+        # one snapshot of the page instead of a WebDriver call per cell
+        return parse_results(self.driver.page_source)
+
+    @timed("save_results")
+    def save_results(self, tablenumber: int = 1):
+        if self.tabs:
+            return self.save_results_in_tabs(tablenumber)
+        try:
+            self.save_result_xml(tablenumber)
+        except Exception as e:
+            self.log_error(f"PDF konnte nicht gespeichert werden: {str(e)}")
+
+        self.request("page")
+        self.driver.back()
+        try:
+            self.save_result_pdf(tablenumber)
+        except Exception as e:
+            self.log_error(f"PDF konnte nicht gespeichert werden: {str(e)}")
+        self.request("page")
+        self.driver.back()
+        return True
+
+    def save_results_in_tabs(self, tablenumber: int = 1):
+        """
+        Opens the charge page of the XML and of the PDF in a tab each, so the result page stays loaded
+        and doesn't have to be loaded again after each document, saving two page loads per hit.
+        """
+        results_window = self.driver.current_window_handle
+        try:
+            for suffix, link_index in ((".xml", -1), (".pdf", 0)):
+                try:
+                    if self.download_in_tab(tablenumber, link_index, suffix, results_window):
+                        METRICS.count("page_loads_saved")
+                except Exception as e:
+                    self.log_error(f"{suffix[1:].upper()} konnte nicht gespeichert werden: {str(e)}")
+        finally:
+            # log_error raises, the retry and the next company have to find the result page focused
+            self.close_tabs(results_window)
+        return True
+
+    def result_links(self, tablenumber):
+        tables = self.driver.find_elements(By.TAG_NAME, "table")
+        rows = tables[tablenumber].find_elements(By.TAG_NAME, "tr")
+        colums = rows[1].find_elements(By.TAG_NAME, "td")
+        return colums[3].find_elements(By.TAG_NAME, "a")
+
+    @timed("download_in_tab")
+    def download_in_tab(self, tablenumber, link_index, suffix, results_window):
+        """
+        :return: bool, whether the document came through a tab, False if the link opened in the same window
+        """
+        link = self.result_links(tablenumber)[link_index]
+        known = set(self.driver.window_handles)
+        self.request("page")
+        self.driver.execute_script(OPEN_IN_TAB, link)
+        WebDriverWait(self.driver, TAB_TIMEOUT, poll_frequency=POLL_INTERVAL).until(
+            lambda driver: set(driver.window_handles) - known or driver.current_url == self.charge_link
+        )
+        new_windows = set(self.driver.window_handles) - known
+        in_tab = bool(new_windows)
+        if in_tab:
+            self.driver.switch_to.window(new_windows.pop())
+        self.wait_for_charge_page()
+        self.record_page("charge", suffix=suffix, table=tablenumber)
+        download_button = self.driver.find_element(By.ID, "form:kostenpflichtigabrufen")
+        self.request("download")
+        self.expect_download(suffix, tablenumber)
+        download_button.click()
+        if not in_tab:
+            # the page ignored the target, back to the results like save_results does
+            self.request("page")
+            self.driver.back()
+            return False
+        # closing the tab before the download began would cancel it
+        slot = self.slots[-1]
+        WebDriverWait(self.driver, TAB_TIMEOUT, poll_frequency=0.1).until(lambda driver: slot.started)
+        self.close_tabs(results_window)
+        return True
+
+    def close_tabs(self, results_window):
+        for window in self.driver.window_handles:
+            if window != results_window:
+                self.driver.switch_to.window(window)
+                self.driver.close()
+        self.driver.switch_to.window(results_window)
+
+    @timed("save_result_xml")
+    def save_result_xml(self, tablenumber: int = 1):
+        links = self.result_links(tablenumber)
+        self.request("page")
+        links[-1].click()
+        self.wait_for_charge_page()
+        self.record_page("charge", suffix=".xml", table=tablenumber)
+        download_button = self.driver.find_element(By.ID, "form:kostenpflichtigabrufen")
+        self.request("download")
+        self.expect_download(".xml", tablenumber)
+        download_button.click()
+
+    @timed("save_result_pdf")
+    def save_result_pdf(self, tablenumber: int = 1):
+        links = self.result_links(tablenumber)
+        self.request("page")
+        links[0].click()
+        self.wait_for_charge_page()
+        self.record_page("charge", suffix=".pdf", table=tablenumber)
+        download_button = self.driver.find_element(By.ID, "form:kostenpflichtigabrufen")
+        self.request("download")
+        self.expect_download(".pdf", tablenumber)
+        download_button.click()
+
+    def log_error(self, msg):
+        print("error occurred:", msg)
+        raise Exception(msg)
+
+    @timed("change_ip")
+    def change_ip(self, link, psw, waiting_time):
+        self.driver.get(link)
+        self.wait.until(EC.url_to_be(link))
+        if link == "http://fritz.box/":
+            input_psw = self.driver.find_element(By.ID, "uiPassInput")
+            submit_psw = self.driver.find_element(By.ID, "submitLoginBtn")
+            input_psw.send_keys(psw)
+            self.wait.until(EC.element_to_be_clickable(submit_psw))
+            submit_psw.click()
+            self.wait.until(EC.url_to_be(str(link + "#overview")))
+            self.driver.get(str(link + "#netMoni"))
+            self.wait.until(EC.url_to_be(str(link + "#netMoni")))
+            self.wait.until(EC.presence_of_element_located((By.ID, "uiReconnectBtn")))
+            button_reconnect = self.driver.find_element(By.ID, "uiReconnectBtn")
+            self.wait.until(EC.element_to_be_clickable(button_reconnect))
+            button_reconnect.click()
+            return waiting_time
+        else:
+            return 200
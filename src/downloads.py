@@ -0,0 +1,236 @@
+import ctypes
+import ctypes.util
+import itertools
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+
+# suffixes of files a browser is still writing to
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".tmp", ".download")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class DownloadTimeout(Exception):
+    pass
+
+
+def is_complete(filename):
+    return not filename.startswith(".") and not filename.endswith(PARTIAL_SUFFIXES)
+
+
+class Inotify:
+    """Minimal inotify binding via ctypes, only available on Linux."""
+
+    libc = None
+
+    def __init__(self, directory) -> None:
+        if Inotify.libc is None:
+            Inotify.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout):
+        """Blocks until something happened in the directory or the timeout is over."""
+        readable, _, _ = select.select([self.fd], [], [], max(0, timeout))
+        if readable:
+            try:
+                # the events only wake us up, the directory is listed afterwards anyway
+                os.read(self.fd, 64 * (EVENT_HEADER.size + 256))
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller:
+    def __init__(self, directory, interval=0.2) -> None:
+        self.interval = interval
+
+    def wait(self, timeout):
+        time.sleep(max(0, min(self.interval, timeout)))
+
+    def close(self):
+        pass
+
+
+def watch(directory):
+    if sys.platform.startswith("linux"):
+        try:
+            return Inotify(directory)
+        except (OSError, AttributeError, TypeError):
+            pass
+    return Poller(directory)
+
+
+class DownloadSlot:
+    """
+    One expected download. With its own directory, the browser is told to save exactly this download there,
+    otherwise the slot claims the first new complete file with its suffix in the shared directory.
+    """
+
+    def __init__(self, watcher, suffix, directory, known) -> None:
+        self.watcher = watcher
+        self.suffix = suffix
+        self.directory = directory
+        self.known = known
+        self.path = None
+        # what started the download, e.g. the search step for a session recording
+        self.label = None
+
+    @property
+    def own_directory(self):
+        return self.directory != self.watcher.directory
+
+    def find(self):
+        for filename in sorted(os.listdir(self.directory)):
+            if filename in self.known or not is_complete(filename):
+                continue
+            if not filename.lower().endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            if self.watcher.claim(path):
+                return path
+        return None
+
+    def wait(self, timeout=60):
+        """
+        :return: str, path of the finished file
+        :raises DownloadTimeout: if no finished file showed up in time
+        """
+        if self.path:
+            return self.path
+        deadline = time.time() + timeout
+        watcher = watch(self.directory)
+        try:
+            # the watch is set before the first look, so no event can slip through in between
+            while True:
+                self.path = self.find()
+                if self.path:
+                    return self.path
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise DownloadTimeout(f"Kein {self.suffix}-Download in {timeout}s")
+                watcher.wait(remaining)
+        finally:
+            watcher.close()
+
+    @property
+    def started(self):
+        """Whether the browser began writing the file, after that it no longer needs the page that started it."""
+        try:
+            return any(filename not in self.known for filename in os.listdir(self.directory))
+        except FileNotFoundError:
+            return False
+
+    @property
+    def arrived(self):
+        """Whether the file is complete, even if nobody waited for it yet."""
+        if self.path:
+            return True
+        try:
+            filenames = os.listdir(self.directory)
+        except FileNotFoundError:
+            return True
+        return any(
+            filename not in self.known and is_complete(filename) and filename.lower().endswith(self.suffix)
+            for filename in filenames
+        )
+
+    def release(self):
+        self.watcher.forget(self)
+        if self.own_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class DownloadWatcher:
+    """
+    Hands out a slot for every download action, so each finished file is matched to the click that started it.
+
+    :param directory: str, download directory of one browser
+    """
+
+    def __init__(self, directory) -> None:
+        self.directory = directory
+        self.counter = itertools.count()
+        self.claimed = set()
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def claim(self, path):
+        with self.lock:
+            if path in self.claimed:
+                return False
+            self.claimed.add(path)
+            return True
+
+    def forget(self, slot):
+        with self.lock:
+            if slot in self.pending:
+                self.pending.remove(slot)
+
+    def wait_idle(self, timeout=60):
+        """Waits until every expected download is complete, e.g. before the browser writing them is closed."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                pending = [slot for slot in self.pending if not slot.arrived]
+            if not pending:
+                return True
+            time.sleep(0.2)
+        return False
+
+    def expect(self, suffix, own_directory=True):
+        """
+        :param suffix: str, file ending of the expected download, e.g. ".xml"
+        :param own_directory: bool, create a directory only this download goes to
+        """
+        suffix = suffix.lower()
+        if own_directory:
+            directory = os.path.join(self.directory, f"slot-{next(self.counter)}{suffix.replace('.', '-')}")
+            os.makedirs(directory, exist_ok=True)
+            slot = DownloadSlot(self, suffix, directory, set())
+        else:
+            slot = DownloadSlot(self, suffix, self.directory, set(os.listdir(self.directory)))
+        with self.lock:
+            self.pending.append(slot)
+        return slot
+
+
+def collect(slots, timeout=60):
+    """
+    Waits for the given downloads.
+
+    :return: dict, suffix -> path of the finished file, missing downloads are left out
+    """
+    files = {}
+    for slot in slots:
+        if slot.suffix in files:
+            # a repeated click, the first file of that kind is taken
+            continue
+        try:
+            files[slot.suffix] = slot.wait(timeout)
+        except DownloadTimeout as e:
+            print(f"\n{e}")
+    return files
+
+
+def release(slots):
+    for slot in slots:
+        slot.release()
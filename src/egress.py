@@ -0,0 +1,296 @@
+import re
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+import socks
+from src.metrics import METRICS
+from src.utility import countdown
+
+FRITZBOX_UPNP = "http://fritz.box:49000/igdupnp/control/WANIPConn1"
+WANIP_SERVICE = "urn:schemas-upnp-org:service:WANIPConnection:1"
+SOAP_ENVELOPE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" '
+    's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">'
+    '<s:Body><u:{action} xmlns:u="{service}"/></s:Body></s:Envelope>'
+)
+PROXY_TYPES = {"http": socks.HTTP, "socks4": socks.SOCKS4, "socks5": socks.SOCKS5, "socks5h": socks.SOCKS5}
+
+
+class Egress:
+    """
+    One way out to the portal: the own line or a proxy. Browsers pinned to it share its request budget.
+
+    :param name: str, shown in logs and summaries
+    :param proxy: str or None, proxy url like socks5://host:port, None for a direct connection
+    :param limiter: RateLimiter or None, request budget of this egress
+    """
+
+    def __init__(self, name, proxy=None, limiter=None) -> None:
+        self.name = name
+        self.proxy = proxy
+        self.limiter = limiter
+        # the EgressRotation handing it out
+        self.rotation = None
+        self.sessions = 0
+        self.failures = 0
+        self.cooldowns = 0
+        self.cooldown_until = 0.0
+        self.healthy = True
+
+    @property
+    def cooling(self):
+        return time.time() < self.cooldown_until
+
+    def chrome_args(self):
+        if not self.proxy:
+            return []
+        # chrome sends loopback addresses around the proxy unless told otherwise
+        return [f"--proxy-server={self.proxy}", "--proxy-bypass-list=<-loopback>"]
+
+    def hosts(self):
+        """Hosts the browser has to reach besides the portal, for browser profiles that block all others."""
+        hosts = [urlsplit(self.proxy).hostname] if self.proxy else []
+        return hosts + (self.rotation.hosts() if self.rotation else [])
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def open_socket(proxy, address, timeout):
+    """Connects to address through a proxy url with PySocks, HTTP proxies are tunnelled with CONNECT."""
+    parts = urlsplit(proxy)
+    sock = socks.socksocket()
+    sock.set_proxy(
+        PROXY_TYPES[parts.scheme],
+        parts.hostname,
+        parts.port,
+        rdns=parts.scheme in ("socks5h", "http"),
+        username=parts.username,
+        password=parts.password,
+    )
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+
+class EgressRotation:
+    """
+    Hands every browser an egress and replaces it when the portal budget of that egress is used up.
+    Egresses that failed a health check or got throttled cool down for a while, longer each time in a row.
+
+    :param egresses: list of Egress
+    :param target: str, url whose host the health check connects to
+    :param cooldown: float, seconds of the first cool-down of an egress
+    :param max_cooldown: float, longest cool-down
+    :param timeout: float, seconds a health check may take
+    """
+
+    def __init__(self, egresses, target, cooldown=600, max_cooldown=3600, timeout=10) -> None:
+        self.egresses = egresses
+        for egress in egresses:
+            egress.rotation = self
+        parts = urlsplit(target)
+        self.target = (parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.rotations = 0
+
+    @property
+    def limiters(self):
+        return [egress.limiter for egress in self.egresses if egress.limiter]
+
+    def hosts(self):
+        return []
+
+    def check(self, egress):
+        """Whether the portal host can be reached through the egress."""
+        start = time.perf_counter()
+        try:
+            if egress.proxy:
+                sock = open_socket(egress.proxy, self.target, self.timeout)
+            else:
+                sock = socket.create_connection(self.target, self.timeout)
+            sock.close()
+            egress.healthy = True
+        except (OSError, socks.ProxyError) as e:
+            print(f"\nEgress {egress} nicht erreichbar: {e}")
+            egress.healthy = False
+            METRICS.count("egress_unhealthy")
+        METRICS.observe("egress_check", time.perf_counter() - start)
+        return egress.healthy
+
+    def cool_down(self, egress):
+        wait = min(self.max_cooldown, self.cooldown * 2**egress.failures)
+        egress.failures += 1
+        egress.cooldowns += 1
+        egress.cooldown_until = time.time() + wait
+        METRICS.count("egress_cooldown")
+
+    def assign(self, exclude=None):
+        """
+        Pins a browser to the least used egress that is neither cooling down nor failing its health check.
+
+        :return: Egress or None if every egress is unavailable
+        """
+        with self.lock:
+            candidates = sorted(
+                (egress for egress in self.egresses if egress is not exclude and not egress.cooling),
+                key=lambda egress: egress.sessions,
+            )
+            for egress in candidates:
+                if self.check(egress):
+                    egress.sessions += 1
+                    egress.failures = 0
+                    return egress
+                self.cool_down(egress)
+            return None
+
+    def release(self, egress):
+        with self.lock:
+            egress.sessions = max(0, egress.sessions - 1)
+
+    def rotate(self, connection):
+        """
+        Gives the connection a fresh budget once its egress is used up.
+
+        :return: bool, whether it did
+        """
+        return False
+
+    def throttled(self, connection):
+        """Called when the portal throttled the egress of a connection. Returns whether it moved to another one."""
+        return False
+
+    def summary(self):
+        states = []
+        for egress in self.egresses:
+            state = "abkühlend" if egress.cooling else ("ok" if egress.healthy else "gestört")
+            states.append(f"{egress} {state}, {egress.cooldowns}x abgekühlt")
+        return f"Egress: {self.rotations} Wechsel; " + "; ".join(states)
+
+
+class DirectEgress(EgressRotation):
+    """The own line without any way to get a new address, an empty budget is simply waited for."""
+
+    def __init__(self, target, limiter=None, **kwargs) -> None:
+        super().__init__([Egress("direkt", limiter=limiter)], target, **kwargs)
+
+    def assign(self, exclude=None):
+        # there is no other way out, so no health check decides about it
+        egress = self.egresses[0]
+        with self.lock:
+            egress.sessions += 1
+        return egress
+
+
+class FritzboxEgress(DirectEgress):
+    """
+    The own line behind a Fritzbox, reconnected over UPnP (TR-064 "Zugriff für Anwendungen" has to be allowed).
+    Without UPnP it falls back to clicking reconnect in the router web interface with the browser.
+    All browsers share the line, so a reconnect blocks everyone until the new address is up.
+
+    :param password: str or None, password of the router web interface for the fallback
+    :param wait: float, seconds to wait at most for the new address
+    """
+
+    def __init__(self, target, limiter=None, password=None, wait=45, router="http://fritz.box/", **kwargs) -> None:
+        super().__init__(target, limiter, **kwargs)
+        self.egresses[0].name = "fritzbox"
+        self.password = password
+        self.wait = wait
+        self.router = router
+
+    def hosts(self):
+        # the web interface fallback of rotate opens the router in the crawling browser
+        return [urlsplit(self.router).hostname]
+
+    def upnp(self, action):
+        request = urllib.request.Request(
+            FRITZBOX_UPNP,
+            data=SOAP_ENVELOPE.format(action=action, service=WANIP_SERVICE).encode("utf-8"),
+            headers={"Content-Type": 'text/xml; charset="utf-8"', "SoapAction": f"{WANIP_SERVICE}#{action}"},
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read().decode("utf-8", errors="replace")
+
+    def external_ip(self):
+        try:
+            match = re.search(r"<NewExternalIPAddress>([^<]*)<", self.upnp("GetExternalIPAddress"))
+        except (OSError, urllib.error.URLError):
+            return None
+        return match.group(1) if match and match.group(1) else None
+
+    def rotate(self, connection):
+        with self.lock:
+            start = time.perf_counter()
+            old_ip = self.external_ip()
+            try:
+                self.upnp("ForceTermination")
+            except (OSError, urllib.error.URLError) as e:
+                if not self.password:
+                    print(f"\nFritzbox Reconnect per UPnP fehlgeschlagen: {e}")
+                    return False
+                # the way it was always done, through the router web interface
+                countdown(connection.change_ip(self.router, self.password, self.wait))
+            else:
+                deadline = time.time() + self.wait
+                while time.time() < deadline:
+                    time.sleep(2)
+                    new_ip = self.external_ip()
+                    if new_ip and new_ip != old_ip:
+                        break
+            self.rotations += 1
+            METRICS.observe("egress_rotate", time.perf_counter() - start)
+            return True
+
+
+class ProxyEgress(EgressRotation):
+    """
+    A fixed list of HTTP or SOCKS proxies, every browser runs through its own one. A used up or throttled proxy
+    cools down and the browser is restarted on the next free proxy. Chrome can't log in to proxies,
+    so they have to work without credentials (e.g. allowed by address).
+
+    :param proxies: list of str, proxy urls like http://10.0.0.2:3128 or socks5://10.0.0.3:1080
+    :param make_limiter: callable() -> RateLimiter, budget for each proxy
+    """
+
+    def __init__(self, proxies, target, make_limiter=None, **kwargs) -> None:
+        egresses = []
+        for proxy in proxies:
+            scheme = urlsplit(proxy).scheme
+            if scheme not in PROXY_TYPES:
+                raise ValueError(f"Unbekannter Proxy-Typ {scheme!r} in {proxy}")
+            egresses.append(Egress(urlsplit(proxy).netloc, proxy, make_limiter() if make_limiter else None))
+        if not egresses:
+            raise ValueError("Keine Proxys angegeben")
+        super().__init__(egresses, target, **kwargs)
+
+    def move(self, connection):
+        old = connection.egress
+        new = self.assign(exclude=old)
+        if new is None:
+            return False
+        self.release(old)
+        connection.switch_egress(new)
+        with self.lock:
+            self.rotations += 1
+        return True
+
+    def rotate(self, connection):
+        with self.lock:
+            self.cool_down(connection.egress)
+        return self.move(connection)
+
+    def throttled(self, connection):
+        return self.rotate(connection)
+
+
+def read_proxies(path):
+    with open(path, mode="r", encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
@@ -0,0 +1,278 @@
+"""
+Builds results.csv again from the XML files already on disk, without opening a browser.
+
+    python -m src.extract --input mitglieder.csv
+
+Parsed files are remembered in cache/extract_state.json by size and mtime, their extraction is kept in one
+file each under cache/extract_state/. A file is only parsed again when its size or mtime changed.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.reader import StreamingDataXML
+from src.utility import read_csv, result_filename
+
+RESULTS_DIR = "results"
+BACKUP_DIR = "storage"
+EXTRACT_STATE = os.path.join("cache", "extract_state.json")
+RESULT_HEADERS = [
+    "Name",
+    "Vorname",
+    "Rolle",
+    "Firma",
+    "Rechtsform",
+    "Registernummer",
+    "Bundesland",
+    "Ort",
+    "PLZ",
+    "Straße",
+    "Code_Vertretungsberechtigung",
+    "Freitext_Vertretungsberechtigung",
+    "Hinweis",
+]
+
+
+def result_lines(company, associates, ass_companies, vertretung, msg):
+    """One row per person and organization of an extracted XML file, in the columns of RESULT_HEADERS."""
+    lines = []
+    for ass_compony in ass_companies:
+        for associate in associates:
+            line = {
+                "Name": associate["Nachname"],
+                "Vorname": associate["Vorname"],
+                "Rolle": associate["Code"],
+                "Firma": ass_compony["Bezeichnung"],
+                "Rechtsform": ass_compony["Rechtsform"],
+                "Registernummer": ass_compony["Registernummer"],
+                "Bundesland": company.get("Bundesland"),
+                "Ort": company.get("Ort"),
+                "PLZ": company.get("PLZ"),
+                "Straße": company.get("Straße"),
+                "Code_Vertretungsberechtigung": str(vertretung.get("codes")),
+                "Freitext_Vertretungsberechtigung": str(vertretung["texts"]).replace("\n", " ").strip(),
+                "Hinweis": msg,
+            }
+            lines.append(line)
+    return lines
+
+
+def error_line(company, msg):
+    return {
+        "Name": None,
+        "Vorname": None,
+        "Rolle": None,
+        "Firma": company["Firma"],
+        "Rechtsform": None,
+        "Registernummer": None,
+        "Bundesland": company["Bundesland"],
+        "Ort": company["Ort"],
+        "PLZ": company["PLZ"],
+        "Straße": company["Straße"],
+        "Code_Vertretungsberechtigung": None,
+        "Freitext_Vertretungsberechtigung": None,
+        "Hinweis": msg,
+    }
+
+
+def xml_folders(results_dir=RESULTS_DIR, backup_dir=BACKUP_DIR):
+    """The XML folder of the current results first, then the backups from newest to oldest."""
+    folders = [os.path.join(results_dir, "XML")]
+    if os.path.isdir(backup_dir):
+        for backup in sorted(os.listdir(backup_dir), reverse=True):
+            folders.append(os.path.join(backup_dir, backup, "XML"))
+    return [folder for folder in folders if os.path.isdir(folder)]
+
+
+def newest_files(folders):
+    """
+    :return: dict, company name (the file name the crawler gave the XML) to the newest file of that company
+    """
+    files = {}
+    for folder in folders:
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(".xml"):
+                files.setdefault(filename[: -len(".xml")], os.path.join(folder, filename))
+    return files
+
+
+def parse_file(path):
+    """Runs in the worker processes. Returns the extracted data or the error."""
+    try:
+        associates, ass_companies, vertretung = StreamingDataXML(path).extract_all()
+        return path, {"persons": associates, "organizations": ass_companies, "vertretung": vertretung}, None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def pdf_path(xml_path):
+    """The PDF the crawler stored next to an XML file, <folder>/PDF/<name>.pdf beside <folder>/XML/<name>.xml."""
+    folder = os.path.dirname(os.path.dirname(xml_path))
+    name = os.path.splitext(os.path.basename(xml_path))[0]
+    return os.path.join(folder, "PDF", f"{name}.pdf")
+
+
+def file_message(xml_path, name):
+    """The Hinweis of a file, as the crawl would have written it for the files that are there."""
+    if not os.path.exists(pdf_path(xml_path)):
+        return "Corresponding PDF file not found."
+    return f"Success. Dateien unter {name} gespeichert"
+
+
+class ExtractState:
+    """
+    Size and mtime of every parsed file, its extraction is kept in a file of its own next to the state,
+    so a run only writes what it parsed again.
+
+    :param path: str, json file holding the state
+    """
+
+    def __init__(self, path=EXTRACT_STATE) -> None:
+        self.path = path
+        self.data_dir = os.path.splitext(path)[0]
+        self.files = {}
+        self.modified = False
+        if os.path.exists(path):
+            try:
+                with open(path, mode="r", encoding="utf-8") as file:
+                    self.files = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Extraktionsstand {path} konnte nicht gelesen werden, alle Dateien werden neu gelesen: {e}")
+
+    def data_path(self, path):
+        return os.path.join(self.data_dir, f"{hashlib.sha1(path.encode('utf-8')).hexdigest()}.json")
+
+    def changed(self, path):
+        """Whether a file has to be parsed again."""
+        stat = os.stat(path)
+        entry = self.files.get(path)
+        if not entry or not os.path.exists(self.data_path(path)):
+            return True
+        return entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime
+
+    def put(self, path, data):
+        os.makedirs(self.data_dir, exist_ok=True)
+        data_path = self.data_path(path)
+        with open(f"{data_path}.tmp", mode="w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(f"{data_path}.tmp", data_path)
+        stat = os.stat(path)
+        self.files[path] = {"size": stat.st_size, "mtime": stat.st_mtime}
+        self.modified = True
+
+    def data(self, path):
+        with open(self.data_path(path), mode="r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def forget(self, path):
+        if self.files.pop(path, None) is not None:
+            self.modified = True
+        try:
+            os.remove(self.data_path(path))
+        except FileNotFoundError:
+            pass
+
+    def forget_missing(self, paths):
+        for path in set(self.files) - set(paths):
+            self.forget(path)
+
+    def save(self):
+        if not self.modified:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as file:
+            json.dump(self.files, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.modified = False
+
+
+def write_results(path, lines):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_HEADERS, delimiter=";")
+        writer.writeheader()
+        writer.writerows(lines)
+    os.replace(tmp_path, path)
+
+
+def extract(
+    input_file=None,
+    output=os.path.join(RESULTS_DIR, "results.csv"),
+    results_dir=RESULTS_DIR,
+    backup_dir=BACKUP_DIR,
+    state_path=EXTRACT_STATE,
+    processes=None,
+):
+    """
+    Parses all changed XML files with a process pool and writes results.csv from the stored extraction of every file.
+
+    :param input_file: str or None, company list of the crawl, gives Bundesland, Ort, PLZ and Straße to the files
+        by result_filename and an error row for every company without XML
+    :param processes: int or None, size of the process pool, None for one per cpu
+    :return: (int, int, int), number of files, parsed files and failed files
+    """
+    files = newest_files(xml_folders(results_dir, backup_dir))
+    state = ExtractState(state_path)
+    state.forget_missing(files.values())
+    todo = [path for path in files.values() if state.changed(path)]
+
+    failed = {}
+    if todo:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunksize = max(1, len(todo) // ((processes or os.cpu_count() or 1) * 4))
+            for path, data, error in pool.map(parse_file, todo, chunksize=chunksize):
+                if error:
+                    failed[path] = error
+                    state.forget(path)
+                else:
+                    state.put(path, data)
+    state.save()
+
+    companies = {}
+    if input_file:
+        for company in read_csv(input_file):
+            companies.setdefault(result_filename(company), company)
+    # older runs named the files by Firma only, those count for the first company of that name
+    by_firma = {}
+    for key, company in companies.items():
+        by_firma.setdefault(str(company["Firma"]), key)
+    lines = []
+    found = set()
+    # files named like result_filename first, so they win over an older file of the same company
+    for name, path in sorted(files.items(), key=lambda item: (item[0] not in companies, item[0])):
+        key = name if name in companies else by_firma.get(name, name)
+        if key in found:
+            continue
+        found.add(key)
+        company = companies.get(key, {"Firma": name})
+        if path in failed:
+            print(f"{path}: {failed[path]}")
+            if key in companies:
+                lines.append(error_line(company, f"Fehler beim Lesen der XML-Datei: {failed[path]}"))
+            continue
+        data = state.data(path)
+        msg = file_message(path, name)
+        lines.extend(result_lines(company, data["persons"], data["organizations"], data["vertretung"], msg))
+    for key, company in companies.items():
+        if key not in found:
+            lines.append(error_line(company, "Keine XML-Datei vorhanden."))
+    write_results(output, lines)
+    return len(files), len(todo), len(failed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=None, help="Firmenliste des Crawls, durch Semikolon getrennt")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "results.csv"))
+    parser.add_argument("--processes", type=int, default=None, help="Anzahl Prozesse, Standard ein Prozess pro Kern")
+    args = parser.parse_args()
+    total, parsed, failed = extract(args.input, args.output, processes=args.processes)
+    print(f"{total} XML-Dateien, {parsed} neu gelesen, {failed} fehlerhaft, Ergebnisse in {args.output}")
@@ -0,0 +1,92 @@
+# position of the radio buttons in form:schlagwortOptionen, see MyConnector.select_search_options
+MODE_INDEX = {"all": 0, "min": 1, "exact": 2}
+SIMILAR_ID = "form:aenlichLautendeSchlagwoerterBoolChkbox"
+
+# Sets every search field, checkbox and radio button in one WebDriver call and submits if asked to.
+# Text fields get the events JSF listens to, checkboxes and radios are clicked like a user would,
+# so the PrimeFaces widgets keep their hidden inputs in sync.
+FILL_FORM = """
+var form = arguments[0];
+function byId(id) {
+    var element = document.getElementById(id);
+    if (!element) { throw new Error("Element fehlt: " + id); }
+    return element;
+}
+function fire(element, names) {
+    names.forEach(function (name) { element.dispatchEvent(new Event(name, {bubbles: true})); });
+}
+function isChecked(id) {
+    var input = document.getElementById(id + "_input");
+    if (!input) { return null; }
+    var aria = input.getAttribute("aria-checked");
+    return aria !== null ? aria === "true" : input.checked;
+}
+function clickBox(id) {
+    var container = byId(id);
+    (container.querySelector(".ui-chkbox-box") || container).click();
+}
+
+Object.keys(form.fields).forEach(function (id) {
+    var field = byId(id);
+    field.value = form.fields[id] || "";
+    fire(field, ["input", "change", "keyup", "blur"]);
+});
+Object.keys(form.checkboxes).forEach(function (id) {
+    var wanted = form.checkboxes[id];
+    var checked = isChecked(id);
+    if (checked === null) {
+        if (!form.toggle[id]) { throw new Error("Checkbox ohne Eingabefeld: " + id); }
+        // no state to read, behave like the element path and click when it is wanted
+        if (wanted) { clickBox(id); }
+    } else if (checked !== wanted) {
+        clickBox(id);
+    }
+});
+var options = byId("form:schlagwortOptionen").getElementsByClassName("ui-g");
+options[form.mode].getElementsByTagName("div")[1].click();
+if (form.submit) {
+    var button = byId(form.submit);
+    button.scrollIntoView(true);
+    button.click();
+}
+return true;
+"""
+
+
+def form_values(fields, states, mode="all", similar=False, submit=None):
+    """
+    Builds the argument for FILL_FORM.
+
+    :param fields: dict, element id -> text, None empties the field
+    :param states: dict, state name -> whether its checkbox should be ticked
+    :param submit: str or None, id of the button to click afterwards
+    """
+    checkboxes = {f"form:{state}": wanted for state, wanted in states.items()}
+    checkboxes[SIMILAR_ID] = similar
+    return {
+        "fields": {element_id: value or "" for element_id, value in fields.items()},
+        "checkboxes": checkboxes,
+        "toggle": {SIMILAR_ID: True},
+        "mode": MODE_INDEX[mode],
+        "submit": submit,
+    }
+
+# Clicks a result link so that it opens in a new tab: plain links follow their own target, JSF command links
+# submit their form, so both get target _blank for the duration of the click.
+OPEN_IN_TAB = """
+var link = arguments[0];
+var form = link.form || link.closest("form");
+var linkTarget = link.getAttribute("target");
+var formTarget = form ? form.getAttribute("target") : null;
+link.setAttribute("target", "_blank");
+if (form) { form.setAttribute("target", "_blank"); }
+try {
+    link.click();
+} finally {
+    if (linkTarget === null) { link.removeAttribute("target"); } else { link.setAttribute("target", linkTarget); }
+    if (form) {
+        if (formTarget === null) { form.removeAttribute("target"); } else { form.setAttribute("target", formTarget); }
+    }
+}
+return true;
+"""
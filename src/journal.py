@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# steps in the order a company passes through them
+SEARCHED = "searched"
+HIT = "hit"
+DOWNLOADED = "downloaded"
+WRITTEN = "written"
+
+
+def company_key(company):
+    return "|".join(str(company.get(field, "")).strip() for field in ("Firma", "PLZ", "Ort"))
+
+
+class CompanyState:
+    def __init__(self) -> None:
+        self.step = None
+        self.attempts = set()
+        self.hit = None
+        self.xml_path = None
+        self.msg = None
+
+    @property
+    def finished(self):
+        return self.step == WRITTEN
+
+    @property
+    def downloaded(self):
+        return self.step == DOWNLOADED and self.xml_path is not None and os.path.exists(self.xml_path)
+
+
+class Journal:
+    """
+    Append-only checkpoint file with one JSON object per line.
+    Every entry is flushed and fsynced before the crawler moves on, so a crash loses at most the current step.
+
+    :param path: str, path to the journal file
+    :param read_only: bool, only load the journal, e.g. for a report while a crawl is running
+    """
+
+    def __init__(self, path, read_only=False) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.states = {}
+        self.file = None
+        if os.path.exists(path):
+            self.load()
+        if read_only:
+            return
+        self.file = open(path, mode="a", encoding="utf-8")
+        if self.file.tell() > 0:
+            # terminate a line a crash may have cut off
+            self.file.write("\n")
+
+    def load(self):
+        with open(self.path, mode="r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line of a crashed run may be cut off
+                    continue
+                self.apply(entry)
+
+    def apply(self, entry):
+        state = self.states.setdefault(entry["key"], CompanyState())
+        step = entry["step"]
+        if step == SEARCHED:
+            state.attempts.add((entry["word"], entry["mode"]))
+            # a new search after a hit means the hit could not be saved
+            state.hit = None
+        elif step == HIT:
+            state.hit = (entry["word"], entry["mode"])
+        elif step == DOWNLOADED:
+            state.xml_path = entry.get("xml")
+            state.msg = entry.get("msg")
+        state.step = step
+
+    def state(self, company):
+        return self.states.get(company_key(company), CompanyState())
+
+    def record(self, company, step, **data):
+        entry = {"key": company_key(company), "step": step, "time": datetime.now().isoformat(), **data}
+        with self.lock:
+            self.apply(entry)
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def summary(self):
+        finished = sum(1 for state in self.states.values() if state.finished)
+        return f"{finished} von {len(self.states)} Firmen im Journal abgeschlossen"
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
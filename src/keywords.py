@@ -0,0 +1,104 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+LEGAL_FORMS = [
+    ("gGmbH", re.compile(r"\bgGmbH\b", re.IGNORECASE)),
+    ("GmbH", re.compile(r"\bGmbH\b", re.IGNORECASE)),
+    ("UG", re.compile(r"\bUG\b")),
+    ("AG", re.compile(r"\bAG\b")),
+    ("e.V.", re.compile(r"\be\.\s*V\.|\beV\b")),
+    ("GbR", re.compile(r"\bGbR\b", re.IGNORECASE)),
+    ("KG", re.compile(r"\bKG\b")),
+    ("OHG", re.compile(r"\bOHG\b")),
+    ("eG", re.compile(r"\beG\b")),
+    ("Stiftung", re.compile(r"Stiftung", re.IGNORECASE)),
+]
+# legal form suffixes say nothing about which company is meant, Stiftung is left in on purpose. Only whole
+# words count, "KG-Praxis" or "Co-Working" are part of the name. GmbH and GbR are found in any
+# case, the short forms in lower case are ordinary words ("ag", "co", "eg")
+LEGAL_FORM_WORDS = re.compile(
+    r"(?<!\S)(?:(?i:g?GmbH|GbR)|mbH|UG(?:\s*\(haftungsbeschränkt\))?|AG|KGaA|KG|OHG|eG|e\.\s*K\.|e\.\s*V\.|eV|Co\.?)"
+    r"(?![^\s,;])"
+)
+STOPWORDS = {"und", "der", "die", "das", "des", "für", "von", "zu", "&", "+", "/", "-"}
+# characters trimmed from both ends of a word
+PUNCTUATION = "\"'„“”‚‘’«»,;:()[]{}!?"
+
+
+def normalize(word):
+    """The form words are compared in, case and Unicode spelling (e.g. full width letters, ligatures) don't count."""
+    return unicodedata.normalize("NFKC", str(word)).casefold().strip(PUNCTUATION + " .")
+
+
+def legal_form(name):
+    name = unicodedata.normalize("NFKC", str(name))
+    for form, pattern in LEGAL_FORMS:
+        if pattern.search(name):
+            return form
+    return "sonstige"
+
+
+def split_name(name):
+    """
+    Splits a company name into search words, without legal forms and stopwords.
+
+    :return: list of str, the words in their original spelling
+    """
+    name = LEGAL_FORM_WORDS.sub(" ", unicodedata.normalize("NFKC", str(name)))
+    words = []
+    for word in name.split():
+        word = word.strip(PUNCTUATION)
+        key = normalize(word)
+        if len(key) < 2 or key in STOPWORDS or not any(char.isalnum() for char in key):
+            continue
+        words.append(word)
+    return words
+
+
+def company_exclusions(company):
+    """Words of the own address, they are searched through the address fields instead."""
+    excluded = set()
+    for field in ("Ort", "PLZ"):
+        excluded.update(normalize(word) for word in str(company.get(field) or "").split())
+    return excluded
+
+
+class KeywordEngine:
+    """
+    Chooses the search words of a company. Words that are rare across the whole input list come first,
+    ranked by inverse document frequency, so the first searches are the ones most likely to give a single hit.
+
+    :param companies: list of dict, the input list
+    """
+
+    def __init__(self, companies=()) -> None:
+        self.companies = 0
+        self.frequency = Counter()
+        for company in companies:
+            self.add(company)
+
+    def add(self, company):
+        self.companies += 1
+        self.frequency.update({normalize(word) for word in split_name(company["Firma"])})
+
+    def idf(self, word):
+        return math.log((1 + self.companies) / (1 + self.frequency[normalize(word)])) + 1
+
+    def keywords(self, company):
+        """
+        :return: list of str, the full name first, then the distinct words of the name, rarest first
+        """
+        excluded = company_exclusions(company)
+        words = []
+        seen = set()
+        for word in split_name(company["Firma"]):
+            key = normalize(word)
+            if key in excluded or key in seen:
+                continue
+            seen.add(key)
+            words.append(word)
+        # sorted is stable, equally rare words keep the order of the name
+        words = sorted(words, key=self.idf, reverse=True)
+        return [str(company["Firma"])] + words
@@ -0,0 +1,183 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds in seconds, from a quick ajax update to a router reconnect
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, the largest observation for the last bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 3),
+            "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], self.buckets)),
+        }
+
+
+class Metrics:
+    """
+    Latency histograms per step, event counters and errors by type. Recording takes a lock and a bisect,
+    so it stays on in production runs.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.errors = {}
+        self.started = time.time()
+        self.stop = threading.Event()
+
+    def observe(self, step, seconds):
+        with self.lock:
+            histogram = self.histograms.get(step)
+            if histogram is None:
+                histogram = self.histograms[step] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, event, amount=1):
+        with self.lock:
+            self.counters[event] = self.counters.get(event, 0) + amount
+
+    def error(self, step, error):
+        key = (step, type(error).__name__)
+        with self.lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    @contextmanager
+    def time(self, step):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.error(step, e)
+            raise
+        finally:
+            self.observe(step, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "runtime": round(time.time() - self.started, 1),
+                "steps": {step: histogram.as_dict() for step, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "errors": [
+                    {"step": step, "type": error, "count": count} for (step, error), count in sorted(self.errors.items())
+                ],
+            }
+
+    def prometheus(self):
+        lines = [
+            "# HELP crawler_step_seconds Duration of crawler steps.",
+            "# TYPE crawler_step_seconds histogram",
+        ]
+        with self.lock:
+            for step, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip([str(bound) for bound in BUCKETS] + ["+Inf"], histogram.buckets):
+                    cumulative += count
+                    lines.append(f'crawler_step_seconds_bucket{{step="{step}",le="{bound}"}} {cumulative}')
+                lines.append(f'crawler_step_seconds_sum{{step="{step}"}} {histogram.sum:.6f}')
+                lines.append(f'crawler_step_seconds_count{{step="{step}"}} {histogram.count}')
+            lines += ["# HELP crawler_events_total Crawler events.", "# TYPE crawler_events_total counter"]
+            for event, count in sorted(self.counters.items()):
+                lines.append(f'crawler_events_total{{event="{event}"}} {count}')
+            lines += ["# HELP crawler_errors_total Errors by step and type.", "# TYPE crawler_errors_total counter"]
+            for (step, error), count in sorted(self.errors.items()):
+                lines.append(f'crawler_errors_total{{step="{step}",type="{error}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        write_atomic(path, json.dumps(self.as_dict(), indent=2, ensure_ascii=False))
+
+    def write_prometheus(self, path):
+        write_atomic(path, self.prometheus())
+
+    def export_periodically(self, path, interval=15):
+        """Rewrites the Prometheus text file every interval seconds until close() is called."""
+
+        def export():
+            while not self.stop.wait(interval):
+                try:
+                    self.write_prometheus(path)
+                except OSError as e:
+                    print(f"Metriken konnten nicht geschrieben werden: {e}")
+
+        threading.Thread(target=export, name="metrics-export", daemon=True).start()
+
+    def close(self):
+        self.stop.set()
+
+
+def write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+METRICS = Metrics()
+
+
+def timed(step):
+    """Decorator recording every call of a function as step in METRICS."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with METRICS.time(step):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def format_steps(metrics, order=()):
+    """
+    :param metrics: dict, as written by Metrics.write_json
+    :param order: list of str, steps shown first, the others follow alphabetically
+    :return: list of str, table lines with count and latencies per step
+    """
+    lines = [f"{'Schritt':<20}{'Anzahl':>8}{'p50 s':>10}{'p95 s':>10}{'Mittel s':>10}"]
+    for step in list(order) + sorted(set(metrics["steps"]) - set(order)):
+        histogram = metrics["steps"].get(step)
+        if not histogram:
+            continue
+        lines.append(
+            f"{step:<20}{histogram['count']:>8}{histogram['p50']:>10.2f}{histogram['p95']:>10.2f}{histogram['mean']:>10.2f}"
+        )
+    return lines
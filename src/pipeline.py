@@ -0,0 +1,97 @@
+import queue
+import threading
+import time
+import traceback
+from src.metrics import METRICS
+
+# put into a stage queue once per worker thread to end it
+STOP = object()
+
+
+class Stage:
+    """
+    One step of the pipeline with its own threads and a bounded input queue.
+
+    :param name: str, name in logs and METRICS
+    :param handle: callable(item) -> item for the next stage, or None when the item is done
+    :param workers: int, number of threads of this stage
+    :param maxsize: int, items waiting for this stage before the previous stage blocks
+    """
+
+    def __init__(self, name, handle, workers=1, maxsize=4) -> None:
+        self.name = name
+        self.handle = handle
+        self.workers = max(1, int(workers))
+        self.jobs = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.threads = []
+        self.done = 0
+        self.failed = 0
+
+
+class Pipeline:
+    """
+    Hands items through a chain of stages, each running in background threads. A full queue blocks the
+    stage in front of it, so a slow stage slows the browser down instead of piling up work in memory.
+
+    :param stages: list of Stage, in processing order
+    :param on_error: callable(stage_name, item, exception) or None, called when a stage raises
+    """
+
+    def __init__(self, stages, on_error=None) -> None:
+        self.stages = stages
+        self.on_error = on_error
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def start(self):
+        for number, stage in enumerate(self.stages):
+            following = self.stages[number + 1] if number + 1 < len(self.stages) else None
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self.work, args=(stage, following), name=f"{stage.name}-{worker}", daemon=True
+                )
+                stage.threads.append(thread)
+                thread.start()
+        return self
+
+    def put(self, item, stage=None):
+        """Queues an item for the first stage, or the given one, and blocks while that stage is full."""
+        stage = stage or self.stages[0]
+        start = time.perf_counter()
+        stage.jobs.put(item)
+        METRICS.observe(f"queue_{stage.name}", time.perf_counter() - start)
+
+    def work(self, stage, following):
+        while True:
+            item = stage.jobs.get()
+            if item is STOP:
+                return
+            try:
+                result = stage.handle(item)
+            except Exception as e:
+                result = None
+                with self.lock:
+                    stage.failed += 1
+                METRICS.error(stage.name, e)
+                if self.on_error:
+                    self.on_error(stage.name, item, e)
+                else:
+                    traceback.print_exc()
+            with self.lock:
+                stage.done += 1
+            if result is not None and following:
+                self.put(result, following)
+
+    def close(self):
+        """Lets every stage finish what is queued, stage after stage, and waits for all threads."""
+        if self.closed:
+            return
+        self.closed = True
+        for stage in self.stages:
+            for _ in stage.threads:
+                stage.jobs.put(STOP)
+            for thread in stage.threads:
+                thread.join()
+
+    def summary(self):
+        return ", ".join(f"{stage.name}: {stage.done} ({stage.failed} Fehler)" for stage in self.stages)
@@ -0,0 +1,185 @@
+import queue
+import threading
+import traceback
+from src.supervisor import BrowserDied
+from src.utility import write_to_terminal
+
+# times a company may take a browser down before it is given up
+MAX_REQUEUE = 2
+
+
+class WorkerStats:
+    def __init__(self, number) -> None:
+        self.number = number
+        self.done = 0
+        self.errors = 0
+        self.restarts = 0
+        self.failed = None
+        self.summary = None
+
+    def __str__(self) -> str:
+        status = f"abgebrochen ({self.failed})" if self.failed else "fertig"
+        text = f"Worker {self.number}: {self.done} Firmen, {self.errors} Fehler, {self.restarts} Browser-Neustarts, {status}"
+        return f"{text}\n  {self.summary}" if self.summary else text
+
+
+class WorkerPool:
+    """
+    Runs one connection per worker thread and lets the workers pull companies from a shared queue.
+
+    :param make_connection: callable(number) -> connection, called once inside each worker thread
+    :param crawl: callable(connection, company, log) -> int, processes one company and returns its error count
+    :param workers: int, number of independent browser instances
+    :param finish: callable(connection) or None, called before a worker closes its connection
+    :param recover: callable(connection) or None, replaces the browser after crawl raised BrowserDied
+    :param give_up: callable(company, msg) or None, records a company no browser could finish, e.g. as an error row
+    """
+
+    def __init__(self, make_connection, crawl, workers=1, finish=None, recover=None, give_up=None) -> None:
+        self.make_connection = make_connection
+        self.crawl = crawl
+        self.finish = finish
+        self.recover = recover
+        self.give_up = give_up
+        self.requeued = {}
+        self.lock = threading.Lock()
+        self.workers = max(1, int(workers))
+        # the input is fed in while the workers run, so a huge list never sits in the queue as a whole
+        self.jobs = queue.Queue(maxsize=4 * self.workers)
+        self.retries = queue.Queue()
+        self.fed = threading.Event()
+        self.stopped = threading.Event()
+        self.stats = [WorkerStats(number) for number in range(self.workers)]
+        self.print_lock = threading.Lock()
+        self.total = None
+        self.handed_out = 0
+
+    def log(self, stats, msg):
+        if self.workers == 1:
+            write_to_terminal(msg)
+            return
+        with self.print_lock:
+            print(f"[worker {stats.number}] {msg}")
+
+    def run(self, companies):
+        """
+        :param companies: iterable of dict, read while the workers run, a list or a StateBatches
+        :return: int, number of errors of all workers
+        """
+        if hasattr(companies, "__len__"):
+            self.total = len(companies)
+        feeder = threading.Thread(target=self.feed, args=(companies,), name="feeder", daemon=True)
+        feeder.start()
+        threads = [
+            threading.Thread(target=self.work, args=(stats,), name=f"worker-{stats.number}", daemon=True)
+            for stats in self.stats
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stopped.set()
+        feeder.join()
+        self.drop_retries()
+        return sum(stats.errors for stats in self.stats)
+
+    def drop_retries(self):
+        """Gives up the re-queued companies the last worker left behind when it stopped."""
+        while True:
+            try:
+                company = self.retries.get_nowait()
+            except queue.Empty:
+                return
+            self.stats[0].errors += 1
+            print(f"{company.get('Firma')} nicht mehr versucht, kein Browser übrig")
+            if self.give_up:
+                self.give_up(company, "Fehler: Browser abgestürzt, kein Browser mehr übrig.")
+
+    def feed(self, companies):
+        try:
+            for company in companies:
+                while not self.stopped.is_set():
+                    try:
+                        self.jobs.put(company, timeout=0.5)
+                        break
+                    except queue.Full:
+                        pass
+                if self.stopped.is_set():
+                    # every worker is gone, nobody would take the rest
+                    return
+        finally:
+            self.fed.set()
+
+    def next_company(self):
+        """:return: dict, the next company, a re-queued one first, or None once the input is used up"""
+        while True:
+            try:
+                return self.retries.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                company = self.jobs.get(timeout=0.2)
+            except queue.Empty:
+                if self.fed.is_set() and self.jobs.empty() and self.retries.empty():
+                    return None
+                continue
+            with self.lock:
+                self.handed_out += 1
+            return company
+
+    def work(self, stats):
+        log = lambda msg: self.log(stats, msg)
+        try:
+            connection = self.make_connection(stats.number)
+        except Exception as e:
+            stats.failed = str(e)
+            self.log(stats, f"Browser konnte nicht gestartet werden: {e}")
+            return
+
+        try:
+            while True:
+                company = self.next_company()
+                if company is None:
+                    break
+                try:
+                    stats.errors += self.crawl(connection, company, log)
+                except BrowserDied as e:
+                    if not self.recover:
+                        raise
+                    stats.restarts += 1
+                    self.log(stats, f"Browser abgestürzt bei {company.get('Firma')} ({e}), starte neu")
+                    try:
+                        self.recover(connection)
+                    except Exception as e:
+                        stats.failed = f"Neustart fehlgeschlagen: {e}"
+                        self.retries.put(company)
+                        break
+                    with self.lock:
+                        tries = self.requeued[id(company)] = self.requeued.get(id(company), 0) + 1
+                    if tries <= MAX_REQUEUE:
+                        # the company goes back to the queue, another browser or this new one does it again
+                        self.retries.put(company)
+                        continue
+                    stats.errors += 1
+                    self.log(stats, f"{company.get('Firma')} bringt den Browser immer wieder zum Absturz, übersprungen")
+                    if self.give_up:
+                        self.give_up(company, "Fehler: Browser stürzt bei dieser Firma immer wieder ab.")
+                except Exception as e:
+                    stats.errors += 1
+                    self.log(stats, f"{company.get('Firma')} - Error: {e}")
+                    traceback.print_exc()
+                stats.done += 1
+                self.log(stats, f"{self.handed_out}/{self.total or '?'} verteilt, {stats.done} erledigt")
+        finally:
+            if self.finish:
+                self.finish(connection)
+            if hasattr(connection, "summary"):
+                stats.summary = connection.summary()
+            try:
+                connection.close_connection()
+            except Exception:
+                pass
+
+    def report(self):
+        for stats in self.stats:
+            print(stats)
@@ -0,0 +1,135 @@
+import threading
+import time
+from src.metrics import METRICS
+from src.utility import countdown
+
+# texts the portal shows instead of a result once too many requests came from one address
+THROTTLE_MARKERS = [
+    "zulässige Anzahl",
+    "maximale Anzahl",
+    "Anzahl der Abrufe",
+    "Too Many Requests",
+]
+
+
+class Throttled(Exception):
+    pass
+
+
+class PortalError(Exception):
+    """The portal answered with an error page instead of the expected one."""
+
+
+def is_throttled(page_source):
+    return any(marker in page_source for marker in THROTTLE_MARKERS)
+
+
+class RateLimiter:
+    """
+    Token bucket over all portal requests (searches, result pages, downloads) of a run.
+    It only waits once the budget is used up and backs off exponentially when the portal throttles.
+
+    :param budget: int, requests allowed per period
+    :param period: float, seconds in which the budget refills completely
+    :param on_exhausted: callable(connection) -> bool, may get a fresh budget (e.g. a new ip), returns whether it did
+    :param backoff: float, first wait in seconds after a throttling page, doubled for each one in a row
+    :param max_backoff: float, longest wait after a throttling page
+    """
+
+    def __init__(self, budget=60, period=3600, on_exhausted=None, backoff=60, max_backoff=1800) -> None:
+        self.budget = budget
+        self.period = period
+        self.on_exhausted = on_exhausted
+        self.backoff_start = backoff
+        self.max_backoff = max_backoff
+        self.tokens = float(budget)
+        self.updated = time.time()
+        self.throttled_in_row = 0
+        self.lock = threading.Lock()
+        self.refilled = threading.Condition(self.lock)
+        self.exhausting = False
+        self.counts = {}
+        self.waited = 0.0
+        self.refills = 0
+
+    @property
+    def interval(self):
+        return self.period / self.budget
+
+    def refill(self):
+        now = time.time()
+        self.tokens = min(self.budget, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+    def acquire(self, kind, amount=1, connection=None):
+        """
+        Takes tokens for requests that are about to be sent and blocks while the budget is empty.
+        Only callers passing their connection may trigger on_exhausted, because it navigates that browser away.
+        The lock is released while waiting and while on_exhausted runs, so other workers are not held up by it.
+
+        :param kind: str, kind of request, counted for the summary
+        :param amount: int, number of requests
+        :param connection: MyConnector or None
+        """
+        with self.lock:
+            while True:
+                self.refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    self.counts[kind] = self.counts.get(kind, 0) + amount
+                    return
+                if connection is not None and self.on_exhausted and not self.exhausting:
+                    # one worker fetches a fresh budget, the others wait for it below
+                    self.exhausting = True
+                    break
+                wait = (amount - self.tokens) * self.interval
+                start = time.time()
+                METRICS.count("rate_limit_wait")
+                # waiting on the condition releases the lock, a fresh budget wakes the waiters early
+                self.refilled.wait(wait)
+                self.waited += time.time() - start
+                METRICS.observe("rate_limit_wait", time.time() - start)
+        moved = None
+        refreshed = False
+        try:
+            refreshed = self.on_exhausted(connection)
+        finally:
+            with self.lock:
+                self.exhausting = False
+                if refreshed:
+                    self.refills += 1
+                    if connection.limiter is None or connection.limiter is self:
+                        # the same egress got a new address, e.g. a router reconnect, so the budget starts over
+                        self.tokens = float(self.budget)
+                        self.updated = time.time()
+                    else:
+                        moved = connection.limiter
+                self.refilled.notify_all()
+        if moved is not None:
+            # the connection moved to another egress, which pays for the request. This budget stays
+            # used up and recovers over time like any other
+            return moved.acquire(kind, amount, connection)
+        # without a fresh budget this worker waits like the others
+        return self.acquire(kind, amount)
+
+    def throttled(self):
+        """Empties the budget and waits, longer for every throttling page in a row."""
+        with self.lock:
+            wait = min(self.max_backoff, self.backoff_start * 2**self.throttled_in_row)
+            self.throttled_in_row += 1
+            self.tokens = 0.0
+            # the budget only starts refilling after the backoff, so the other workers wait for it as well
+            self.updated = time.time() + wait
+        print(f"\nPortal drosselt, warte {wait}s")
+        start = time.time()
+        countdown(wait)
+        with self.lock:
+            self.waited += time.time() - start
+        METRICS.observe("throttle_backoff", time.time() - start)
+
+    def passed(self):
+        self.throttled_in_row = 0
+
+    def summary(self):
+        counts = ", ".join(f"{count} {kind}" for kind, count in sorted(self.counts.items()))
+        return f"Anfragen: {counts or 'keine'}, {round(self.waited)}s gewartet, {self.refills} neue IPs"
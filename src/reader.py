@@ -1,8 +1,55 @@
 import xml.etree.ElementTree as ET
 
+XJUSTIZ = {"tns": "http://www.xjustiz.de"}
+
+
+def person_info(beteiligung, namespaces):
+    # Find the role code within the 'beteiligung' element
+    code_elem = beteiligung.find(".//tns:rollenbezeichnung/code", namespaces=namespaces)
+    code = code_elem.text.strip() if code_elem is not None else None
+
+    # Find the 'beteiligter' element within the 'beteiligung' element
+    beteiligter_elem = beteiligung.find(".//tns:beteiligter", namespaces=namespaces)
+    if beteiligter_elem is None:
+        return None
+
+    # Extract the names from the 'natuerlichePerson' structure within 'beteiligter'
+    natuerliche_person_elem = beteiligter_elem.find(".//tns:natuerlichePerson", namespaces=namespaces)
+    if natuerliche_person_elem is None:
+        return None
+
+    vorname_elem = natuerliche_person_elem.find(".//tns:vorname", namespaces=namespaces)
+    nachname_elem = natuerliche_person_elem.find(".//tns:nachname", namespaces=namespaces)
+
+    vorname = vorname_elem.text.strip() if vorname_elem is not None else None
+    nachname = nachname_elem.text.strip() if nachname_elem is not None else None
+    return {"Vorname": vorname, "Nachname": nachname, "Code": code}
+
+
+def organization_info(beteiligung, namespaces):
+    code_elem = beteiligung.find(".//tns:rollenbezeichnung/code", namespaces=namespaces)
+    if code_elem is not None and code_elem.text.strip() == "288":
+        return None
+
+    beteiligter_elem = beteiligung.find(".//tns:beteiligter", namespaces=namespaces)
+    if beteiligter_elem is None:
+        return None
+    organisation_elem = beteiligter_elem.find(".//tns:organisation", namespaces=namespaces)
+    if organisation_elem is None:
+        return None
+
+    bezeichnung_elem = organisation_elem.find(".//tns:bezeichnung/tns:bezeichnung.aktuell", namespaces=namespaces)
+    rechtsform_elem = organisation_elem.find(".//tns:angabenZurRechtsform/tns:rechtsform/code", namespaces=namespaces)
+    registernummer_elem = organisation_elem.find(".//tns:registereintragung/tns:registernummer", namespaces=namespaces)
+
+    bezeichnung = bezeichnung_elem.text.strip() if bezeichnung_elem is not None else None
+    rechtsform = rechtsform_elem.text.strip() if rechtsform_elem is not None else None
+    registernummer = registernummer_elem.text.strip() if registernummer_elem is not None else None
+    return {"Bezeichnung": bezeichnung, "Rechtsform": rechtsform, "Registernummer": registernummer}
+
 
 class DataXML:
-    def __init__(self, xmlpath, namespace={"tns": "http://www.xjustiz.de"}) -> None:
+    def __init__(self, xmlpath, namespace=XJUSTIZ) -> None:
         self.xmlpath = xmlpath
         self.root = ET.parse(self.xmlpath)
         self.namespaces = namespace
@@ -15,26 +62,10 @@ class DataXML:
         beteiligung_elements = self.root.findall(".//tns:beteiligung", namespaces=self.namespaces)
 
         for beteiligung in beteiligung_elements:
-            # Find the role code within the 'beteiligung' element
-            code_elem = beteiligung.find(".//tns:rollenbezeichnung/code", namespaces=self.namespaces)
-            code = code_elem.text.strip() if code_elem is not None else None
-
-            # Find the 'beteiligter' element within the 'beteiligung' element
-            beteiligter_elem = beteiligung.find(".//tns:beteiligter", namespaces=self.namespaces)
-
-            if beteiligter_elem is not None:
-                # Extract the names from the 'natuerlichePerson' structure within 'beteiligter'
-                natuerliche_person_elem = beteiligter_elem.find(".//tns:natuerlichePerson", namespaces=self.namespaces)
-
-                if natuerliche_person_elem is not None:
-                    vorname_elem = natuerliche_person_elem.find(".//tns:vorname", namespaces=self.namespaces)
-                    nachname_elem = natuerliche_person_elem.find(".//tns:nachname", namespaces=self.namespaces)
-
-                    vorname = vorname_elem.text.strip() if vorname_elem is not None else None
-                    nachname = nachname_elem.text.strip() if nachname_elem is not None else None
-
-                    # Append the extracted information to the person list
-                    person_list.append({"Vorname": vorname, "Nachname": nachname, "Code": code})
+            person = person_info(beteiligung, self.namespaces)
+            if person is not None:
+                # Append the extracted information to the person list
+                person_list.append(person)
 
         return person_list
 
@@ -43,31 +74,9 @@ class DataXML:
         beteiligung_elements = self.root.findall(".//tns:beteiligung", namespaces=self.namespaces)
 
         for beteiligung in beteiligung_elements:
-            code_elem = beteiligung.find(".//tns:rollenbezeichnung/code", namespaces=self.namespaces)
-            if code_elem is not None and code_elem.text.strip() == "288":
-                continue
-
-            beteiligter_elem = beteiligung.find(".//tns:beteiligter", namespaces=self.namespaces)
-            if beteiligter_elem is not None:
-                organisation_elem = beteiligter_elem.find(".//tns:organisation", namespaces=self.namespaces)
-                if organisation_elem is not None:
-                    bezeichnung_elem = organisation_elem.find(
-                        ".//tns:bezeichnung/tns:bezeichnung.aktuell", namespaces=self.namespaces
-                    )
-                    rechtsform_elem = organisation_elem.find(
-                        ".//tns:angabenZurRechtsform/tns:rechtsform/code", namespaces=self.namespaces
-                    )
-                    registernummer_elem = organisation_elem.find(
-                        ".//tns:registereintragung/tns:registernummer", namespaces=self.namespaces
-                    )
-
-                    bezeichnung = bezeichnung_elem.text.strip() if bezeichnung_elem is not None else None
-                    rechtsform = rechtsform_elem.text.strip() if rechtsform_elem is not None else None
-                    registernummer = registernummer_elem.text.strip() if registernummer_elem is not None else None
-
-                    organization_list.append(
-                        {"Bezeichnung": bezeichnung, "Rechtsform": rechtsform, "Registernummer": registernummer}
-                    )
+            organization = organization_info(beteiligung, self.namespaces)
+            if organization is not None:
+                organization_list.append(organization)
 
         return organization_list
 
@@ -93,3 +102,78 @@ class DataXML:
                 result["texts"] = ", ".join(texts)
 
         return result
+
+
+class StreamingDataXML:
+    """
+    Reads persons, organizations and the Vertretung of an XJustiz file in a single iterparse pass.
+    Every 'beteiligung' and 'basisdatenRegister' is evaluated as soon as it is complete and cleared afterwards,
+    so the whole tree is never held in memory. The dicts are the same as the ones of DataXML.
+    """
+
+    def __init__(self, xmlpath, namespace=XJUSTIZ) -> None:
+        self.xmlpath = xmlpath
+        self.namespaces = namespace
+        uri = namespace["tns"]
+        self.beteiligung_tag = f"{{{uri}}}beteiligung"
+        self.register_tag = f"{{{uri}}}basisdatenRegister"
+
+    def extract_all(self):
+        """
+        :return: (list, list, dict), the results of extract_person_info, extract_organization_info
+            and extract_vertretung
+        """
+        person_list = []
+        organization_list = []
+        freitexts = []
+        codes = []
+        texts = []
+        # open targets, an element inside another target must survive until the outer one is read
+        open_targets = 0
+        depth = 0
+        targets = (self.beteiligung_tag, self.register_tag)
+
+        for event, elem in ET.iterparse(self.xmlpath, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if elem.tag in targets:
+                    open_targets += 1
+                continue
+
+            depth -= 1
+            if elem.tag in targets:
+                open_targets -= 1
+                if open_targets == 0:
+                    for beteiligung in elem.iter(self.beteiligung_tag):
+                        person = person_info(beteiligung, self.namespaces)
+                        if person is not None:
+                            person_list.append(person)
+                        organization = organization_info(beteiligung, self.namespaces)
+                        if organization is not None:
+                            organization_list.append(organization)
+                    for register in elem.iter(self.register_tag):
+                        self.read_vertretung(register, freitexts, codes, texts)
+                    elem.clear()
+            elif depth == 1 and open_targets == 0:
+                # direct children of the root are done once they end
+                elem.clear()
+
+        return person_list, organization_list, self.vertretung(freitexts, codes, texts)
+
+    def read_vertretung(self, register, freitexts, codes, texts):
+        freitext_path = "./tns:vertretung/tns:allgemeineVertretungsregelung/tns:auswahl_vertretungsbefugnis/tns:vertretungsbefugnisFreitext"
+        freitexts.extend(elem.text for elem in register.findall(freitext_path, namespaces=self.namespaces))
+        for vertretung in register.findall("./tns:vertretung", namespaces=self.namespaces):
+            codes.extend(elem.text.strip() for elem in vertretung.iterfind(".//tns:code", self.namespaces) if elem.text)
+            texts.extend(elem.text.strip() for elem in vertretung.iterfind(".//tns:text", self.namespaces) if elem.text)
+
+    def vertretung(self, freitexts, codes, texts):
+        result = {"texts": None, "codes": None}
+        # DataXML only looks at the first Freitext element
+        if freitexts and freitexts[0]:
+            result["texts"] = freitexts[0].strip()
+        if codes:
+            result["codes"] = ", ".join(codes)
+        if not result["texts"] and texts:
+            result["texts"] = ", ".join(texts)
+        return result
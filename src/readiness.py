@@ -0,0 +1,159 @@
+import time
+from selenium.common.exceptions import JavascriptException, TimeoutException, WebDriverException
+from src.metrics import METRICS
+from src.ratelimit import THROTTLE_MARKERS, PortalError, Throttled
+
+READY = "ready"
+NO_HITS = "no_hits"
+THROTTLED = "throttled"
+ERROR = "error"
+# the portal's own texts for an empty result and for a failed request
+NO_HIT_MARKERS = ["Keine Daten gefunden", "Keine Treffer gefunden"]
+ERROR_MARKERS = [
+    "Interner Fehler",
+    "Es ist ein Fehler aufgetreten",
+    "Ein Fehler ist aufgetreten",
+    "Ihre Sitzung ist abgelaufen",
+    "ViewExpiredException",
+]
+# seconds one in-page wait may take before it is started again, well below chromedriver's script timeout
+SLICE = 10
+# interval of WebDriverWait, whose default of half a second is added to nearly every step
+POLL_INTERVAL = 0.05
+
+# the page state, null while it isn't ready. Markers are looked for before the url, the portal
+# shows throttling and errors under whatever address was asked for
+CHECK = """
+function check(spec) {
+  if (document.readyState === "loading" || !document.body) { return null; }
+  var text = document.body.innerText || "";
+  for (var i = 0; i < spec.outcomes.length; i++) {
+    var outcome = spec.outcomes[i];
+    if (outcome[0] === "error") {
+      var navigation = performance.getEntriesByType("navigation")[0];
+      if (navigation && navigation.responseStatus >= 400) { return "error"; }
+    }
+    for (var j = 0; j < outcome[1].length; j++) {
+      if (text.indexOf(outcome[1][j]) !== -1) { return outcome[0]; }
+    }
+  }
+  if (spec.url && window.location.href !== spec.url) { return null; }
+  if (spec.selector && !document.querySelector(spec.selector)) { return null; }
+  // JSF and PrimeFaces still updating parts of the page
+  if (window.PrimeFaces && PrimeFaces.ajax && PrimeFaces.ajax.Queue && !PrimeFaces.ajax.Queue.isEmpty()) { return null; }
+  if (window.jQuery && jQuery.active > 0) { return null; }
+  return "ready";
+}
+"""
+
+# resolves as soon as the page changes into a known state instead of being asked every so often
+WAIT_FOR = (
+    CHECK
+    + """
+var spec = arguments[0];
+var done = arguments[arguments.length - 1];
+var finished = false;
+var observer = null;
+function finish(state) {
+  if (finished) { return; }
+  finished = true;
+  if (observer) { observer.disconnect(); }
+  done(state);
+}
+function recheck() {
+  var state = check(spec);
+  if (state) { finish(state); }
+}
+recheck();
+if (!finished) {
+  observer = new MutationObserver(recheck);
+  observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+  document.addEventListener("readystatechange", recheck);
+  window.addEventListener("load", recheck);
+  if (window.jQuery) { jQuery(document).on("pfAjaxComplete ajaxComplete", recheck); }
+  setTimeout(function () { finish(null); }, spec.slice);
+}
+"""
+)
+
+POLL_CHECK = CHECK + "\nreturn check(arguments[0]);"
+
+
+def unloaded(error):
+    # the page navigated away while the script waited, the wait goes on in the new document
+    return "unloaded" in str(error) or "navigat" in str(error)
+
+
+class Readiness:
+    """
+    Waits for portal pages from inside the page: a MutationObserver and the PrimeFaces AJAX hooks end the
+    wait the moment the page is ready. Empty results, throttling and error pages are told apart right away
+    instead of running into the timeout. Every wait is recorded in METRICS as wait_<step>.
+
+    :param driver: WebDriver
+    :param timeout: float, seconds a page may take
+    :param events: bool, wait for page events, False asks the page every poll seconds like WebDriverWait did
+    :param poll: float, seconds between two checks without events
+    """
+
+    def __init__(self, driver, timeout=50, events=True, poll=0.5) -> None:
+        self.driver = driver
+        self.timeout = timeout
+        self.events = events
+        self.poll = poll
+
+    def spec(self, url, selector, outcomes, remaining):
+        markers = {NO_HITS: NO_HIT_MARKERS, THROTTLED: THROTTLE_MARKERS, ERROR: ERROR_MARKERS}
+        return {
+            "url": url,
+            "selector": selector,
+            "outcomes": [[outcome, markers[outcome]] for outcome in outcomes],
+            "slice": int(min(SLICE, max(remaining, 0.05)) * 1000),
+        }
+
+    def state(self, url, selector, outcomes, deadline):
+        while time.monotonic() < deadline:
+            spec = self.spec(url, selector, outcomes, deadline - time.monotonic())
+            try:
+                if self.events:
+                    state = self.driver.execute_async_script(WAIT_FOR, spec)
+                else:
+                    state = self.driver.execute_script(POLL_CHECK, spec)
+            except JavascriptException as e:
+                if not unloaded(e):
+                    raise
+                state = None
+            except WebDriverException as e:
+                # a script can't run while chrome switches documents
+                if not unloaded(e) and "no such execution context" not in str(e):
+                    raise
+                state = None
+            if state:
+                return state
+            if not self.events:
+                time.sleep(self.poll)
+        return None
+
+    def until(self, step, url=None, selector=None, outcomes=(), timeout=None):
+        """
+        :param step: str, name of the wait in METRICS
+        :param url: str or None, address the page has to show
+        :param selector: str or None, CSS selector of an element the page has to contain
+        :param outcomes: list of str, NO_HITS, THROTTLED and ERROR pages to recognize, in this order
+        :return: str, READY or NO_HITS
+        :raises Throttled: for a throttling page
+        :raises PortalError: for an error page
+        :raises TimeoutException: when the page isn't ready in time
+        """
+        start = time.perf_counter()
+        state = self.state(url, selector, outcomes, time.monotonic() + (timeout or self.timeout))
+        METRICS.observe(f"wait_{step}", time.perf_counter() - start)
+        if state is None:
+            raise TimeoutException(f"{step}: Seite nach {timeout or self.timeout}s nicht bereit")
+        if state != READY:
+            METRICS.count(f"page_{state}")
+        if state == THROTTLED:
+            raise Throttled("Portal meldet zu viele Abrufe")
+        if state == ERROR:
+            raise PortalError(f"{step}: Portal meldet einen Fehler")
+        return state
@@ -0,0 +1,216 @@
+import json
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+from src.reader import StreamingDataXML
+from src.results import name_tokens
+from src.utility import split_result_filename
+
+
+def name_key(name):
+    # unlike name_tokens the legal form stays, "X e.V." and "X GmbH" are different companies
+    text = unicodedata.normalize("NFKC", str(name)).casefold()
+    return " ".join(token for token in re.split(r"[\W_]+", text) if token)
+
+
+def register_key(register):
+    return re.sub(r"\s+", "", str(register or "")).upper() or None
+
+
+def court_key(court):
+    # the same number is given out by every Amtsgericht, only both together name a company
+    court = re.sub(r"^amtsgericht\s+", "", re.sub(r"\s+", " ", str(court or "")).strip().casefold())
+    return court or None
+
+
+def same_place(entry, city, plz):
+    """Whether an entry is known to be from this PLZ or Ort, entries without either never are."""
+    if plz and entry.get("plz"):
+        return entry["plz"] == plz
+    if city and entry.get("city"):
+        return entry["city"].casefold().strip() == city
+    return False
+
+
+class RegisterIndex:
+    """
+    Remembers which XML/PDF files were already bought, by normalized company name and by Registernummer,
+    so a later run can reuse them instead of paying for them again.
+
+    :param path: str, json file holding the index
+    :param max_age: float, days a stored document counts as fresh
+    """
+
+    def __init__(self, path, max_age=180) -> None:
+        self.path = path
+        self.max_age = timedelta(days=max_age)
+        self.lock = threading.Lock()
+        self.entries = []
+        self.reused = 0
+        if os.path.exists(path):
+            try:
+                with open(path, mode="r", encoding="utf-8") as file:
+                    self.entries = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Registerindex {path} konnte nicht gelesen werden: {e}")
+        # keys of older indexes were built without the legal form
+        for entry in self.entries:
+            entry["key"] = name_key(entry["name"])
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def add(self, name, register, xml_path, pdf_path=None, fetched=None, city=None, plz=None, court=None):
+        entry = {
+            "name": name,
+            "city": city,
+            "plz": None if plz is None else str(plz).strip(),
+            "key": name_key(name),
+            "register": register_key(register),
+            "court": court_key(court),
+            "xml": xml_path,
+            "pdf": pdf_path if pdf_path and os.path.exists(pdf_path) else None,
+            "fetched": (fetched or datetime.now()).isoformat(timespec="seconds"),
+        }
+        with self.lock:
+            # a newer download replaces the older one of the same file
+            self.entries = [old for old in self.entries if old["xml"] != xml_path]
+            self.entries.append(entry)
+
+    def fresh(self, entry):
+        return datetime.now() - datetime.fromisoformat(entry["fetched"]) <= self.max_age and os.path.exists(
+            entry["xml"]
+        )
+
+    def newest(self, entries):
+        entries = [entry for entry in entries if self.fresh(entry)]
+        return max(entries, key=lambda entry: entry["fetched"]) if entries else None
+
+    def lookup(self, name=None, register=None, city=None, plz=None, court=None):
+        """
+        Finds the newest fresh document of a company. A register number only counts together with its court,
+        entries without one are never found by number. The name has to share a word as well and a known Ort
+        has to match.
+        By name alone the whole name including the legal form has to match and the entry has to be
+        from the same PLZ or Ort, several companies of the input list share a name.
+
+        :return: dict with name, register, xml, pdf and fetched or None
+        """
+        register = register_key(register)
+        court = court_key(court)
+        city = str(city).casefold().strip() if city else None
+        plz = str(plz).strip() if plz else None
+        with self.lock:
+            if register:
+                if not court:
+                    return None
+                words = set(name_tokens(name)) if name else set()
+                candidates = [
+                    entry
+                    for entry in self.entries
+                    if entry["register"] == register
+                    and entry.get("court") == court
+                    and (not words or words & set(name_tokens(entry["name"])))
+                ]
+                if city:
+                    candidates = [
+                        entry for entry in candidates if not entry.get("city") or entry["city"].casefold() == city
+                    ]
+            elif name:
+                key = name_key(name)
+                candidates = [
+                    entry for entry in self.entries if entry["key"] == key and same_place(entry, city, plz)
+                ]
+            else:
+                return None
+            return self.newest(candidates)
+
+    def reuse(self, entry, xml_dir, pdf_dir, new_filename):
+        """
+        Copies a stored document into the result folders like move_and_rename does with a download.
+
+        :return: (str, str), path of the copied XML file and a message for the Hinweis column
+        """
+        xml_path = os.path.join(xml_dir, f"{new_filename}.xml")
+        if os.path.abspath(entry["xml"]) != os.path.abspath(xml_path):
+            shutil.copyfile(entry["xml"], xml_path)
+        if entry["pdf"] and os.path.exists(entry["pdf"]):
+            pdf_path = os.path.join(pdf_dir, f"{new_filename}.pdf")
+            if os.path.abspath(entry["pdf"]) != os.path.abspath(pdf_path):
+                shutil.copyfile(entry["pdf"], pdf_path)
+        with self.lock:
+            self.reused += 1
+        return xml_path, f"Success. Dateien aus Abruf vom {entry['fetched'][:10]} unter {new_filename} übernommen"
+
+    def relocate(self, old_dir, new_dir):
+        """Follows a results directory that was moved into the storage."""
+        old_dir = os.path.join(os.path.abspath(old_dir), "")
+        with self.lock:
+            for entry in self.entries:
+                for field in ("xml", "pdf"):
+                    path = entry[field]
+                    if path and os.path.abspath(path).startswith(old_dir):
+                        entry[field] = os.path.join(new_dir, os.path.relpath(os.path.abspath(path), old_dir))
+
+    def import_storage(self, storage_dir):
+        """
+        Builds the index from backups written by main(), storage/<timestamp>/XML/<Firma>_<PLZ>_<Ort>.xml,
+        or <Firma>.xml from older runs. The files don't tell the court, so they are found by name and place only.
+
+        :return: int, number of imported documents
+        """
+        if not os.path.isdir(storage_dir):
+            return 0
+        count = 0
+        known = {entry["xml"] for entry in self.entries}
+        for backup in sorted(os.listdir(storage_dir)):
+            xml_dir = os.path.join(storage_dir, backup, "XML")
+            if not os.path.isdir(xml_dir):
+                continue
+            try:
+                fetched = datetime.fromisoformat(backup)
+            except ValueError:
+                fetched = None
+            for filename in sorted(os.listdir(xml_dir)):
+                if not filename.endswith(".xml"):
+                    continue
+                xml_path = os.path.join(xml_dir, filename)
+                if xml_path in known:
+                    continue
+                stem = filename[: -len(".xml")]
+                company = split_result_filename(stem)
+                try:
+                    _, organizations, _ = StreamingDataXML(xml_path).extract_all()
+                except Exception as e:
+                    print(f"{xml_path} übersprungen: {e}")
+                    continue
+                register = next((org["Registernummer"] for org in organizations if org["Registernummer"]), None)
+                pdf_path = os.path.join(storage_dir, backup, "PDF", f"{stem}.pdf")
+                self.add(
+                    company["Firma"],
+                    register,
+                    xml_path,
+                    pdf_path,
+                    fetched or datetime.fromtimestamp(os.path.getmtime(xml_path)),
+                    city=company["Ort"],
+                    plz=company["PLZ"],
+                )
+                count += 1
+        return count
+
+    def save(self):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, mode="w", encoding="utf-8") as file:
+                json.dump(self.entries, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def summary(self):
+        return f"Registerindex: {len(self.entries)} Dokumente, {self.reused} wiederverwendet"
@@ -0,0 +1,142 @@
+import difflib
+import re
+import unicodedata
+from html.parser import HTMLParser
+
+REGISTER = re.compile(r"\b(HRA|HRB|VR|GnR|PR|GsR)\s*(\d+)\s*([A-Z]{1,2}\b)?")
+# words that say nothing about which company is meant
+FILLER = {"gmbh", "ggmbh", "ug", "ag", "ev", "e", "v", "gbr", "kg", "ohg", "eg", "und", "co", "mbh", "haftungsbeschränkt"}
+NAME_WEIGHT = 0.75
+CITY_WEIGHT = 0.25
+
+
+class ResultRow:
+    def __init__(self, table, name, court, register, seat, state) -> None:
+        self.table = table
+        self.name = name
+        self.court = court
+        self.register = register
+        self.seat = seat
+        self.state = state
+        self.score = None
+
+    def __repr__(self) -> str:
+        return f"ResultRow({self.table}, {self.name!r}, {self.register!r}, {self.seat!r})"
+
+
+class ResultPageParser(HTMLParser):
+    """Collects the cell texts of every table, numbered like driver.find_elements(By.TAG_NAME, "table")."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self.open_tables = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.tables.append([])
+            self.open_tables.append(len(self.tables) - 1)
+        elif not self.open_tables:
+            return
+        elif tag == "tr":
+            self.tables[self.open_tables[-1]].append([])
+        elif tag in ("td", "th"):
+            rows = self.tables[self.open_tables[-1]]
+            if not rows:
+                rows.append([])
+            rows[-1].append("")
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self.open_tables:
+            self.open_tables.pop()
+
+    def handle_data(self, data):
+        if not self.open_tables:
+            return
+        rows = self.tables[self.open_tables[-1]]
+        if rows and rows[-1]:
+            rows[-1][-1] += data
+
+
+def clean(text):
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def parse_results(page_source):
+    """
+    Reads every hit of a result page from one page_source snapshot.
+
+    :return: list of ResultRow, table is the number save_results expects
+    """
+    parser = ResultPageParser()
+    parser.feed(page_source)
+    rows = []
+    # the first table is the page layout, see MyConnector.results_count
+    for number, table in enumerate(parser.tables[1:], start=1):
+        if len(table) < 2 or not table[1]:
+            continue
+        header = clean(" ".join(table[0]))
+        cells = [clean(cell) for cell in table[1]]
+        match = REGISTER.search(header)
+        register = clean(match.group(0)) if match else None
+        court = clean(header[: match.start()]) if match else header
+        court = court.split("Amtsgericht", 1)[-1].strip() if "Amtsgericht" in court else court
+        state = clean(table[0][0]) if table[0] else None
+        rows.append(
+            ResultRow(
+                table=number,
+                name=cells[0],
+                court=court,
+                register=register,
+                seat=cells[1] if len(cells) > 1 else None,
+                state=state,
+            )
+        )
+    return rows
+
+
+def name_tokens(text):
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    return [token for token in re.split(r"[^\w]+", text) if token and token not in FILLER]
+
+
+def score(row, company):
+    """
+    How well a result row fits the company of the input list, between 0 and 1.
+    The name counts by token overlap and spelling, the seat by comparison with the PLZ and Ort of the company.
+    """
+    wanted = name_tokens(company["Firma"])
+    found = name_tokens(row.name)
+    if not wanted or not found:
+        return 0.0
+    overlap = 2 * len(set(wanted) & set(found)) / (len(set(wanted)) + len(set(found)))
+    spelling = difflib.SequenceMatcher(None, " ".join(wanted), " ".join(found)).ratio()
+    name = max(overlap, spelling)
+
+    city = str(company.get("Ort") or "").casefold().strip()
+    zip_code = str(company.get("PLZ") or "").strip()
+    seat = str(row.seat or "").casefold().strip()
+    if not seat or not (city or zip_code):
+        location = 0.5
+    elif zip_code and zip_code in seat:
+        location = 1.0
+    elif city and (city == seat or city in seat or seat in city):
+        location = 1.0
+    else:
+        location = 0.0
+    return NAME_WEIGHT * name + CITY_WEIGHT * location
+
+
+def best_match(rows, company, threshold=0.8):
+    """
+    :return: the best scoring ResultRow if it clears the threshold and is not tied with another row, else None
+    """
+    for row in rows:
+        row.score = score(row, company)
+    ranked = sorted(rows, key=lambda row: row.score, reverse=True)
+    if not ranked or ranked[0].score < threshold:
+        return None
+    if len(ranked) > 1 and ranked[1].score == ranked[0].score:
+        # two equally good rows, downloading either would be a guess
+        return None
+    return ranked[0]
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+from src.keywords import legal_form
+
+# keywords further down the list than this share one statistic
+MAX_POSITION = 3
+
+
+class SearchScheduler:
+    """
+    Learns which searchmode and keyword position produce the single hit and orders the search cascade by it.
+    Statistics are kept per legal form, per Bundesland and overall and are persisted between runs.
+
+    :param path: str, json file holding the statistics
+    :param prune_after: int, searches after which an attempt that never hit is dropped
+    :param weight: float, number of searches a group needs before its own rate outweighs the overall rate
+    """
+
+    def __init__(self, path, prune_after=50, weight=5) -> None:
+        self.path = path
+        self.prune_after = prune_after
+        self.weight = weight
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.searches = 0
+        self.resolved = 0
+        if os.path.exists(path):
+            try:
+                with open(path, mode="r", encoding="utf-8") as file:
+                    self.stats = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Suchstatistik {path} konnte nicht gelesen werden: {e}")
+
+    def groups(self, company):
+        return ["all", f"form:{legal_form(company['Firma'])}", f"land:{company['Bundesland']}"]
+
+    def arm(self, position, mode):
+        return f"{min(position, MAX_POSITION)}:{mode}"
+
+    def counts(self, group, arm):
+        tries, hits = self.stats.get(group, {}).get(arm, (0, 0))
+        return tries, hits
+
+    def score(self, company, position, mode):
+        overall, form, land = self.groups(company)
+        arm = self.arm(position, mode)
+        tries, hits = self.counts(overall, arm)
+        base = (hits + 1) / (tries + 2)
+        rates = []
+        for group in (form, land):
+            tries, hits = self.counts(group, arm)
+            rates.append((hits + self.weight * base) / (tries + self.weight))
+        return sum(rates) / len(rates)
+
+    def pruned(self, position, mode):
+        tries, hits = self.counts("all", self.arm(position, mode))
+        return tries >= self.prune_after and hits == 0
+
+    def order(self, company, attempts):
+        """
+        :param attempts: list of (keyword position, keyword, searchmode index) in the default order
+        :return: the same attempts, best first, without the ones that never hit
+        """
+        with self.lock:
+            kept = [attempt for attempt in attempts if not self.pruned(attempt[0], attempt[2])]
+            if not kept:
+                kept = attempts
+            # sorted() is stable, so untried attempts keep the hard-coded order
+            return sorted(kept, key=lambda attempt: -self.score(company, attempt[0], attempt[2]))
+
+    def record(self, company, position, mode, hit):
+        arm = self.arm(position, mode)
+        with self.lock:
+            self.searches += 1
+            if hit:
+                self.resolved += 1
+            for group in self.groups(company):
+                tries, hits = self.stats.setdefault(group, {}).get(arm, (0, 0))
+                self.stats[group][arm] = (tries + 1, hits + int(hit))
+
+    def save(self):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, mode="w", encoding="utf-8") as file:
+                json.dump(self.stats, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def summary(self):
+        if not self.resolved:
+            return f"Suchplanung: {self.searches} Suchen, keine Firma eindeutig gefunden"
+        return f"Suchplanung: {self.searches} Suchen, {self.searches / self.resolved:.1f} pro gefundener Firma"
@@ -0,0 +1,357 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import zipfile
+import zlib
+from src.downloads import DownloadWatcher, release as release_downloads
+from src.journal import company_key
+from src.metrics import METRICS
+from src.ratelimit import PortalError
+from src.results import parse_results
+
+# members of a session archive besides the pages and files
+INDEX = "session.jsonl"
+INPUT = "input.csv"
+# local file header of a zip member, see APPNOTE.TXT 4.3.7
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+LOCAL_SIGNATURE = b"PK\x03\x04"
+# outcomes of a result page, like the states of src.readiness
+THROTTLED = "throttled"
+ERROR = "error"
+
+
+def step_key(company, word, mode):
+    """:return: list, company, search word and index in SEARCHMODES, what every recorded page is filed under"""
+    return [company_key(company), str(word), int(mode)]
+
+
+def journal_path(path):
+    """Events of a running recording, the archive only gets its index when the recording is closed."""
+    return f"{path}.jsonl"
+
+
+def scan_members(path):
+    """
+    Finds the members of a zip archive whose central directory was never written, because the crawl
+    recording it was killed. Every member written completely is found, a cut off last one is left out.
+
+    :return: dict, member name to (offset of the data, compressed size, compression method)
+    """
+    members = {}
+    with open(path, mode="rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        offset = 0
+        while offset + LOCAL_HEADER.size <= size:
+            file.seek(offset)
+            header = LOCAL_HEADER.unpack(file.read(LOCAL_HEADER.size))
+            if header[0] != LOCAL_SIGNATURE:
+                break
+            method, compressed, name_length, extra_length = header[3], header[7], header[9], header[10]
+            name = file.read(name_length).decode("utf-8")
+            data = offset + LOCAL_HEADER.size + name_length + extra_length
+            if data + compressed > size:
+                break
+            members[name] = (data, compressed, method)
+            offset = data + compressed
+    return members
+
+
+class SessionRecorder:
+    """
+    Writes everything the crawler sees into one compressed zip archive: search submissions, result pages,
+    charge pages and the downloaded files, each filed under the company and search step that produced it.
+    Identical pages and files, like the many empty result pages, are stored once.
+
+    Events go to a journal next to the archive right away, so a crawl that is killed still leaves
+    a session SessionArchive can open.
+
+    :param path: str, path of the archive, an existing one is replaced
+    :param input_file: str or None, company list of the crawl, stored along so a replay needs nothing else
+    """
+
+    def __init__(self, path, input_file=None) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.archive = zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+        self.journal = open(journal_path(path), mode="w", encoding="utf-8")
+        self.members = set()
+        self.events = 0
+        if input_file:
+            self.archive.write(input_file, INPUT)
+
+    def store(self, folder, data, suffix):
+        name = f"{folder}/{hashlib.blake2b(data, digest_size=16).hexdigest()}{suffix}"
+        if name not in self.members:
+            self.archive.writestr(name, data)
+            self.members.add(name)
+        return name
+
+    def record(self, step, kind, page=None, file_path=None, **data):
+        """
+        :param step: list, see step_key
+        :param kind: str, search, results, charge or download
+        :param page: str or None, html of the page
+        :param file_path: str or None, a downloaded file
+        """
+        if step is None:
+            return
+        event = {"company": step[0], "word": step[1], "mode": step[2], "kind": kind, **data}
+        content = None
+        if file_path is not None:
+            with open(file_path, mode="rb") as file:
+                content = file.read()
+            event["filename"] = os.path.basename(file_path)
+        with self.lock:
+            if self.archive is None:
+                return
+            if page is not None:
+                event["member"] = self.store("pages", page.encode("utf-8"), ".html")
+            if content is not None:
+                event["member"] = self.store("files", content, os.path.splitext(file_path)[1])
+            # the member is on disk before its event is in the journal
+            self.archive.fp.flush()
+            self.journal.write(json.dumps(event, ensure_ascii=False) + "\n")
+            self.journal.flush()
+            self.events += 1
+        METRICS.count("session_recorded")
+
+    def record_downloads(self, slots):
+        """Files of finished download slots, before they are moved into the result folders."""
+        for slot in slots:
+            if slot.path and slot.label:
+                label = slot.label
+                self.record(label["step"], "download", file_path=slot.path, suffix=slot.suffix, table=label["table"])
+
+    def close(self):
+        with self.lock:
+            if self.archive is None:
+                return
+            self.journal.close()
+            self.archive.write(journal_path(self.path), INDEX)
+            self.archive.close()
+            self.archive = None
+            os.remove(journal_path(self.path))
+
+    def summary(self):
+        return f"Sitzung: {self.events} Aufzeichnungen, {len(self.members)} Seiten und Dateien in {self.path}"
+
+
+class SessionArchive:
+    """
+    A session written by SessionRecorder, opened for replay. The session of a killed crawl is read from
+    the journal next to the archive, with the members that made it into the archive.
+
+    :param path: str, path of the archive
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.archive = None
+        self.recovered = None
+        try:
+            self.archive = zipfile.ZipFile(path, mode="r")
+            lines = self.archive.read(INDEX).decode("utf-8").splitlines()
+        except (zipfile.BadZipFile, KeyError):
+            if self.archive:
+                self.archive.close()
+                self.archive = None
+            if not os.path.exists(journal_path(path)):
+                raise
+            self.recovered = scan_members(path)
+            with open(journal_path(path), mode="r", encoding="utf-8") as file:
+                # a line cut off by the kill is left out
+                lines = [line for line in file.read().split("\n")[:-1] if line]
+        self.steps = {}
+        # first appearance of every step, the order the recorded crawl searched in
+        self.sequence = {}
+        for line in lines:
+            event = json.loads(line)
+            if "member" in event and not self.has(event["member"]):
+                continue
+            key = (event["company"], event["word"], event["mode"])
+            self.steps.setdefault(key, []).append(event)
+            self.sequence.setdefault(key, len(self.sequence))
+
+    def has(self, member):
+        return member in self.recovered if self.archive is None else True
+
+    def events(self, step, kind):
+        return [event for event in self.steps.get(tuple(step), []) if event["kind"] == kind]
+
+    def read(self, member):
+        with self.lock:
+            if self.archive is not None:
+                return self.archive.read(member)
+            offset, compressed, method = self.recovered[member]
+            with open(self.path, mode="rb") as file:
+                file.seek(offset)
+                data = file.read(compressed)
+        return zlib.decompress(data, -zlib.MAX_WBITS) if method == zipfile.ZIP_DEFLATED else data
+
+    def extract_input(self, path):
+        """:return: bool, whether the archive holds the company list of the recorded crawl"""
+        names = self.recovered if self.archive is None else self.archive.namelist()
+        if INPUT not in names:
+            return False
+        with open(path, mode="wb") as file:
+            file.write(self.read(INPUT))
+        return True
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+    def summary(self):
+        state = ", aus abgebrochener Aufzeichnung" if self.archive is None else ""
+        return f"{len(self.steps)} aufgezeichnete Suchen in {self.path}{state}"
+
+
+class RecordedOrder:
+    """
+    Stands in for the SearchScheduler in a replay: searches come in the order the recorded crawl sent them,
+    what a scheduler learned since then or a search cache would change the steps and miss the recording.
+
+    :param archive: SessionArchive
+    """
+
+    def __init__(self, archive) -> None:
+        self.archive = archive
+
+    def order(self, company, attempts):
+        key = company_key(company)
+        unknown = len(self.archive.sequence)
+        # sorted is stable, attempts the recording doesn't hold keep their order after the recorded ones
+        return sorted(
+            attempts, key=lambda attempt: self.archive.sequence.get((key, str(attempt[1]), attempt[2]), unknown)
+        )
+
+    def record(self, company, position, mode, hit):
+        pass
+
+    def save(self):
+        pass
+
+    def summary(self):
+        return "Suchreihenfolge der Aufzeichnung"
+
+
+class ReplayDriver:
+    """Stands in for the WebDriver where the crawler talks to the browser directly, it never dies."""
+
+    def execute_script(self, script, *args):
+        return 1
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+
+class ReplayConnector:
+    """
+    Plays a recorded session back through the interface of MyConnector, without a browser and without waiting.
+    A search the session doesn't hold comes back without hits and is counted as replay_missing.
+    Throttling pages are left out, they tell something about the portal, not about the crawler.
+
+    :param archive: SessionArchive
+    :param download_dir: str, directory the recorded files are put into, like a browser's downloads
+    :param link: str, search page of the recorded crawl
+    """
+
+    def __init__(self, archive, download_dir, link=None) -> None:
+        self.archive = archive
+        self.link = link
+        self.driver = ReplayDriver()
+        self.limiter = None
+        self.egress = None
+        self.download_dir = os.path.join(os.getcwd(), download_dir)
+        self.downloads = DownloadWatcher(self.download_dir)
+        self.slots = []
+        self.step = None
+        self.result = None
+        self.page = None
+        # how often each step was searched, a search repeated after an error page has several recordings
+        self.replayed = {}
+        self.searches = 0
+        self.missing = 0
+
+    def set_step(self, company, word, mode):
+        self.step = step_key(company, word, mode)
+
+    def search(self, search_key, **params):
+        key = tuple(self.step)
+        events = [event for event in self.archive.events(key, "results") if event["outcome"] != THROTTLED]
+        number = self.replayed.get(key, 0)
+        self.replayed[key] = number + 1
+        self.searches += 1
+        self.result = events[min(number, len(events) - 1)] if events else None
+        self.page = None
+        if self.result is None:
+            self.missing += 1
+            METRICS.count("replay_missing")
+
+    def results_count(self):
+        if self.result is None:
+            return 0
+        if self.result["outcome"] == ERROR:
+            raise PortalError("results: Portal meldet einen Fehler (Aufzeichnung)")
+        if "member" in self.result:
+            self.page = self.archive.read(self.result["member"]).decode("utf-8")
+        return self.result["count"]
+
+    def result_rows(self):
+        return parse_results(self.page or "")
+
+    def save_results(self, tablenumber: int = 1):
+        found = False
+        for event in self.archive.events(self.step, "download"):
+            if event["table"] != tablenumber:
+                continue
+            found = True
+            slot = self.downloads.expect(event["suffix"])
+            path = os.path.join(slot.directory, event["filename"])
+            # written under a partial name first, like a browser does
+            with open(f"{path}.part", mode="wb") as file:
+                file.write(self.archive.read(event["member"]))
+            os.replace(f"{path}.part", path)
+            self.slots.append(slot)
+        if not found:
+            self.missing += 1
+            METRICS.count("replay_missing")
+        return True
+
+    def take_downloads(self):
+        slots, self.slots = self.slots, []
+        return slots
+
+    def release_downloads(self):
+        release_downloads(self.slots)
+        self.slots = []
+
+    def open_search_page(self):
+        pass
+
+    def back_to_search(self):
+        pass
+
+    def reset_search(self, state=None, keep_state=True, **fields):
+        pass
+
+    def init_wait(self):
+        pass
+
+    def browser_args(self):
+        return []
+
+    def adopt(self, driver):
+        pass
+
+    def summary(self):
+        return f"{self.searches} Suchen abgespielt, {self.missing} nicht in der Aufzeichnung"
+
+    def close_connection(self):
+        pass
@@ -0,0 +1,156 @@
+import atexit
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+
+class CsvBackend:
+    """Semicolon separated file like initialize_csv/append_to_csv, the header is written once for a new file."""
+
+    def __init__(self, path, headers) -> None:
+        self.path = path
+        self.headers = headers
+        self.file = open(path, mode="a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=headers, delimiter=";")
+        if self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesBackend:
+    def __init__(self, path, headers) -> None:
+        self.path = path
+        self.headers = headers
+        self.file = open(path, mode="a", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps({key: row.get(key) for key in self.headers}, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class SqliteBackend:
+    def __init__(self, path, headers, table="results") -> None:
+        self.path = path
+        self.headers = headers
+        self.table = table
+        # the sink serialises all access, rows may come from any worker thread
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        columns = ", ".join(f'"{header}" TEXT' for header in headers)
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+        placeholders = ", ".join("?" for _ in headers)
+        names = ", ".join(f'"{header}"' for header in headers)
+        self.insert = f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})'
+
+    def write(self, rows):
+        values = [tuple(None if row.get(key) is None else str(row.get(key)) for key in self.headers) for row in rows]
+        self.connection.executemany(self.insert, values)
+
+    def flush(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+BACKENDS = {
+    "csv": (CsvBackend, "results.csv"),
+    "jsonl": (JsonLinesBackend, "results.jsonl"),
+    "sqlite": (SqliteBackend, "results.sqlite"),
+}
+
+
+class ResultSink:
+    """
+    Long-lived writer for result rows with a fixed schema.
+    Rows are buffered and handed to the backend once flush_rows are waiting or flush_seconds have passed,
+    and on close, which also runs at interpreter exit.
+
+    :param backend: object with write(rows), flush() and close(), e.g. CsvBackend
+    :param headers: list, columns of every row, keys outside of it are an error
+    :param flush_rows: int, buffered rows that trigger a flush
+    :param flush_seconds: float, longest time a row stays in the buffer
+    """
+
+    def __init__(self, backend, headers, flush_rows=200, flush_seconds=5) -> None:
+        self.backend = backend
+        self.headers = list(headers)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.callbacks = []
+        self.written = 0
+        self.lock = threading.RLock()
+        self.closed = False
+        self.stop = threading.Event()
+        self.timer = threading.Thread(target=self.flush_periodically, name="result-sink", daemon=True)
+        self.timer.start()
+        atexit.register(self.close)
+
+    def write(self, rows, on_flushed=None):
+        """
+        :param rows: list of dicts with the keys of headers
+        :param on_flushed: callable, called once these rows are on disk
+        """
+        for row in rows:
+            unknown = set(row) - set(self.headers)
+            if unknown:
+                raise ValueError(f"Unbekannte Spalten: {', '.join(sorted(unknown))}")
+        with self.lock:
+            if self.closed:
+                raise ValueError("ResultSink ist bereits geschlossen")
+            self.buffer.extend(rows)
+            if on_flushed:
+                self.callbacks.append(on_flushed)
+            if len(self.buffer) >= self.flush_rows:
+                self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.buffer:
+                self.backend.write([{key: row.get(key) for key in self.headers} for row in self.buffer])
+                self.written += len(self.buffer)
+                self.buffer = []
+            self.backend.flush()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def flush_periodically(self):
+        while not self.stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Ergebnisse konnten nicht geschrieben werden: {e}")
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.stop.set()
+            self.flush()
+            self.backend.close()
+            self.closed = True
+
+
+def open_sink(results_dir, headers, output="csv", **kwargs):
+    backend_class, filename = BACKENDS[output]
+    return ResultSink(backend_class(os.path.join(results_dir, filename), headers), headers, **kwargs)
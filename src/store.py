@@ -0,0 +1,261 @@
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from src.extract import RESULT_HEADERS, result_lines, error_line
+from src.journal import company_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    firma TEXT NOT NULL,
+    bundesland TEXT,
+    ort TEXT,
+    plz TEXT,
+    strasse TEXT,
+    hinweis TEXT,
+    xml TEXT,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS organizations (
+    id INTEGER PRIMARY KEY,
+    registernummer TEXT NOT NULL DEFAULT '',
+    bezeichnung TEXT NOT NULL DEFAULT '',
+    rechtsform TEXT,
+    UNIQUE (registernummer, bezeichnung)
+);
+CREATE TABLE IF NOT EXISTS persons (
+    id INTEGER PRIMARY KEY,
+    nachname TEXT NOT NULL DEFAULT '',
+    vorname TEXT NOT NULL DEFAULT '',
+    UNIQUE (nachname, vorname)
+);
+CREATE TABLE IF NOT EXISTS roles (
+    company_id INTEGER NOT NULL REFERENCES companies (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    person_id INTEGER REFERENCES persons (id),
+    organization_id INTEGER REFERENCES organizations (id),
+    rolle TEXT,
+    PRIMARY KEY (company_id, position)
+);
+CREATE TABLE IF NOT EXISTS vertretung (
+    company_id INTEGER PRIMARY KEY REFERENCES companies (id) ON DELETE CASCADE,
+    codes TEXT,
+    texts TEXT
+);
+CREATE INDEX IF NOT EXISTS companies_firma ON companies (firma COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS organizations_registernummer ON organizations (registernummer);
+CREATE INDEX IF NOT EXISTS organizations_bezeichnung ON organizations (bezeichnung COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS persons_name ON persons (nachname COLLATE NOCASE, vorname COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS roles_person ON roles (person_id);
+CREATE INDEX IF NOT EXISTS roles_organization ON roles (organization_id);
+"""
+
+
+def text(value):
+    return "" if value is None else str(value).strip()
+
+
+class RegisterStore:
+    """
+    Everything the crawler found, normalized into SQLite and kept across runs, unlike results.csv which is moved
+    to storage/ with every new run. A company written again replaces its persons, organizations and Vertretung
+    with those of the newer XML file. Persons are told apart by name only, the XML carries nothing else about them.
+
+    :param path: str, path of the database file
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        # rows come from any thread of the file pipeline, the lock serialises them
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+        self.written = 0
+        self.counts = None
+
+    def upsert_company(self, company, msg, xml_path=None):
+        values = (
+            company_key(company),
+            text(company.get("Firma")),
+            company.get("Bundesland"),
+            company.get("Ort"),
+            None if company.get("PLZ") is None else str(company.get("PLZ")),
+            company.get("Straße"),
+            msg,
+            xml_path,
+            datetime.now().isoformat(timespec="seconds"),
+        )
+        # an error doesn't replace what an earlier run found, only a new XML file does
+        self.connection.execute(
+            """
+            INSERT INTO companies (key, firma, bundesland, ort, plz, strasse, hinweis, xml, updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                firma = excluded.firma,
+                bundesland = excluded.bundesland,
+                ort = excluded.ort,
+                plz = excluded.plz,
+                strasse = excluded.strasse,
+                hinweis = CASE WHEN excluded.xml IS NULL AND companies.xml IS NOT NULL
+                    THEN companies.hinweis ELSE excluded.hinweis END,
+                xml = COALESCE(excluded.xml, companies.xml),
+                updated = excluded.updated
+            """,
+            values,
+        )
+        return self.connection.execute("SELECT id FROM companies WHERE key = ?", (values[0],)).fetchone()[0]
+
+    def upsert_organization(self, organization):
+        registernummer, bezeichnung = text(organization.get("Registernummer")), text(organization.get("Bezeichnung"))
+        self.connection.execute(
+            """
+            INSERT INTO organizations (registernummer, bezeichnung, rechtsform) VALUES (?, ?, ?)
+            ON CONFLICT (registernummer, bezeichnung) DO UPDATE SET
+                rechtsform = COALESCE(excluded.rechtsform, organizations.rechtsform)
+            """,
+            (registernummer, bezeichnung, organization.get("Rechtsform")),
+        )
+        return self.connection.execute(
+            "SELECT id FROM organizations WHERE registernummer = ? AND bezeichnung = ?", (registernummer, bezeichnung)
+        ).fetchone()[0]
+
+    def upsert_person(self, person):
+        nachname, vorname = text(person.get("Nachname")), text(person.get("Vorname"))
+        self.connection.execute("INSERT OR IGNORE INTO persons (nachname, vorname) VALUES (?, ?)", (nachname, vorname))
+        return self.connection.execute(
+            "SELECT id FROM persons WHERE nachname = ? AND vorname = ?", (nachname, vorname)
+        ).fetchone()[0]
+
+    def put(self, company, persons, organizations, vertretung, msg, xml_path=None):
+        """
+        Stores the extraction of one XML file for a company of the input list.
+
+        :param persons: list of dict, from StreamingDataXML.extract_all
+        :param organizations: list of dict, from StreamingDataXML.extract_all
+        :param vertretung: dict, with codes and texts
+        """
+        with self.lock, self.connection:
+            company_id = self.upsert_company(company, msg, xml_path or "")
+            self.connection.execute("DELETE FROM roles WHERE company_id = ?", (company_id,))
+            # organizations first, then persons, in the order of the XML file
+            roles = [(None, self.upsert_organization(organization), None) for organization in organizations]
+            roles += [(self.upsert_person(person), None, person.get("Code")) for person in persons]
+            self.connection.executemany(
+                "INSERT INTO roles (company_id, position, person_id, organization_id, rolle) VALUES (?, ?, ?, ?, ?)",
+                [(company_id, position, *role) for position, role in enumerate(roles)],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO vertretung (company_id, codes, texts) VALUES (?, ?, ?)",
+                (company_id, vertretung.get("codes"), vertretung.get("texts")),
+            )
+            self.written += 1
+
+    def put_error(self, company, msg):
+        """A company without result, kept with its note unless an earlier run found it."""
+        with self.lock, self.connection:
+            self.upsert_company(company, msg)
+            self.written += 1
+
+    def company_ids(self, person=None):
+        """
+        :param person: str or None, "Nachname" or "Nachname, Vorname", only companies this person is involved in
+        :return: list of int, in the order the companies were first stored
+        """
+        if person is None:
+            query, values = "SELECT id FROM companies ORDER BY id", ()
+        else:
+            nachname, _, vorname = (part.strip() for part in person.partition(","))
+            query = """
+                SELECT DISTINCT roles.company_id FROM roles JOIN persons ON persons.id = roles.person_id
+                WHERE persons.nachname = ? COLLATE NOCASE AND (? = '' OR persons.vorname = ? COLLATE NOCASE)
+                ORDER BY roles.company_id
+            """
+            values = (nachname, vorname, vorname)
+        with self.lock:
+            return [row[0] for row in self.connection.execute(query, values)]
+
+    def result_rows(self, company_id):
+        """The rows results.csv has for a company, built by result_lines like during the crawl."""
+        with self.lock:
+            firma, bundesland, ort, plz, strasse, msg, xml = self.connection.execute(
+                "SELECT firma, bundesland, ort, plz, strasse, hinweis, xml FROM companies WHERE id = ?", (company_id,)
+            ).fetchone()
+            roles = self.connection.execute(
+                """
+                SELECT persons.nachname, persons.vorname, roles.rolle,
+                    organizations.bezeichnung, organizations.rechtsform, organizations.registernummer
+                FROM roles
+                LEFT JOIN persons ON persons.id = roles.person_id
+                LEFT JOIN organizations ON organizations.id = roles.organization_id
+                WHERE roles.company_id = ? ORDER BY roles.position
+                """,
+                (company_id,),
+            ).fetchall()
+            vertretung = self.connection.execute(
+                "SELECT codes, texts FROM vertretung WHERE company_id = ?", (company_id,)
+            ).fetchone()
+        company = {"Firma": firma, "Bundesland": bundesland, "Ort": ort, "PLZ": plz, "Straße": strasse}
+        if xml is None:
+            return [error_line(company, msg)]
+        # an organization always has a name, empty at least, so rows without one are persons
+        persons = [{"Nachname": row[0], "Vorname": row[1], "Code": row[2]} for row in roles if row[3] is None]
+        organizations = [
+            {"Bezeichnung": row[3], "Rechtsform": row[4], "Registernummer": row[5]}
+            for row in roles
+            if row[3] is not None
+        ]
+        codes, texts = vertretung or (None, None)
+        return result_lines(company, persons, organizations, {"codes": codes, "texts": texts}, msg)
+
+    def export(self, path, person=None):
+        """
+        Writes the rows of every stored company in the format of results.csv.
+
+        :return: int, number of rows
+        """
+        rows = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=RESULT_HEADERS, delimiter=";")
+            writer.writeheader()
+            for company_id in self.company_ids(person):
+                lines = self.result_rows(company_id)
+                writer.writerows(lines)
+                rows += len(lines)
+        os.replace(tmp_path, path)
+        return rows
+
+    def count(self):
+        return [
+            self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("companies", "organizations", "persons")
+        ]
+
+    def close(self):
+        with self.lock:
+            if self.connection is None:
+                return
+            # kept for the summary printed after the crawl
+            self.counts = self.count()
+            self.connection.close()
+            self.connection = None
+
+    def summary(self):
+        with self.lock:
+            counts = self.counts if self.connection is None else self.count()
+        return (
+            f"Registerdatenbank {self.path}: {counts[0]} Firmen, {counts[1]} Organisationen, {counts[2]} Personen, "
+            f"{self.written} in diesem Lauf geschrieben"
+        )
@@ -0,0 +1,130 @@
+import threading
+import time
+from src.metrics import METRICS
+
+
+class BrowserDied(Exception):
+    """The browser of a worker stopped answering, the company it worked on has to be done again."""
+
+
+def is_alive(driver, timeout=5):
+    """Liveness ping, a dead chromedriver or a crashed Chrome raises or hangs instead of answering."""
+    answer = []
+
+    def ping():
+        try:
+            answer.append(driver.execute_script("return 1") == 1)
+        except Exception:
+            answer.append(False)
+
+    thread = threading.Thread(target=ping, name="liveness", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return bool(answer and answer[0])
+
+
+def check_alive(connection, error):
+    """Turns an error of a dead browser into BrowserDied, errors of a living one are left to the caller."""
+    if not is_alive(connection.driver):
+        raise BrowserDied(str(error)) from error
+
+
+class Supervisor:
+    """
+    Replaces dead browsers. A standby browser is started in the background and kept on the search page,
+    so a worker gets a working browser back without waiting for a cold Chrome start.
+
+    :param launch: callable(chrome_args) -> WebDriver, starts a browser on the search page
+    :param standby: bool, keep a browser in reserve
+    """
+
+    def __init__(self, launch, standby=True) -> None:
+        self.launch = launch
+        self.standby = standby
+        self.lock = threading.Lock()
+        # chrome arguments of the standby browser and the browser itself once started
+        self.reserve_args = None
+        self.reserve = None
+        self.reserve_ready = threading.Event()
+        self.restarts = 0
+        self.warm = 0
+        self.cold = 0
+        self.closed = False
+
+    def prepare(self, chrome_args):
+        """Starts a standby browser with these arguments, unless there is one already."""
+        if not self.standby:
+            return
+        with self.lock:
+            if self.closed or self.reserve_args is not None:
+                return
+            self.reserve_args = tuple(chrome_args)
+            self.reserve = None
+            self.reserve_ready.clear()
+        threading.Thread(target=self.start_reserve, args=(tuple(chrome_args),), name="standby", daemon=True).start()
+
+    def start_reserve(self, chrome_args):
+        try:
+            driver = self.launch(list(chrome_args))
+        except Exception as e:
+            print(f"\nReservebrowser konnte nicht gestartet werden: {e}")
+            driver = None
+        with self.lock:
+            if self.closed and driver:
+                quit_quietly(driver)
+                driver = None
+            self.reserve = driver
+            if driver is None:
+                self.reserve_args = None
+            self.reserve_ready.set()
+
+    def take(self, chrome_args, timeout=60):
+        """
+        :return: (WebDriver, bool), a browser on the search page and whether it was the standby one
+        """
+        chrome_args = tuple(chrome_args)
+        with self.lock:
+            matching = self.reserve_args == chrome_args
+        if matching and self.reserve_ready.wait(timeout):
+            with self.lock:
+                driver, self.reserve, self.reserve_args = self.reserve, None, None
+            if driver is not None and is_alive(driver):
+                return driver, True
+            if driver is not None:
+                quit_quietly(driver)
+        return self.launch(list(chrome_args)), False
+
+    def recover(self, connection):
+        """Swaps the dead browser of a connection for a working one and starts the next standby browser."""
+        start = time.perf_counter()
+        quit_quietly(connection.driver)
+        args = connection.browser_args()
+        driver, warm = self.take(args)
+        connection.adopt(driver)
+        with self.lock:
+            self.restarts += 1
+            if warm:
+                self.warm += 1
+            else:
+                self.cold += 1
+        METRICS.count("browser_restart")
+        METRICS.observe("browser_recover", time.perf_counter() - start)
+        self.prepare(args)
+        return warm
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            driver, self.reserve = self.reserve, None
+        if driver is not None:
+            quit_quietly(driver)
+
+    def summary(self):
+        return f"Browser-Neustarts: {self.restarts} ({self.warm} aus Reserve, {self.cold} kalt)"
+
+
+def quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
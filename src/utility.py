@@ -25,6 +25,30 @@ def waiting_for_godot(time_start, time_end, time_min):
     countdown(time_waiting)
 
 
+def result_filename(company):
+    """
+    Name the documents of a company are saved under. PLZ and Ort are part of it, because the input list
+    has companies of the same name in several places and the pipeline handles them at the same time.
+    """
+    parts = [str(company.get(field) or "").strip() for field in ("Firma", "PLZ", "Ort")]
+    return "_".join(part for part in parts if part)
+
+
+def split_result_filename(name):
+    """
+    The company of a file named by result_filename. Files of older runs and names without PLZ
+    only give the Firma back.
+
+    :return: dict with Firma, PLZ and Ort, the last two None if the name doesn't hold them
+    """
+    parts = name.rsplit("_", 2)
+    if len(parts) == 3 and parts[1].isdigit():
+        return {"Firma": parts[0], "PLZ": parts[1], "Ort": parts[2]}
+    if len(parts) >= 2 and parts[-1].isdigit():
+        return {"Firma": "_".join(parts[:-1]), "PLZ": parts[-1], "Ort": None}
+    return {"Firma": name, "PLZ": None, "Ort": None}
+
+
 def move_and_rename_files(source_dir, xml_dest_dir, pdf_dest_dir, new_filename):
     try:
         # Find the first XML file in the source directory
@@ -34,17 +58,32 @@ def move_and_rename_files(source_dir, xml_dest_dir, pdf_dest_dir, new_filename):
 
         # Find the corresponding PDF file
         pdf_file = next((file for file in os.listdir(source_dir) if file.endswith(".pdf")), None)
-        if not pdf_file:
-            xml_source_path = os.path.join(source_dir, xml_file)
-            xml_dest_path = os.path.join(xml_dest_dir, f"{new_filename}.xml")
-            shutil.move(xml_source_path, xml_dest_path)
-            return xml_dest_path, "Corresponding PDF file not found."
+        pdf_source_path = os.path.join(source_dir, pdf_file) if pdf_file else None
+        return move_and_rename(
+            os.path.join(source_dir, xml_file), pdf_source_path, xml_dest_dir, pdf_dest_dir, new_filename
+        )
 
-        # Define the paths
-        xml_source_path = os.path.join(source_dir, xml_file)
-        pdf_source_path = os.path.join(source_dir, pdf_file)
+    except Exception as e:
+        return None, f"An error occurred: {e}"
+
+
+def move_and_rename(xml_source_path, pdf_source_path, xml_dest_dir, pdf_dest_dir, new_filename):
+    """
+    Moves a downloaded XML and PDF file into the result folders under the company name.
+
+    :param xml_source_path: str or None, downloaded XML file
+    :param pdf_source_path: str or None, downloaded PDF file
+    :return: (str, str), path of the moved XML file or None and a message for the Hinweis column
+    """
+    try:
+        if not xml_source_path:
+            return None, "No XML files found in the source directory."
 
         xml_dest_path = os.path.join(xml_dest_dir, f"{new_filename}.xml")
+        if not pdf_source_path:
+            shutil.move(xml_source_path, xml_dest_path)
+            return xml_dest_path, "Corresponding PDF file not found."
+
         pdf_dest_path = os.path.join(pdf_dest_dir, f"{new_filename}.pdf")
 
         # Move and rename the XML and PDF files
@@ -79,12 +118,6 @@ def write_to_terminal(msg: str):
     sys.stdout.flush()
 
 
-def clean_list(data_list, forbidden_list):
-    forbidden_list_lower = [item.lower() for item in forbidden_list]
-    cleaned_list = [item for item in data_list if item.lower() not in forbidden_list_lower]
-    return cleaned_list
-
-
 def read_csv(file_path):
     with open(file_path, mode="r", newline="", encoding="utf-8") as file:
         # Creating a csv DictReader object
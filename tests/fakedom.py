@@ -0,0 +1,100 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+NODE = shutil.which("node")
+needs_node = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+# just enough of a browser page for the scripts the crawler runs through execute_script
+FAKE_DOM = """
+class Element extends EventTarget {
+  constructor(tag, attrs = {}, children = []) {
+    super();
+    this.tagName = tag.toUpperCase();
+    this.attributes = {};
+    Object.keys(attrs).forEach((name) => this.setAttribute(name, attrs[name]));
+    this.id = attrs.id || "";
+    this.className = attrs.class || "";
+    this.value = attrs.value || "";
+    this.checked = !!attrs.checked;
+    this.children = [];
+    this.events = [];
+    this.clicks = 0;
+    this.onclick = null;
+    children.forEach((child) => this.appendChild(child));
+  }
+  appendChild(child) {
+    child.parentNode = this;
+    this.children.push(child);
+    mutated();
+    return child;
+  }
+  getAttribute(name) { return name in this.attributes ? this.attributes[name] : null; }
+  setAttribute(name, value) { this.attributes[name] = String(value); }
+  removeAttribute(name) { delete this.attributes[name]; }
+  dispatchEvent(event) { this.events.push(event.type); return super.dispatchEvent(event); }
+  click() {
+    this.clicks += 1;
+    if (this.onclick) { this.onclick(); }
+  }
+  *descendants() {
+    for (const child of this.children) { yield child; yield* child.descendants(); }
+  }
+  getElementsByClassName(name) {
+    return [...this.descendants()].filter((element) => element.className.split(" ").includes(name));
+  }
+  getElementsByTagName(tag) {
+    return [...this.descendants()].filter((element) => element.tagName === tag.toUpperCase());
+  }
+  querySelector(selector) {
+    if (selector.startsWith(".")) { return this.getElementsByClassName(selector.slice(1))[0] || null; }
+    if (selector.startsWith("#")) { return [...this.descendants()].find((e) => e.id === selector.slice(1)) || null; }
+    return this.getElementsByTagName(selector)[0] || null;
+  }
+  closest() { return null; }
+  scrollIntoView() {}
+  get innerText() {
+    return (this.text || "") + this.children.map((child) => child.innerText).join(" ");
+  }
+}
+
+const observers = [];
+function mutated() {
+  observers.forEach((observer) => { if (observer.active) { queueMicrotask(() => observer.callback([])); } });
+}
+class MutationObserver {
+  constructor(callback) { this.callback = callback; this.active = false; observers.push(this); }
+  observe() { this.active = true; }
+  disconnect() { this.active = false; }
+}
+
+const document = new Element("html");
+document.readyState = "complete";
+document.body = document.appendChild(new Element("body"));
+document.getElementById = (id) => document.querySelector("#" + id);
+const window = globalThis;
+window.location = {href: "about:blank"};
+window.addEventListener = () => {};
+const performance = {getEntriesByType: () => window.navigationEntries || []};
+function setText(element, text) { element.text = text; mutated(); }
+"""
+
+
+def run_node(script):
+    """
+    Runs a script after FAKE_DOM in node and returns what it printed as JSON.
+
+    :param script: str, JavaScript ending with console.log(JSON.stringify(...))
+    """
+    result = subprocess.run(
+        [NODE, "-e", FAKE_DOM + script], capture_output=True, text=True, encoding="utf-8", timeout=30
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def call(source, *arguments):
+    """JavaScript calling a script the way execute_script does, with arguments[] bound."""
+    return f"new Function({json.dumps(source)}).apply(null, [{', '.join(arguments)}])"
@@ -0,0 +1,80 @@
+import time
+from src.cache import SearchCache, is_known_hit, is_known_miss
+
+PARAMS = {"search_key": "vital", "mode": "all", "similar": False, "state": "Bayern"}
+A = {"Firma": "Vital GmbH", "PLZ": "80331", "Ort": "München"}
+B = {"Firma": "Vitalstudio Süd", "PLZ": "81369", "Ort": "München"}
+
+
+def test_single_hit_is_known_only_for_its_company(tmp_path):
+    cache = SearchCache(str(tmp_path / "searches.json"))
+    cache.put(PARAMS, 1, company=A)
+    assert is_known_hit(cache.peek(PARAMS), A)
+    entry = cache.get(PARAMS, B)
+    assert not is_known_hit(entry, B)
+    assert not is_known_miss(entry, B)
+    assert cache.misses == 1
+
+
+def test_shared_keyword_hit_is_not_tried_first_for_another_company(tmp_path):
+    from main import SEARCHMODES, CrawlRun, search_attempts, search_params
+    from src.journal import CompanyState
+    from src.keywords import KeywordEngine
+
+    first = {"Firma": "Vital Sport GmbH", "Bundesland": "Bayern", "PLZ": "80331", "Ort": "München", "Straße": "A"}
+    second = {"Firma": "Vital Zentrum GmbH", "Bundesland": "Bayern", "PLZ": "90402", "Ort": "Nürnberg", "Straße": "B"}
+    run = CrawlRun(cache=SearchCache(str(tmp_path / "searches.json")), keywords=KeywordEngine([first, second]))
+    # "Vital" and the Bundesland without address gave the first company as single hit
+    shared = next(attempt for attempt in search_attempts(first, CompanyState(), run) if attempt[1:] == ("Vital", 1))
+    params = search_params(first, "Vital", SEARCHMODES[1])
+    assert params == search_params(second, "Vital", SEARCHMODES[1])
+    run.cache.put(params, 1, company=first, matched=True)
+
+    assert search_attempts(first, CompanyState(), run)[0] == shared
+    assert search_attempts(second, CompanyState(), run)[0][1] == "Vital Zentrum GmbH"
+
+
+def test_no_hit_is_skipped_for_every_company(tmp_path):
+    cache = SearchCache(str(tmp_path / "searches.json"))
+    cache.put(PARAMS, 0, company=A)
+    assert is_known_miss(cache.get(PARAMS, B), B)
+    assert cache.hits == 1
+
+
+def test_multi_hit_page_is_judged_per_company(tmp_path):
+    cache = SearchCache(str(tmp_path / "searches.json"))
+    cache.put(PARAMS, 4, company=A, matched=False)
+    # A wasn't on the page, B may still be
+    assert is_known_miss(cache.get(PARAMS, A), A)
+    assert not is_known_miss(cache.get(PARAMS, B), B)
+    assert not is_known_hit(cache.peek(PARAMS), B)
+    cache.put(PARAMS, 4, company=B, matched=True)
+    assert is_known_hit(cache.peek(PARAMS), B)
+    assert is_known_miss(cache.peek(PARAMS), A)
+
+
+def test_multi_hit_flag_of_older_caches_is_not_trusted(tmp_path):
+    cache = SearchCache(str(tmp_path / "searches.json"))
+    cache.put(PARAMS, 4)
+    cache.peek(PARAMS)["matched"] = False
+    assert not is_known_miss(cache.get(PARAMS, A), A)
+    assert not is_known_hit(cache.peek(PARAMS), A)
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    path = str(tmp_path / "searches.json")
+    cache = SearchCache(path, ttl=60)
+    cache.put(PARAMS, 0, company=A)
+    cache.peek(PARAMS)["time"] = time.time() - 61
+    assert cache.get(PARAMS, A) is None
+    cache.save()
+    assert SearchCache(path, ttl=60).entries == {}
+
+
+def test_register_is_kept_across_save(tmp_path):
+    path = str(tmp_path / "searches.json")
+    cache = SearchCache(path)
+    cache.put(PARAMS, 1, company=A)
+    cache.set_register(PARAMS, "HRB 1")
+    cache.save()
+    assert SearchCache(path).peek(PARAMS)["register"] == "HRB 1"
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from src.companies import StateBatches
+
+ROWS = [
+    ("Vital GmbH", "80331", "München", "Bayern"),
+    ("Nord AG", "20095", "Hamburg", "Hamburg"),
+    ("Vital GmbH", "80331", "München", "Bayern"),
+    ("Süd KG", "86150", "Augsburg", "Bayern"),
+    ("Nord AG", "20095", "Hamburg", "Hamburg"),
+    ("Hafen eG", "20457", "Hamburg", "Hamburg"),
+]
+
+
+def write_list(path):
+    lines = ["Firma;PLZ;Ort;Bundesland"] + [";".join(row) for row in ROWS]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_spilled_batches_drop_duplicates_and_iterate_again(tmp_path):
+    batches = StateBatches(write_list(tmp_path / "list.csv"), memory_rows=1, spill_dir=str(tmp_path))
+    assert batches.read() == 4
+    assert batches.duplicates == 2
+    # the digests went to disk with the rows
+    assert not batches.seen
+    expected = ["Vital GmbH", "Süd KG", "Nord AG", "Hafen eG"]
+    assert [row["Firma"] for row in batches] == expected
+    assert [row["Firma"] for row in batches] == expected
+    directory = batches.directory
+    batches.close()
+    assert not os.path.exists(directory)
+    with pytest.raises(RuntimeError):
+        list(batches)
+
+
+def test_abandoned_iteration_keeps_the_rows(tmp_path):
+    batches = StateBatches(write_list(tmp_path / "list.csv"), memory_rows=2, spill_dir=str(tmp_path))
+    batches.read()
+    first = iter(batches)
+    next(first)
+    first.close()
+    assert len(list(batches)) == 4
+    batches.close()
@@ -0,0 +1,77 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.downloads import DownloadTimeout, DownloadWatcher, Inotify, Poller, collect, release, watch
+
+
+def write_later(path, content=b"<xml/>", delay=0.05, partial=None):
+    def write():
+        time.sleep(delay)
+        if partial:
+            # like a browser, the file is written under a partial name and renamed when complete
+            (path.parent / partial).write_bytes(content)
+            (path.parent / partial).rename(path)
+        else:
+            path.write_bytes(content)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+
+def test_slot_waits_for_the_file_in_its_own_directory(tmp_path):
+    watcher = DownloadWatcher(str(tmp_path))
+    slot = watcher.expect(".xml")
+    assert slot.own_directory and not slot.started
+    writer = write_later(Path(slot.directory) / "auszug.xml", partial="auszug.xml.crdownload")
+    path = slot.wait(timeout=5)
+    writer.join()
+    assert path.endswith("auszug.xml")
+    assert slot.arrived
+    slot.release()
+    assert not (Path(slot.directory)).exists()
+    assert watcher.wait_idle(timeout=0.1)
+
+
+def test_shared_directory_slots_ignore_old_files_and_take_one_file_each(tmp_path):
+    (tmp_path / "old.xml").write_bytes(b"<old/>")
+    watcher = DownloadWatcher(str(tmp_path))
+    first = watcher.expect(".xml", own_directory=False)
+    second = watcher.expect(".xml", own_directory=False)
+    (tmp_path / "a.xml").write_bytes(b"<a/>")
+    (tmp_path / "b.xml").write_bytes(b"<b/>")
+    assert {first.wait(1), second.wait(1)} == {str(tmp_path / "a.xml"), str(tmp_path / "b.xml")}
+
+
+def test_collect_leaves_out_missing_downloads(tmp_path):
+    watcher = DownloadWatcher(str(tmp_path))
+    slots = [watcher.expect(".xml"), watcher.expect(".pdf")]
+    (Path(slots[0].directory) / "auszug.xml").write_bytes(b"<xml/>")
+    files = collect(slots, timeout=0.2)
+    assert list(files) == [".xml"]
+    assert not watcher.wait_idle(timeout=0.1)
+    release(slots)
+    assert watcher.wait_idle(timeout=0.1)
+
+
+def test_timeout_without_download(tmp_path):
+    slot = DownloadWatcher(str(tmp_path)).expect(".pdf")
+    with pytest.raises(DownloadTimeout):
+        slot.wait(timeout=0.1)
+
+
+def test_watch_wakes_up_on_a_new_file(tmp_path):
+    watcher = watch(str(tmp_path))
+    try:
+        writer = write_later(tmp_path / "neu.xml", delay=0.05)
+        start = time.time()
+        watcher.wait(5)
+        writer.join()
+        # inotify returns with the event, the poller after its interval at the latest
+        assert time.time() - start < 1
+        assert isinstance(watcher, (Inotify, Poller))
+    finally:
+        watcher.close()
@@ -0,0 +1,144 @@
+import pytest
+
+from benchmarks.mockportal import MockPortal, MockProxy, Registry
+from main import open_egress, reconnect
+from src.browserprofile import FONT_PATTERNS, MEMORY_ARGS, PROFILES
+from src.egress import DirectEgress, FritzboxEgress, ProxyEgress, read_proxies
+from src.ratelimit import RateLimiter
+
+
+def test_default_profile_is_a_plain_chrome():
+    default = PROFILES["default"]
+    assert default.chrome_args("https://www.handelsregister.de/rp_web/") == []
+    assert default.prefs() == {}
+    assert default.prefs("/tmp/downloads") == {"download.default_directory": "/tmp/downloads"}
+    assert default.blocked_urls() == []
+    assert default.page_load_strategy == "normal"
+
+
+def test_headless_profile_leaves_out_what_the_crawler_never_looks_at():
+    headless = PROFILES["headless"]
+    args = headless.chrome_args("https://www.handelsregister.de/rp_web/", ["fritz.box", None, "fritz.box"])
+    assert "--headless=new" in args
+    assert "--blink-settings=imagesEnabled=false" in args
+    assert "--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE www.handelsregister.de, EXCLUDE fritz.box" in args
+    assert set(MEMORY_ARGS) <= set(args)
+    prefs = headless.prefs("/tmp/downloads")
+    assert prefs["plugins.always_open_pdf_externally"] is True
+    assert prefs["profile.managed_default_content_settings.images"] == 2
+    assert headless.blocked_urls() == FONT_PATTERNS
+    assert headless.page_load_strategy == "eager"
+
+
+@pytest.fixture
+def portal():
+    portal = MockPortal(("127.0.0.1", 0), Registry([], decoys=0))
+    portal.start()
+    yield portal
+    portal.shutdown()
+    portal.server_close()
+
+
+@pytest.fixture
+def proxies():
+    started = [MockProxy(), MockProxy()]
+    for proxy in started:
+        proxy.start()
+    yield started
+    for proxy in started:
+        proxy.shutdown()
+        proxy.server_close()
+
+
+class Connection:
+    """The parts of MyConnector an egress rotation touches."""
+
+    def __init__(self, egress) -> None:
+        self.egress = egress
+        self.limiter = egress.limiter
+        self.switched = []
+
+    def switch_egress(self, egress):
+        self.switched.append(egress)
+        self.egress = egress
+        self.limiter = egress.limiter
+
+
+def test_proxies_are_handed_out_evenly_and_pass_the_portal_host(portal, proxies):
+    rotation = ProxyEgress([proxy.url for proxy in proxies], portal.link, make_limiter=RateLimiter)
+    first, second = rotation.assign(), rotation.assign()
+    assert {first.proxy, second.proxy} == {proxy.url for proxy in proxies}
+    assert all(proxy.requests == 1 for proxy in proxies)
+    assert first.chrome_args() == [f"--proxy-server={first.proxy}", "--proxy-bypass-list=<-loopback>"]
+    assert first.hosts() == ["127.0.0.1"]
+    assert first.limiter is not second.limiter
+
+
+def test_dead_proxy_cools_down(portal, proxies):
+    proxies[0].down = True
+    rotation = ProxyEgress([proxy.url for proxy in proxies], portal.link, cooldown=60)
+    assert rotation.assign().proxy == proxies[1].url
+    dead = rotation.egresses[0]
+    assert dead.cooling and not dead.healthy
+    # the cooling one is not tried again, the healthy one is shared
+    assert rotation.assign().proxy == proxies[1].url
+    assert "abkühlend, 1x abgekühlt" in rotation.summary()
+
+
+def test_used_up_proxy_moves_the_connection_and_charges_the_new_budget(portal, proxies):
+    rotation = ProxyEgress(
+        [proxy.url for proxy in proxies],
+        portal.link,
+        make_limiter=lambda: RateLimiter(budget=1, period=3600, on_exhausted=lambda c: rotation.rotate(c)),
+    )
+    connection = Connection(rotation.assign())
+    old = connection.egress
+    connection.limiter.acquire("search", connection=connection)
+    connection.limiter.acquire("search", connection=connection)
+    assert connection.switched == [rotation.egresses[1]]
+    assert old.cooling and old.sessions == 0
+    assert old.limiter.counts == {"search": 1}
+    assert connection.limiter.counts == {"search": 1}
+    assert rotation.rotations == 1
+
+
+def test_without_a_free_proxy_the_connection_stays(portal, proxies):
+    rotation = ProxyEgress([proxies[0].url], portal.link)
+    connection = Connection(rotation.assign())
+    assert not rotation.rotate(connection)
+    assert connection.switched == []
+
+
+def test_unknown_proxy_type_and_proxy_file(tmp_path):
+    with pytest.raises(ValueError, match="ftp"):
+        ProxyEgress(["ftp://10.0.0.2:21"], "https://www.handelsregister.de/")
+    with pytest.raises(ValueError):
+        ProxyEgress([], "https://www.handelsregister.de/")
+    path = tmp_path / "proxies.txt"
+    path.write_text("# Rechenzentrum\nhttp://10.0.0.2:3128\n\n socks5://10.0.0.3:1080 \n", encoding="utf-8")
+    assert read_proxies(str(path)) == ["http://10.0.0.2:3128", "socks5://10.0.0.3:1080"]
+
+
+def test_direct_line_has_no_other_way_out():
+    rotation = open_egress("none", "https://www.handelsregister.de/rp_web/", rate_limit=5)
+    assert isinstance(rotation, DirectEgress)
+    egress = rotation.assign()
+    assert egress is rotation.assign()
+    assert egress.chrome_args() == []
+    assert not rotation.rotate(Connection(egress))
+    assert egress.limiter.budget == 5
+
+
+def test_fritzbox_without_upnp_or_password_keeps_the_address(monkeypatch):
+    rotation = FritzboxEgress("https://www.handelsregister.de/", RateLimiter(), password=None)
+
+    def no_upnp(action):
+        raise OSError("keine Verbindung")
+
+    monkeypatch.setattr(rotation, "upnp", no_upnp)
+    connection = Connection(rotation.assign())
+    connection.link = "https://www.handelsregister.de/"
+    assert reconnect(connection) is False
+    assert rotation.rotations == 0
+    # the router web interface is reached by the crawling browser, so it is never blocked
+    assert rotation.egresses[0].hosts() == ["fritz.box"]
@@ -0,0 +1,86 @@
+import csv
+import json
+from benchmarks.samples import xjustiz_document
+from src.extract import extract
+from src.utility import result_filename, split_result_filename
+
+HEADER = "Firma;Bundesland;PLZ;Ort;Straße\n"
+COMPANIES = [
+    "actiwita Vitalstudio;Nordrhein-Westfalen;53340;Meckenheim;Mühlengrabenstraße 27\n",
+    "actiwita Vitalstudio;Nordrhein-Westfalen;52134;Herzogenrath;Roermonderstr. 63\n",
+]
+
+
+def test_result_filename_tells_companies_of_the_same_name_apart():
+    first = {"Firma": "actiwita Vitalstudio", "PLZ": "53340", "Ort": "Meckenheim"}
+    second = {"Firma": "actiwita Vitalstudio", "PLZ": "52134", "Ort": "Herzogenrath"}
+    assert result_filename(first) == "actiwita Vitalstudio_53340_Meckenheim"
+    assert result_filename(first) != result_filename(second)
+    assert result_filename({"Firma": "Muster GmbH", "PLZ": None, "Ort": ""}) == "Muster GmbH"
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file, delimiter=";"))
+
+
+def test_extract_gives_each_file_its_own_company(tmp_path):
+    input_file = tmp_path / "input.csv"
+    input_file.write_text(HEADER + "".join(COMPANIES), encoding="utf-8")
+    xml_dir = tmp_path / "results" / "XML"
+    xml_dir.mkdir(parents=True)
+    document = xjustiz_document("actiwita Vitalstudio GmbH", persons=1)
+    (xml_dir / "actiwita Vitalstudio_53340_Meckenheim.xml").write_text(document, encoding="utf-8")
+    # named by Firma only, like before, it belongs to the first company of that name
+    (xml_dir / "actiwita Vitalstudio.xml").write_text(document, encoding="utf-8")
+    output = tmp_path / "results.csv"
+
+    extract(
+        str(input_file),
+        str(output),
+        str(tmp_path / "results"),
+        str(tmp_path / "storage"),
+        str(tmp_path / "state.json"),
+        processes=1,
+    )
+
+    rows = read_rows(output)
+    assert {row["Ort"] for row in rows if row["Name"]} == {"Meckenheim"}
+    assert [row["Ort"] for row in rows if not row["Name"]] == ["Herzogenrath"]
+
+
+def test_split_result_filename_reverses_result_filename():
+    company = {"Firma": "Studio_1 GmbH", "PLZ": "53340", "Ort": "Meckenheim"}
+    assert split_result_filename(result_filename(company)) == company
+    assert split_result_filename("Muster GmbH_80331") == {"Firma": "Muster GmbH", "PLZ": "80331", "Ort": None}
+    assert split_result_filename("Muster GmbH") == {"Firma": "Muster GmbH", "PLZ": None, "Ort": None}
+
+
+def test_hinweis_follows_the_files_and_unchanged_files_are_not_parsed_again(tmp_path):
+    input_file = tmp_path / "input.csv"
+    input_file.write_text(HEADER + "".join(COMPANIES), encoding="utf-8")
+    results = tmp_path / "results"
+    (results / "XML").mkdir(parents=True)
+    (results / "PDF").mkdir()
+    document = xjustiz_document("actiwita Vitalstudio GmbH", persons=1)
+    (results / "XML" / "actiwita Vitalstudio_53340_Meckenheim.xml").write_text(document, encoding="utf-8")
+    (results / "XML" / "actiwita Vitalstudio_52134_Herzogenrath.xml").write_text(document, encoding="utf-8")
+    (results / "PDF" / "actiwita Vitalstudio_53340_Meckenheim.pdf").write_bytes(b"%PDF")
+    output = tmp_path / "results.csv"
+    state = tmp_path / "state.json"
+    run = lambda: extract(str(input_file), str(output), str(results), str(tmp_path / "storage"), str(state), 1)
+
+    assert run() == (2, 2, 0)
+    hints = {row["Ort"]: row["Hinweis"] for row in read_rows(output)}
+    assert hints["Meckenheim"] == "Success. Dateien unter actiwita Vitalstudio_53340_Meckenheim gespeichert"
+    assert hints["Herzogenrath"] == "Corresponding PDF file not found."
+    # the state only keeps size and mtime, it is not written again when nothing changed
+    assert all(set(entry) == {"size", "mtime"} for entry in json.loads(state.read_text(encoding="utf-8")).values())
+    written = state.stat().st_mtime_ns
+    assert run() == (2, 0, 0)
+    assert state.stat().st_mtime_ns == written
+    assert {row["Ort"]: row["Hinweis"] for row in read_rows(output)} == hints
+
+    changed = xjustiz_document("actiwita Vitalstudio GmbH", persons=2)
+    (results / "XML" / "actiwita Vitalstudio_52134_Herzogenrath.xml").write_text(changed, encoding="utf-8")
+    assert run() == (2, 1, 0)
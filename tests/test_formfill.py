@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from src.formfill import FILL_FORM, SIMILAR_ID, form_values
+from tests.fakedom import call, needs_node, run_node
+
+# the search form as PrimeFaces renders it: a box to click and a hidden input holding the state
+FORM = f"const SIMILAR = {json.dumps(SIMILAR_ID)};\n" + """
+function checkbox(id, checked, withInput) {
+  const input = new Element("input", {id: id + "_input", "aria-checked": checked ? "true" : "false"});
+  const box = new Element("div", {class: "ui-chkbox-box"});
+  box.onclick = () => {
+    input.setAttribute("aria-checked", input.getAttribute("aria-checked") === "true" ? "false" : "true");
+  };
+  return new Element("div", {id: id}, withInput ? [input, box] : [box]);
+}
+function option() {
+  return new Element("div", {class: "ui-g"}, [new Element("div"), new Element("div")]);
+}
+const form = document.body.appendChild(new Element("form", {id: "form"}, [
+  new Element("input", {id: "form:schlagwoerter", value: "alt"}),
+  new Element("input", {id: "form:ort", value: "alt"}),
+  checkbox("form:Bayern", false, true),
+  checkbox("form:Hamburg", true, true),
+  checkbox("form:Berlin", true, true),
+  checkbox(SIMILAR, false, false),
+  new Element("div", {id: "form:schlagwortOptionen"}, [option(), option(), option()]),
+  new Element("button", {id: "form:btnSuche"}),
+]));
+function state() {
+  const byId = (id) => document.getElementById(id);
+  const checked = (id) => byId(id + "_input").getAttribute("aria-checked") === "true";
+  const options = byId("form:schlagwortOptionen").getElementsByClassName("ui-g");
+  return {
+    fields: {keyword: byId("form:schlagwoerter").value, city: byId("form:ort").value},
+    events: byId("form:ort").events,
+    checked: {Bayern: checked("form:Bayern"), Hamburg: checked("form:Hamburg"), Berlin: checked("form:Berlin")},
+    clicks: ["form:Bayern", "form:Hamburg", "form:Berlin", SIMILAR].map(
+      (id) => byId(id).querySelector(".ui-chkbox-box").clicks),
+    mode: [...options].map((element) => element.getElementsByTagName("div")[1].clicks),
+    submitted: byId("form:btnSuche").clicks,
+  };
+}
+"""
+
+
+def fill(values):
+    return run_node(FORM + f"{call(FILL_FORM, json.dumps(values))};\nconsole.log(JSON.stringify(state()));")
+
+
+@needs_node
+def test_fill_form_sets_fields_checkboxes_and_mode_in_one_call():
+    values = form_values(
+        {"form:schlagwoerter": "Vital", "form:ort": None},
+        {"Bayern": True, "Hamburg": False, "Berlin": True},
+        mode="exact",
+        similar=True,
+        submit="form:btnSuche",
+    )
+    page = fill(values)
+    assert page["fields"] == {"keyword": "Vital", "city": ""}
+    assert page["events"] == ["input", "change", "keyup", "blur"]
+    assert page["checked"] == {"Bayern": True, "Hamburg": False, "Berlin": True}
+    # boxes already in the wanted state are left alone, the one without input is clicked when wanted
+    assert page["clicks"] == [1, 1, 0, 1]
+    assert page["mode"] == [0, 0, 1]
+    assert page["submitted"] == 1
+
+
+@needs_node
+def test_fill_form_without_submit_leaves_the_similar_box_unticked():
+    page = fill(form_values({"form:schlagwoerter": "Vital"}, {"Bayern": False}, mode="min"))
+    assert page["clicks"] == [0, 0, 0, 0]
+    assert page["mode"] == [0, 1, 0]
+    assert page["submitted"] == 0
+
+
+@needs_node
+def test_fill_form_reports_missing_elements():
+    with pytest.raises(AssertionError, match="Element fehlt: form:gibtsnicht"):
+        fill(form_values({"form:gibtsnicht": "x"}, {}))
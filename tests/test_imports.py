@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_main_imports_without_selenium():
+    # a fresh interpreter, the other tests may have imported selenium already
+    code = "import sys, main; assert 'selenium' not in sys.modules, sorted(m for m in sys.modules if 'selenium' in m)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
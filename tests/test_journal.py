@@ -0,0 +1,54 @@
+from src.journal import DOWNLOADED, HIT, SEARCHED, WRITTEN, Journal
+
+COMPANY = {"Firma": "Vital GmbH", "PLZ": "80331", "Ort": "München"}
+OTHER = {"Firma": "Vital GmbH", "PLZ": "53340", "Ort": "Meckenheim"}
+
+
+def test_resume_knows_searches_and_finished_companies(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.record(COMPANY, SEARCHED, word="Vital", mode=0)
+    journal.record(COMPANY, HIT, word="Vital", mode=1)
+    journal.record(OTHER, SEARCHED, word="Vital", mode=0)
+    journal.record(OTHER, WRITTEN)
+    journal.close()
+
+    resumed = Journal(path)
+    state = resumed.state(COMPANY)
+    assert state.attempts == {("Vital", 0)}
+    assert state.hit == ("Vital", 1)
+    assert not state.finished
+    assert resumed.state(OTHER).finished
+    assert resumed.summary() == "1 von 2 Firmen im Journal abgeschlossen"
+    resumed.close()
+
+
+def test_search_after_a_hit_drops_the_unsaved_hit(tmp_path):
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    journal.record(COMPANY, HIT, word="Vital", mode=1)
+    journal.record(COMPANY, SEARCHED, word="Vital GmbH", mode=0)
+    assert journal.state(COMPANY).hit is None
+    journal.close()
+
+
+def test_downloaded_needs_the_file(tmp_path):
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    xml = tmp_path / "Vital.xml"
+    journal.record(COMPANY, DOWNLOADED, xml=str(xml), msg="Success")
+    assert not journal.state(COMPANY).downloaded
+    xml.write_text("<xml/>", encoding="utf-8")
+    assert journal.state(COMPANY).downloaded
+    journal.close()
+
+
+def test_line_cut_off_by_a_crash_is_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(str(path))
+    journal.record(COMPANY, SEARCHED, word="Vital", mode=0)
+    journal.close()
+    with open(path, mode="a", encoding="utf-8") as file:
+        file.write('{"key": "Vital GmbH|80331|München", "st')
+    resumed = Journal(str(path))
+    resumed.record(COMPANY, WRITTEN)
+    resumed.close()
+    assert Journal(str(path), read_only=True).state(COMPANY).finished
@@ -0,0 +1,49 @@
+from src.keywords import KeywordEngine, legal_form, normalize, split_name
+
+
+def test_split_name_drops_legal_forms_and_stopwords():
+    assert split_name("Muster GmbH & Co. KG") == ["Muster"]
+    assert split_name("Vital UG (haftungsbeschränkt)") == ["Vital"]
+    assert split_name("Freunde der Turnhalle e. V.") == ["Freunde", "Turnhalle"]
+    assert split_name("Muster GmbH, Berlin") == ["Muster", "Berlin"]
+
+
+def test_split_name_keeps_legal_form_letters_inside_words():
+    assert split_name("Co-Working Space") == ["Co-Working", "Space"]
+    assert split_name("KG-Praxis Müller") == ["KG-Praxis", "Müller"]
+    assert split_name("Praxis für KGG") == ["Praxis", "KGG"]
+
+
+def test_split_name_keeps_lower_case_short_forms():
+    assert split_name("Studio ag Nord") == ["Studio", "ag", "Nord"]
+    assert split_name("co eg ug Werk") == ["co", "eg", "ug", "Werk"]
+    assert split_name("Muster gmbh") == ["Muster"]
+    assert split_name("Muster GBR") == ["Muster"]
+
+
+def test_normalize_ignores_case_and_unicode_spelling():
+    assert normalize("ＦＩＴＮＥＳＳ") == normalize("fitness")
+    assert normalize("„Studio“,") == "studio"
+
+
+def test_legal_form():
+    assert legal_form("Muster gGmbH") == "gGmbH"
+    assert legal_form("Turnverein e.V.") == "e.V."
+    assert legal_form("Praxis Müller") == "sonstige"
+
+
+def test_keywords_rank_rare_words_first():
+    companies = [
+        {"Firma": "Fitness Studio Nord", "Ort": "Kiel"},
+        {"Firma": "Fitness Studio Süd", "Ort": "Ulm"},
+        {"Firma": "Fitness Arena", "Ort": "Köln"},
+    ]
+    engine = KeywordEngine(companies)
+    assert engine.keywords(companies[0]) == ["Fitness Studio Nord", "Nord", "Studio", "Fitness"]
+
+
+def test_keywords_leave_out_the_own_address():
+    engine = KeywordEngine()
+    company = {"Firma": "Fitness Bonn Vital Vital", "Ort": "Bonn", "PLZ": "53111"}
+    engine.add(company)
+    assert engine.keywords(company) == ["Fitness Bonn Vital Vital", "Fitness", "Vital"]
@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+
+from src.metrics import METRICS, Histogram, Metrics, format_steps, timed
+
+
+def test_histogram_quantiles_are_bucket_bounds():
+    histogram = Histogram()
+    for seconds in (0.03, 0.2, 0.2, 0.7, 400):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 0.25
+    # beyond the last bound the largest observation is all there is
+    assert histogram.quantile(1) == 400
+    assert histogram.as_dict()["buckets"]["+Inf"] == 1
+    assert Histogram().quantile(0.5) is None
+
+
+def test_prometheus_text_has_cumulative_buckets_counters_and_errors():
+    metrics = Metrics()
+    metrics.observe("search", 0.07)
+    metrics.observe("search", 3)
+    metrics.count("rate_limit_wait", 2)
+    with pytest.raises(TimeoutError):
+        with metrics.time("download"):
+            raise TimeoutError()
+    lines = metrics.prometheus().splitlines()
+    assert 'crawler_step_seconds_bucket{step="search",le="0.05"} 0' in lines
+    assert 'crawler_step_seconds_bucket{step="search",le="0.1"} 1' in lines
+    assert 'crawler_step_seconds_bucket{step="search",le="5"} 2' in lines
+    assert 'crawler_step_seconds_bucket{step="search",le="+Inf"} 2' in lines
+    assert 'crawler_step_seconds_sum{step="search"} 3.070000' in lines
+    assert 'crawler_step_seconds_count{step="search"} 2' in lines
+    assert 'crawler_step_seconds_count{step="download"} 1' in lines
+    assert 'crawler_events_total{event="rate_limit_wait"} 2' in lines
+    assert 'crawler_errors_total{step="download",type="TimeoutError"} 1' in lines
+    declared = {line.split()[2]: line.split()[3] for line in lines if line.startswith("# TYPE")}
+    assert declared == {
+        "crawler_step_seconds": "histogram",
+        "crawler_events_total": "counter",
+        "crawler_errors_total": "counter",
+    }
+
+
+def test_json_export_and_step_table(tmp_path):
+    metrics = Metrics()
+    metrics.observe("search", 0.4)
+    metrics.observe("open_result", 1.5)
+    path = tmp_path / "metrics.json"
+    metrics.write_json(str(path))
+    written = json.loads(path.read_text(encoding="utf-8"))
+    assert written["steps"]["search"]["count"] == 1
+    lines = format_steps(written, order=["search"])
+    assert [line.split()[0] for line in lines[1:]] == ["search", "open_result"]
+
+
+def test_periodic_export_rewrites_the_file(tmp_path):
+    metrics = Metrics()
+    path = tmp_path / "metrics.prom"
+    metrics.export_periodically(str(path), interval=0.02)
+    metrics.count("search")
+    deadline = time.time() + 2
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    metrics.close()
+    assert 'crawler_events_total{event="search"} 1' in path.read_text(encoding="utf-8")
+
+
+def test_timed_records_calls():
+    @timed("test_timed_step")
+    def step():
+        return 42
+
+    assert step() == 42
+    assert METRICS.as_dict()["steps"]["test_timed_step"]["count"] == 1
@@ -0,0 +1,101 @@
+import json
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+import pytest
+
+from benchmarks.mockportal import NO_HITS, MockPortal, MockProxy, Registry
+from src.ratelimit import is_throttled
+from src.reader import StreamingDataXML
+from src.results import best_match, parse_results
+
+COMPANIES = [
+    {"Firma": "Vital Studio GmbH", "Bundesland": "Bayern", "PLZ": "80331", "Ort": "München", "Straße": ""},
+    {"Firma": "Nord Fitness AG", "Bundesland": "Hamburg", "PLZ": "20095", "Ort": "Hamburg", "Straße": ""},
+]
+
+
+@pytest.fixture
+def portal():
+    portal = MockPortal(("127.0.0.1", 0), Registry(COMPANIES, missing=0, decoys=0))
+    portal.start()
+    yield portal
+    portal.shutdown()
+    portal.server_close()
+
+
+# straight to the portal, whatever proxy the environment names
+DIRECT = urllib.request.build_opener(urllib.request.ProxyHandler({})).open
+
+
+def get(portal, page, cookies=None, opener=DIRECT):
+    url = portal.link.rsplit("/", 1)[0] + "/" + page
+    cookie = "; ".join(f"{name}={quote(value)}" for name, value in (cookies or {}).items())
+    request = urllib.request.Request(url, headers={"Cookie": cookie} if cookie else {})
+    with opener(request, timeout=5) as response:
+        return response.status, response.headers, response.read()
+
+
+def search(portal, **query):
+    return get(portal, "ergebnisse.xhtml", {"query": json.dumps(query)})[2].decode("utf-8")
+
+
+def test_search_page_has_the_elements_the_connector_uses(portal):
+    page = get(portal, "erweitertesuche.xhtml")[2].decode("utf-8")
+    for element_id in ("form:schlagwoerter", "form:schlagwortOptionen", "form:Bayern", "form:btnSuche"):
+        assert f'id="{element_id}"' in page
+    assert portal.counts == {"erweitertesuche.xhtml": 1}
+
+
+def test_result_page_reads_like_the_portal(portal):
+    rows = parse_results(search(portal, keyword="Vital Studio", mode="all", states=["Bayern"]))
+    assert [(row.name, row.seat, row.state) for row in rows] == [("Vital Studio GmbH", "München", "Bayern")]
+    assert rows[0].court == "München"
+    assert best_match(rows, COMPANIES[0]) is rows[0]
+    assert NO_HITS in search(portal, keyword="Vital Studio", mode="all", states=["Hamburg"])
+    assert parse_results(search(portal, keyword="Fitness Vital", mode="min"))[1].name == "Nord Fitness AG"
+
+
+def test_documents_download_as_attachments(portal):
+    status, headers, body = get(portal, "download/0/xml")
+    assert status == 200
+    assert headers["Content-Disposition"].startswith("attachment")
+    status, headers, pdf = get(portal, "download/0/pdf")
+    assert pdf.startswith(b"%PDF")
+    assert b"Vital Studio GmbH" in get(portal, "chargeinfo.xhtml", {"doc": "0:xml"})[2]
+    assert portal.counts["download"] == 2
+    assert body.decode("utf-8").count("<tns:beteiligung>") == portal.registry.entries[0]["persons"] + 1
+
+
+def test_downloaded_xml_is_readable(portal, tmp_path):
+    path = tmp_path / "auszug.xml"
+    path.write_bytes(get(portal, "download/1/xml")[2])
+    persons, organizations, vertretung = StreamingDataXML(str(path)).extract_all()
+    assert organizations[0]["Bezeichnung"] == "Nord Fitness AG"
+    assert len(persons) == portal.registry.entries[1]["persons"]
+    assert vertretung["codes"] == "EV"
+
+
+def test_throttling_and_errors(portal):
+    portal.throttle_rate = 1
+    assert is_throttled(search(portal, keyword="Vital"))
+    portal.throttle_rate, portal.error_rate = 0, 1
+    with pytest.raises(urllib.error.HTTPError) as error:
+        search(portal, keyword="Vital")
+    assert error.value.code == 500
+
+
+def test_proxy_forwards_until_it_goes_down(portal):
+    proxy = MockProxy()
+    proxy.start()
+    try:
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({"http": proxy.url})).open
+        assert get(portal, "erweitertesuche.xhtml", opener=opener)[0] == 200
+        assert proxy.requests == 1
+        proxy.down = True
+        with pytest.raises(OSError):
+            get(portal, "erweitertesuche.xhtml", opener=opener)
+    finally:
+        proxy.shutdown()
+        proxy.server_close()
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from src.pipeline import Pipeline, Stage
+
+
+def test_items_pass_every_stage_in_order():
+    done = []
+    pipeline = Pipeline(
+        [
+            Stage("double", lambda item: item * 2),
+            Stage("add", lambda item: item + 1),
+            Stage("collect", lambda item: done.append(item)),
+        ]
+    ).start()
+    for item in range(5):
+        pipeline.put(item)
+    pipeline.close()
+    assert done == [1, 3, 5, 7, 9]
+    assert pipeline.summary() == "double: 5 (0 Fehler), add: 5 (0 Fehler), collect: 5 (0 Fehler)"
+
+
+def test_full_stage_blocks_the_producer():
+    release = threading.Event()
+    pipeline = Pipeline([Stage("slow", lambda item: release.wait(5) and None, maxsize=1)]).start()
+    pipeline.put(1)
+    # one item in the handler, one waiting in the queue, the third one has to wait
+    time.sleep(0.05)
+    pipeline.put(2)
+    producer = threading.Thread(target=pipeline.put, args=(3,))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    release.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    pipeline.close()
+    assert pipeline.stages[0].done == 3
+
+
+def test_failing_item_is_reported_and_dropped():
+    errors = []
+    done = []
+
+    def check(item):
+        if item == 2:
+            raise ValueError("kaputt")
+        return item
+
+    pipeline = Pipeline(
+        [Stage("check", check), Stage("collect", done.append)],
+        on_error=lambda stage, item, e: errors.append((stage, item, str(e))),
+    ).start()
+    for item in (1, 2, 3):
+        pipeline.put(item)
+    pipeline.close()
+    assert done == [1, 3]
+    assert errors == [("check", 2, "kaputt")]
+    assert pipeline.stages[0].failed == 1
@@ -0,0 +1,53 @@
+from src.pool import MAX_REQUEUE, WorkerPool
+from src.supervisor import BrowserDied
+
+
+class Connection:
+    def close_connection(self):
+        pass
+
+
+def test_companies_left_for_retry_are_given_up_when_the_last_worker_stops():
+    given_up = []
+
+    def crawl(connection, company, log):
+        raise BrowserDied("tab crashed")
+
+    def recover(connection):
+        raise RuntimeError("no chrome")
+
+    pool = WorkerPool(
+        lambda number: Connection(),
+        crawl,
+        workers=1,
+        recover=recover,
+        give_up=lambda company, msg: given_up.append((company["Firma"], msg)),
+    )
+    errors = pool.run([{"Firma": "Vital GmbH"}, {"Firma": "Nord AG"}])
+    assert [firma for firma, _ in given_up] == ["Vital GmbH"]
+    assert errors == 1
+    assert pool.stats[0].failed
+
+
+def test_company_crashing_every_browser_is_given_up():
+    given_up = []
+    crawled = []
+
+    def crawl(connection, company, log):
+        crawled.append(company["Firma"])
+        if company["Firma"] == "Vital GmbH":
+            raise BrowserDied("tab crashed")
+        return 0
+
+    pool = WorkerPool(
+        lambda number: Connection(),
+        crawl,
+        workers=1,
+        recover=lambda connection: None,
+        give_up=lambda company, msg: given_up.append(company["Firma"]),
+    )
+    errors = pool.run([{"Firma": "Vital GmbH"}, {"Firma": "Nord AG"}])
+    assert crawled.count("Vital GmbH") == MAX_REQUEUE + 1
+    assert "Nord AG" in crawled
+    assert given_up == ["Vital GmbH"]
+    assert errors == 1
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from src.ratelimit import RateLimiter
+
+
+class Connection:
+    def __init__(self, limiter=None) -> None:
+        self.limiter = limiter
+
+
+def test_acquire_takes_tokens_without_waiting():
+    limiter = RateLimiter(budget=3, period=3600)
+    for _ in range(3):
+        limiter.acquire("page")
+    assert limiter.tokens < 1
+    assert limiter.counts == {"page": 3}
+    assert limiter.waited == 0
+
+
+def test_exhausted_budget_refills_in_place_for_the_same_egress():
+    reconnects = []
+    limiter = RateLimiter(budget=2, period=3600, on_exhausted=lambda connection: reconnects.append(1) or True)
+    connection = Connection(limiter)
+    for _ in range(3):
+        limiter.acquire("page", connection=connection)
+    assert len(reconnects) == 1
+    assert limiter.refills == 1
+    assert limiter.counts == {"page": 3}
+    assert 0.9 < limiter.tokens < 1.1
+
+
+def test_exhausted_budget_charges_the_egress_moved_to():
+    fresh = RateLimiter(budget=5, period=3600)
+
+    def move(connection):
+        connection.limiter = fresh
+        return True
+
+    used = RateLimiter(budget=1, period=3600, on_exhausted=move)
+    connection = Connection(used)
+    used.acquire("search", connection=connection)
+    used.acquire("search", connection=connection)
+    # the proxy moved away from keeps its empty budget and never sees the second request
+    assert used.counts == {"search": 1}
+    assert used.tokens < 0.1
+    assert used.refills == 1
+    assert fresh.counts == {"search": 1}
+    assert 3.9 < fresh.tokens < 4.1
+
+
+def test_no_rotation_without_connection():
+    calls = []
+    limiter = RateLimiter(budget=1, period=0.01, on_exhausted=lambda connection: calls.append(1) or True)
+    limiter.acquire("page")
+    limiter.acquire("page")
+    assert calls == []
+    assert limiter.counts == {"page": 2}
+
+
+def test_failed_rotation_waits_for_the_budget():
+    calls = []
+    limiter = RateLimiter(budget=1, period=0.05, on_exhausted=lambda connection: calls.append(1) or False)
+    connection = Connection(limiter)
+    limiter.acquire("page", connection=connection)
+    limiter.acquire("page", connection=connection)
+    assert calls == [1]
+    assert limiter.refills == 0
+    assert limiter.counts == {"page": 2}
+    assert limiter.waited > 0
+    assert not limiter.exhausting
+
+
+def test_waiting_worker_does_not_block_the_others():
+    limiter = RateLimiter(budget=1, period=0.2)
+    limiter.acquire("page")
+    waiter = threading.Thread(target=limiter.acquire, args=("page",))
+    waiter.start()
+    time.sleep(0.02)
+    # the waiter sleeps without the lock, so it can be taken meanwhile
+    assert limiter.lock.acquire(timeout=0.05)
+    limiter.lock.release()
+    waiter.join()
+    assert limiter.counts == {"page": 2}
+
+
+def test_reconnect_runs_without_the_lock_and_wakes_the_waiters():
+    reconnecting = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def reconnect(connection):
+        calls.append(1)
+        reconnecting.set()
+        done.wait(1)
+        return True
+
+    limiter = RateLimiter(budget=2, period=3600, on_exhausted=reconnect)
+    connection = Connection(limiter)
+    limiter.acquire("page", amount=2, connection=connection)
+    threads = [threading.Thread(target=limiter.acquire, args=("page",), kwargs={"connection": Connection(limiter)})]
+    threads.append(threading.Thread(target=limiter.acquire, args=("page",), kwargs={"connection": connection}))
+    threads[0].start()
+    assert reconnecting.wait(1)
+    threads[1].start()
+    time.sleep(0.02)
+    # the second worker waits for the reconnect instead of starting another one
+    assert limiter.lock.acquire(timeout=0.05)
+    limiter.lock.release()
+    done.set()
+    for thread in threads:
+        thread.join(1)
+        assert not thread.is_alive()
+    assert calls == [1]
+    assert limiter.refills == 1
+    assert limiter.counts == {"page": 4}
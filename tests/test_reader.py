@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks.samples import xjustiz_document
+from src.reader import DataXML, StreamingDataXML
+
+FREITEXT = (
+    "<tns:vertretungsbefugnisFreitext>Jeder Geschäftsführer vertritt einzeln.</tns:vertretungsbefugnisFreitext>"
+)
+
+
+def three_passes(path):
+    data = DataXML(path)
+    return data.extract_person_info(), data.extract_organization_info(), data.extract_vertretung()
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        xjustiz_document(),
+        xjustiz_document("Müller + Söhne GmbH", register="HRA 987", city="München", persons=0),
+        xjustiz_document(persons=40, seed=7),
+        # without the Freitext the texts of the Vertretung are read instead
+        xjustiz_document(persons=3, seed=1).replace(FREITEXT, ""),
+    ],
+    ids=["default", "organization only", "many persons", "without freitext"],
+)
+def test_streaming_reader_matches_the_three_pass_reader(tmp_path, document):
+    path = tmp_path / "document.xml"
+    path.write_text(document, encoding="utf-8")
+    assert StreamingDataXML(str(path)).extract_all() == three_passes(str(path))
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from src.metrics import METRICS
+from src.ratelimit import PortalError, Throttled
+from src.readiness import ERROR, NO_HITS, POLL_CHECK, READY, THROTTLED, WAIT_FOR, Readiness
+from tests.fakedom import call, needs_node, run_node
+
+RESULTS = "http://portal.test/rp_web/ergebnisse.xhtml"
+
+
+def wait_for(spec, setup="", change=""):
+    """Runs WAIT_FOR like execute_async_script, change runs while the script waits."""
+    script = setup + f"\nconst spec = {json.dumps(spec)};\nconst started = Date.now();\n"
+    # the slice timer would keep node running after the answer
+    done = "(state) => { console.log(JSON.stringify({state, ms: Date.now() - started})); process.exit(0); }"
+    script += call(WAIT_FOR, "spec", done)
+    script += f";\nsetTimeout(() => {{ {change} }}, 50);\n"
+    return run_node(script)
+
+
+def spec(outcomes=(), selector=None, url=None, slice_ms=2000):
+    return Readiness(None).spec(url, selector, outcomes, slice_ms / 1000)
+
+
+@needs_node
+def test_ready_page_resolves_right_away():
+    setup = 'window.location.href = "%s"; document.body.appendChild(new Element("table"));' % RESULTS
+    result = wait_for(spec(selector="table", url=RESULTS), setup)
+    assert result["state"] == READY
+    assert result["ms"] < 50
+
+
+@needs_node
+def test_mutation_ends_the_wait_without_polling():
+    change = 'window.location.href = "%s"; document.body.appendChild(new Element("table"));' % RESULTS
+    result = wait_for(spec(selector="table", url=RESULTS), change=change)
+    assert result["state"] == READY
+    # woken by the observer, long before the slice is over
+    assert 50 <= result["ms"] < 1000
+
+
+@needs_node
+@pytest.mark.parametrize(
+    "text, state",
+    [
+        ("Keine Daten gefunden.", NO_HITS),
+        ("Sie haben die maximal zulässige Anzahl an Abrufen überschritten.", THROTTLED),
+        ("Interner Fehler", ERROR),
+    ],
+)
+def test_outcome_markers_are_told_apart(text, state):
+    change = f"setText(document.body, {json.dumps(text)});"
+    result = wait_for(spec(outcomes=(NO_HITS, THROTTLED, ERROR), selector="table", url=RESULTS), change=change)
+    assert result["state"] == state
+
+
+@needs_node
+def test_error_status_and_busy_ajax():
+    setup = "window.navigationEntries = [{responseStatus: 500}];"
+    assert wait_for(spec(outcomes=(ERROR,)), setup)["state"] == ERROR
+    # PrimeFaces still has requests queued, the page is not ready until the slice ends
+    setup = "window.PrimeFaces = {ajax: {Queue: {isEmpty: () => false}}};"
+    result = wait_for(spec(slice_ms=200), setup)
+    assert result["state"] is None
+    assert result["ms"] >= 200
+
+
+@needs_node
+def test_poll_check_returns_the_state_once():
+    script = 'document.body.appendChild(new Element("table"));\n'
+    script += f"console.log(JSON.stringify({call(POLL_CHECK, json.dumps(spec(selector='table')))}));"
+    assert run_node(script) == READY
+
+
+class Driver:
+    def __init__(self, *answers) -> None:
+        self.answers = list(answers)
+        self.calls = 0
+
+    def execute_async_script(self, script, spec):
+        self.calls += 1
+        answer = self.answers.pop(0) if self.answers else None
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_until_raises_for_throttling_and_errors():
+    assert Readiness(Driver(NO_HITS)).until("results", outcomes=(NO_HITS,)) == NO_HITS
+    with pytest.raises(Throttled):
+        Readiness(Driver(THROTTLED)).until("results", outcomes=(THROTTLED,))
+    with pytest.raises(PortalError):
+        Readiness(Driver(ERROR)).until("results", outcomes=(ERROR,))
+    assert METRICS.counters["page_throttled"] >= 1
+
+
+def test_until_waits_again_after_a_navigation():
+    driver = Driver(JavascriptException("javascript error: document unloaded while waiting for result"), None, READY)
+    assert Readiness(driver).until("search_page") == READY
+    assert driver.calls == 3
+    with pytest.raises(JavascriptException):
+        Readiness(Driver(JavascriptException("TypeError: x is undefined"))).until("search_page")
+
+
+def test_until_times_out():
+    with pytest.raises(TimeoutException, match="search_page"):
+        Readiness(Driver(), timeout=0.05).until("search_page")
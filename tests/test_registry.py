@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from src.registry import RegisterIndex, name_key
+
+
+def document(tmp_path, name):
+    path = tmp_path / f"{name}.xml"
+    path.write_text("<xml/>", encoding="utf-8")
+    return str(path)
+
+
+def test_name_key_keeps_legal_form():
+    assert name_key("Muster e.V.") != name_key("Muster GmbH")
+    assert name_key("Muster  GmbH") == name_key("muster gmbh")
+
+
+def test_lookup_by_name_needs_same_place(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"))
+    index.add("actiwita Vitalstudio", None, document(tmp_path, "a"), city="Meckenheim", plz="53340")
+    assert index.lookup(name="actiwita Vitalstudio", city="Meckenheim", plz=53340)["city"] == "Meckenheim"
+    assert index.lookup(name="actiwita Vitalstudio", city="Herzogenrath", plz="52134") is None
+    assert index.lookup(name="actiwita Vitalstudio", city="Meckenheim") is not None
+    assert index.lookup(name="actiwita Vitalstudio") is None
+
+
+def test_lookup_by_name_keeps_legal_forms_apart(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"))
+    index.add("Muster e.V.", None, document(tmp_path, "ev"), city="Bonn")
+    assert index.lookup(name="Muster GmbH", city="Bonn") is None
+    assert index.lookup(name="Muster e. V.", city="Bonn") is not None
+
+
+def test_lookup_never_serves_entry_without_place_by_name(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"))
+    index.add("Muster GmbH", "HRB 123", document(tmp_path, "m"), court="Bonn")
+    assert index.lookup(name="Muster GmbH", city="Bonn", plz="53111") is None
+    assert index.lookup(name="Muster GmbH", register="HRB  123", city="Bonn", court="Amtsgericht Bonn") is not None
+
+
+def test_lookup_by_register_needs_the_same_court(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"))
+    index.add("Muster GmbH", "HRB 123", document(tmp_path, "m"), city="Bonn", court="Bonn")
+    assert index.lookup(name="Muster Bau GmbH", register="HRB 123", court="Köln") is None
+    assert index.lookup(name="Muster Bau GmbH", register="HRB 123") is None
+    assert index.lookup(name="Muster Bau GmbH", register="HRB 123", court="bonn") is not None
+
+
+def test_lookup_by_register_needs_shared_word(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"))
+    index.add("Muster GmbH", "HRB 123", document(tmp_path, "m"), city="Bonn", court="Bonn")
+    assert index.lookup(name="Andere GmbH", register="HRB 123", court="Bonn") is None
+    assert index.lookup(name="Muster", register="HRB 123", city="Köln", court="Bonn") is None
+
+
+def test_import_storage_reads_company_from_file_name(tmp_path):
+    from benchmarks.samples import xjustiz_document
+
+    xml_dir = tmp_path / "storage" / "2024-01-01T00:00:00" / "XML"
+    xml_dir.mkdir(parents=True)
+    document = xjustiz_document("Vital Studio GmbH", persons=1)
+    (xml_dir / "Vital Studio GmbH_53340_Meckenheim.xml").write_text(document, encoding="utf-8")
+    (xml_dir / "Alt GmbH.xml").write_text(document, encoding="utf-8")
+    index = RegisterIndex(str(tmp_path / "index.json"), max_age=10**5)
+    assert index.import_storage(str(tmp_path / "storage")) == 2
+    found = index.lookup(name="Vital Studio GmbH", city="Meckenheim", plz="53340")
+    assert found["name"] == "Vital Studio GmbH"
+    assert index.lookup(name="Vital Studio GmbH", city="Herzogenrath", plz="52134") is None
+    # an older file tells no place and no court
+    assert index.lookup(name="Alt GmbH", city="Bonn") is None
+
+
+def test_lookup_skips_old_and_missing_documents(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"), max_age=30)
+    index.add("Alt GmbH", None, document(tmp_path, "alt"), fetched=datetime.now() - timedelta(days=31), city="Bonn")
+    index.add("Weg GmbH", None, str(tmp_path / "weg.xml"), city="Bonn")
+    assert index.lookup(name="Alt GmbH", city="Bonn") is None
+    assert index.lookup(name="Weg GmbH", city="Bonn") is None
+
+
+def test_old_index_keys_are_rebuilt(tmp_path):
+    index = RegisterIndex(str(tmp_path / "index.json"))
+    index.add("Muster e.V.", None, document(tmp_path, "ev"), city="Bonn")
+    index.entries[0]["key"] = "muster"
+    index.save()
+    assert RegisterIndex(index.path).lookup(name="Muster GmbH", city="Bonn") is None
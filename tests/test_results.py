@@ -0,0 +1,48 @@
+from src.results import ResultRow, best_match, name_tokens, parse_results, score
+
+PAGE = """
+<table><tr><td>
+<table><tr><td>Bayern</td><td>Amtsgericht München HRB 12345</td></tr>
+<tr><td>Vital GmbH</td><td>München</td><td>aktuell</td><td><a>AD</a><a>SI</a></td></tr></table>
+<table><tr><td>Bayern</td><td>Amtsgericht Augsburg HRB 999</td></tr>
+<tr><td>Vital Sport GmbH</td><td>Augsburg</td></tr></table>
+</td></tr></table>
+"""
+
+
+def row(table, name, seat):
+    return ResultRow(table, name, None, None, seat, None)
+
+
+def test_parse_results_numbers_tables_like_the_driver():
+    rows = parse_results(PAGE)
+    assert [(r.table, r.name, r.register, r.court, r.seat) for r in rows] == [
+        (1, "Vital GmbH", "HRB 12345", "München", "München"),
+        (2, "Vital Sport GmbH", "HRB 999", "Augsburg", "Augsburg"),
+    ]
+
+
+def test_name_tokens_drop_legal_forms():
+    assert name_tokens("Vital GmbH & Co. KG") == ["vital"]
+
+
+def test_score_weighs_name_and_seat():
+    company = {"Firma": "Vital GmbH", "Ort": "München", "PLZ": "80331"}
+    assert score(row(1, "Vital GmbH", "München"), company) == 1.0
+    assert score(row(1, "Vital GmbH", "Augsburg"), company) == 0.75
+    assert score(row(1, "Vital GmbH", None), company) == 0.875
+    assert score(row(1, "GmbH", "München"), company) == 0.0
+
+
+def test_best_match_picks_the_company_from_a_multi_hit_page():
+    company = {"Firma": "Vital GmbH", "Ort": "München"}
+    rows = parse_results(PAGE)
+    assert best_match(rows, company).table == 1
+    assert best_match(rows, {"Firma": "Vital Sport", "Ort": "Augsburg"}).table == 2
+
+
+def test_best_match_refuses_ties_and_weak_rows():
+    company = {"Firma": "Vital GmbH", "Ort": "München"}
+    assert best_match([row(1, "Vital GmbH", "München"), row(2, "Vital GmbH", "München")], company) is None
+    assert best_match([row(1, "Fitness Nord", "Kiel")], company) is None
+    assert best_match([], company) is None
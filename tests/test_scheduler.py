@@ -0,0 +1,47 @@
+from src.scheduler import SearchScheduler
+
+COMPANY = {"Firma": "Vital GmbH", "Bundesland": "Bayern"}
+ATTEMPTS = [(0, "Vital GmbH", 0), (0, "Vital GmbH", 1), (1, "Vital", 0), (1, "Vital", 1)]
+
+
+def test_untried_attempts_keep_the_default_order(tmp_path):
+    scheduler = SearchScheduler(str(tmp_path / "stats.json"))
+    assert scheduler.order(COMPANY, ATTEMPTS) == ATTEMPTS
+
+
+def test_attempts_that_hit_move_up(tmp_path):
+    scheduler = SearchScheduler(str(tmp_path / "stats.json"))
+    for _ in range(5):
+        scheduler.record(COMPANY, 1, 1, True)
+        scheduler.record(COMPANY, 0, 0, False)
+    assert scheduler.order(COMPANY, ATTEMPTS)[0] == (1, "Vital", 1)
+    assert scheduler.order(COMPANY, ATTEMPTS)[-1] == (0, "Vital GmbH", 0)
+    assert scheduler.summary() == "Suchplanung: 10 Suchen, 2.0 pro gefundener Firma"
+
+
+def test_attempts_that_never_hit_are_pruned(tmp_path):
+    scheduler = SearchScheduler(str(tmp_path / "stats.json"), prune_after=3)
+    for _ in range(3):
+        scheduler.record(COMPANY, 0, 0, False)
+    assert (0, "Vital GmbH", 0) not in scheduler.order(COMPANY, ATTEMPTS)
+    # one hit is enough to keep an attempt
+    scheduler.record(COMPANY, 0, 0, True)
+    assert (0, "Vital GmbH", 0) in scheduler.order(COMPANY, ATTEMPTS)
+
+
+def test_pruning_never_leaves_nothing_to_search(tmp_path):
+    scheduler = SearchScheduler(str(tmp_path / "stats.json"), prune_after=1)
+    for position, _, mode in ATTEMPTS:
+        scheduler.record(COMPANY, position, mode, False)
+    assert sorted(scheduler.order(COMPANY, ATTEMPTS)) == sorted(ATTEMPTS)
+
+
+def test_later_keyword_positions_share_a_statistic(tmp_path):
+    path = str(tmp_path / "stats.json")
+    scheduler = SearchScheduler(path, prune_after=2)
+    scheduler.record(COMPANY, 3, 0, False)
+    scheduler.record(COMPANY, 7, 0, False)
+    scheduler.save()
+    reloaded = SearchScheduler(path, prune_after=2)
+    assert reloaded.pruned(5, 0)
+    assert not reloaded.pruned(2, 0)
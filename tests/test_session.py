@@ -0,0 +1,52 @@
+import os
+from src.session import RecordedOrder, SessionArchive, SessionRecorder, journal_path, step_key
+
+COMPANY = {"Firma": "Vital GmbH", "PLZ": "80331", "Ort": "München"}
+
+
+def record(path, input_file=None):
+    recorder = SessionRecorder(str(path), input_file)
+    recorder.record(step_key(COMPANY, "Vital", 2), "results", page="<html>leer</html>", outcome="no_hits", count=0)
+    recorder.record(step_key(COMPANY, "Vital GmbH", 0), "results", page="<html>eins</html>", outcome="ready", count=1)
+    recorder.record(step_key(COMPANY, "Vital", 2), "results", page="<html>leer</html>", outcome="no_hits", count=0)
+    return recorder
+
+
+def test_closed_session_is_replayed(tmp_path):
+    input_file = tmp_path / "input.csv"
+    input_file.write_text("Firma;PLZ;Ort\n", encoding="utf-8")
+    recorder = record(tmp_path / "session.zip", str(input_file))
+    recorder.close()
+    assert recorder.summary().startswith("Sitzung: 3 Aufzeichnungen, 2 Seiten")
+    assert not os.path.exists(journal_path(str(tmp_path / "session.zip")))
+
+    archive = SessionArchive(str(tmp_path / "session.zip"))
+    events = archive.events(step_key(COMPANY, "Vital GmbH", 0), "results")
+    assert archive.read(events[0]["member"]) == b"<html>eins</html>"
+    assert len(archive.events(step_key(COMPANY, "Vital", 2), "results")) == 2
+    assert archive.extract_input(str(tmp_path / "copy.csv"))
+    archive.close()
+
+
+def test_session_of_a_killed_crawl_can_be_opened(tmp_path):
+    path = tmp_path / "session.zip"
+    recorder = record(path)
+    # killed: neither the central directory nor the index were written
+    with open(journal_path(str(path)), mode="a", encoding="utf-8") as file:
+        file.write('{"company": "cut off')
+
+    archive = SessionArchive(str(path))
+    events = archive.events(step_key(COMPANY, "Vital GmbH", 0), "results")
+    assert archive.read(events[0]["member"]) == b"<html>eins</html>"
+    assert len(archive.steps) == 2
+    assert "abgebrochener" in archive.summary()
+    archive.close()
+    recorder.close()
+
+
+def test_replay_searches_in_the_recorded_order(tmp_path):
+    recorder = record(tmp_path / "session.zip")
+    recorder.close()
+    order = RecordedOrder(SessionArchive(str(tmp_path / "session.zip")))
+    attempts = [(0, "Vital GmbH", 0), (1, "Vital", 0), (1, "Vital", 2)]
+    assert order.order(COMPANY, attempts) == [(1, "Vital", 2), (0, "Vital GmbH", 0), (1, "Vital", 0)]
@@ -0,0 +1,59 @@
+import csv
+import json
+import sqlite3
+import pytest
+from src.sink import open_sink
+
+HEADERS = ["Firma", "Ort", "Hinweis"]
+ROWS = [{"Firma": "Vital GmbH", "Ort": "München", "Hinweis": None}, {"Firma": "Nord eV", "Ort": "Kiel"}]
+
+
+def read(output, tmp_path):
+    if output == "csv":
+        with open(tmp_path / "results.csv", newline="", encoding="utf-8") as file:
+            return [row["Firma"] for row in csv.DictReader(file, delimiter=";")]
+    if output == "jsonl":
+        with open(tmp_path / "results.jsonl", encoding="utf-8") as file:
+            return [json.loads(line)["Firma"] for line in file]
+    connection = sqlite3.connect(tmp_path / "results.sqlite")
+    try:
+        return [row[0] for row in connection.execute('SELECT "Firma" FROM results')]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("output", ["csv", "jsonl", "sqlite"])
+def test_rows_reach_every_backend_on_close(tmp_path, output):
+    sink = open_sink(str(tmp_path), HEADERS, output, flush_seconds=60)
+    sink.write(ROWS)
+    sink.close()
+    assert read(output, tmp_path) == ["Vital GmbH", "Nord eV"]
+
+
+@pytest.mark.parametrize("output", ["csv", "jsonl", "sqlite"])
+def test_reopened_sink_appends(tmp_path, output):
+    for row in ROWS:
+        sink = open_sink(str(tmp_path), HEADERS, output, flush_seconds=60)
+        sink.write([row])
+        sink.close()
+    assert read(output, tmp_path) == ["Vital GmbH", "Nord eV"]
+
+
+def test_flush_after_enough_rows_calls_back(tmp_path):
+    flushed = []
+    sink = open_sink(str(tmp_path), HEADERS, flush_rows=2, flush_seconds=60)
+    sink.write(ROWS[:1], on_flushed=lambda: flushed.append(1))
+    assert flushed == []
+    sink.write(ROWS[1:])
+    assert flushed == [1]
+    assert read("csv", tmp_path) == ["Vital GmbH", "Nord eV"]
+    sink.close()
+
+
+def test_unknown_columns_and_closed_sink_are_errors(tmp_path):
+    sink = open_sink(str(tmp_path), HEADERS, flush_seconds=60)
+    with pytest.raises(ValueError):
+        sink.write([{"Firma": "Vital GmbH", "Telefon": "089"}])
+    sink.close()
+    with pytest.raises(ValueError):
+        sink.write(ROWS)
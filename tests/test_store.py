@@ -0,0 +1,56 @@
+import csv
+from src.extract import RESULT_HEADERS, error_line, result_lines
+from src.store import RegisterStore
+
+FIRST = {"Firma": "Vital GmbH", "Bundesland": "Bayern", "Ort": "München", "PLZ": "80331", "Straße": "Weg 1"}
+SECOND = {"Firma": "Nord AG", "Bundesland": "Hamburg", "Ort": "Hamburg", "PLZ": "20095", "Straße": "Kai 2"}
+PERSONS = [{"Nachname": "Muster", "Vorname": "Max", "Code": "GF"}, {"Nachname": "Doe", "Vorname": "Jane", "Code": "P"}]
+ORGANIZATIONS = [{"Bezeichnung": "Vital GmbH", "Rechtsform": "GmbH", "Registernummer": "HRB 1"}]
+VERTRETUNG = {"codes": "A", "texts": "einzeln"}
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file, delimiter=";"))
+
+
+def as_csv(lines):
+    return [{key: "" if line[key] is None else str(line[key]) for key in RESULT_HEADERS} for line in lines]
+
+
+def test_export_writes_the_rows_of_the_crawl(tmp_path):
+    store = RegisterStore(str(tmp_path / "register.sqlite"))
+    store.put(FIRST, PERSONS, ORGANIZATIONS, VERTRETUNG, "Success", "XML/Vital.xml")
+    store.put_error(SECOND, "Kein Eintrag gefunden")
+    assert store.export(str(tmp_path / "out" / "export.csv")) == 3
+    expected = result_lines(FIRST, PERSONS, ORGANIZATIONS, VERTRETUNG, "Success")
+    expected += [error_line(SECOND, "Kein Eintrag gefunden")]
+    assert read_rows(tmp_path / "out" / "export.csv") == as_csv(expected)
+    store.close()
+
+
+def test_rows_are_kept_across_runs(tmp_path):
+    path = str(tmp_path / "register.sqlite")
+    store = RegisterStore(path)
+    store.put(FIRST, PERSONS, ORGANIZATIONS, VERTRETUNG, "Success", "XML/Vital.xml")
+    store.close()
+    store = RegisterStore(path)
+    # a later error keeps what was found, a new XML file replaces the persons
+    store.put_error(FIRST, "Fehler: Selenium Treiber bricht ab bei Suche.")
+    assert [row["Hinweis"] for row in store.result_rows(1)] == ["Success", "Success"]
+    store.put(FIRST, PERSONS[:1], ORGANIZATIONS, VERTRETUNG, "Success neu", "XML/Vital.xml")
+    assert [(row["Name"], row["Hinweis"]) for row in store.result_rows(1)] == [("Muster", "Success neu")]
+    store.close()
+    assert "1 Firmen, 1 Organisationen, 2 Personen" in store.summary()
+
+
+def test_export_of_one_person(tmp_path):
+    store = RegisterStore(str(tmp_path / "register.sqlite"))
+    store.put(FIRST, PERSONS, ORGANIZATIONS, VERTRETUNG, "Success", "a.xml")
+    store.put(SECOND, PERSONS[1:], [], VERTRETUNG, "Success", "b.xml")
+    assert store.company_ids("doe") == [1, 2]
+    assert store.company_ids("Muster, Max") == [1]
+    assert store.company_ids("Muster, Erika") == []
+    store.export(str(tmp_path / "max.csv"), "MUSTER")
+    assert {row["Ort"] for row in read_rows(tmp_path / "max.csv")} == {"München"}
+    store.close()
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from src.supervisor import BrowserDied, Supervisor, check_alive, is_alive
+
+
+class Driver:
+    def __init__(self, args=(), alive=True) -> None:
+        self.args = list(args)
+        self.alive = alive
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise ConnectionRefusedError("chromedriver gone")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class Connection:
+    def __init__(self, driver, args=("--headless",)) -> None:
+        self.driver = driver
+        self.args = args
+
+    def browser_args(self):
+        return list(self.args)
+
+    def adopt(self, driver):
+        self.driver = driver
+
+
+class Launcher:
+    def __init__(self) -> None:
+        self.launched = []
+
+    def __call__(self, args):
+        driver = Driver(args)
+        self.launched.append(driver)
+        return driver
+
+
+def test_liveness():
+    assert is_alive(Driver())
+    assert not is_alive(Driver(alive=False))
+    hanging = Driver()
+    block = threading.Event()
+    hanging.execute_script = lambda script: block.wait(5)
+    assert not is_alive(hanging, timeout=0.05)
+    block.set()
+    with pytest.raises(BrowserDied):
+        check_alive(Connection(Driver(alive=False)), RuntimeError("tab crashed"))
+    check_alive(Connection(Driver()), RuntimeError("slow page"))
+
+
+def test_recover_takes_the_standby_browser_and_starts_the_next():
+    launch = Launcher()
+    supervisor = Supervisor(launch)
+    supervisor.prepare(["--headless"])
+    dead = Driver(alive=False)
+    connection = Connection(dead)
+    assert supervisor.recover(connection) is True
+    assert dead.quit_called
+    assert connection.driver is launch.launched[0]
+    # the next reserve is started right away
+    assert supervisor.reserve_ready.wait(5)
+    assert supervisor.reserve is launch.launched[1]
+    supervisor.close()
+    assert launch.launched[1].quit_called
+    assert supervisor.summary() == "Browser-Neustarts: 1 (1 aus Reserve, 0 kalt)"
+
+
+def test_recover_starts_cold_for_other_arguments_or_a_dead_reserve():
+    launch = Launcher()
+    supervisor = Supervisor(launch)
+    supervisor.prepare(["--proxy-server=a"])
+    assert supervisor.reserve_ready.wait(5)
+    assert supervisor.recover(Connection(Driver(), args=("--proxy-server=b",))) is False
+    supervisor.reserve_ready.wait(5)
+    supervisor.reserve.alive = False
+    connection = Connection(Driver(), args=("--proxy-server=b",))
+    assert supervisor.recover(connection) is False
+    assert connection.driver.alive
+    assert supervisor.cold == 2
+    supervisor.close()
+
+
+def test_without_standby_nothing_is_started_ahead():
+    launch = Launcher()
+    supervisor = Supervisor(launch, standby=False)
+    supervisor.prepare(["--headless"])
+    assert launch.launched == []
+    assert supervisor.recover(Connection(Driver())) is False
+    assert len(launch.launched) == 1
@@ -0,0 +1,173 @@
+import os
+
+import pytest
+
+from src.connector import MyConnector
+from src.formfill import OPEN_IN_TAB
+from src.metrics import METRICS
+from src.ratelimit import RateLimiter
+from tests.fakedom import call, needs_node, run_node
+
+LINK = "http://portal.test/rp_web/erweitertesuche.xhtml"
+CHARGE = "http://portal.test/rp_web/chargeinfo.xhtml"
+
+
+class Element:
+    def __init__(self, children=(), on_click=None, kind=None) -> None:
+        self.children = list(children)
+        self.on_click = on_click
+        self.kind = kind
+
+    def find_elements(self, by, value):
+        return self.children
+
+    def click(self):
+        self.on_click()
+
+
+class SwitchTo:
+    def __init__(self, driver) -> None:
+        self.driver = driver
+
+    def window(self, handle):
+        assert handle in self.driver.windows
+        self.driver.current_window_handle = handle
+
+
+class TabDriver:
+    """Result page with one hit whose links open the charge page in a new tab, like chrome with target _blank."""
+
+    def __init__(self, tabs=True, fail_on=None) -> None:
+        self.windows = {"results": "results.xhtml"}
+        self.current_window_handle = "results"
+        self.switch_to = SwitchTo(self)
+        self.tabs = tabs
+        self.fail_on = fail_on
+        self.download_path = None
+        self.downloaded = []
+        self.backs = 0
+        self.opened = 0
+        links = [Element(kind="pdf"), Element(kind="xml")]
+        row = Element([Element(), Element(), Element(), Element(links)])
+        self.tables = [Element(), Element([Element(), row])]
+
+    def execute(self, driver_command, params=None):
+        return None
+
+    @property
+    def window_handles(self):
+        return list(self.windows)
+
+    @property
+    def current_url(self):
+        page = self.windows[self.current_window_handle]
+        return CHARGE if page == "charge" else page
+
+    def find_elements(self, by, value):
+        return self.tables
+
+    def execute_script(self, script, *args):
+        assert script == OPEN_IN_TAB
+        kind = args[0].kind
+        if kind == self.fail_on:
+            raise RuntimeError("Link reagiert nicht")
+        self.opened += 1
+        if self.tabs:
+            handle = f"tab-{self.opened}"
+            self.windows[handle] = "charge"
+        else:
+            self.windows[self.current_window_handle] = "charge"
+        self.kind = kind
+
+    def execute_async_script(self, script, spec):
+        assert spec["url"] == CHARGE
+        return "ready"
+
+    def execute_cdp_cmd(self, command, params):
+        assert command == "Browser.setDownloadBehavior"
+        self.download_path = params["downloadPath"]
+
+    def find_element(self, by, value):
+        assert self.windows[self.current_window_handle] == "charge"
+        return Element(on_click=self.download)
+
+    def download(self):
+        with open(os.path.join(self.download_path, f"HRB_1.{self.kind}"), mode="w") as file:
+            file.write(self.kind)
+        self.downloaded.append(self.kind)
+
+    def back(self):
+        self.backs += 1
+        self.windows[self.current_window_handle] = "results.xhtml"
+
+    def close(self):
+        del self.windows[self.current_window_handle]
+
+
+class Connector(MyConnector):
+    def __init__(self, driver, tmp_path, limiter) -> None:
+        self.fake_driver = driver
+        (tmp_path / "downloads").mkdir()
+        # an absolute download directory stays as it is
+        super().__init__(LINK, str(tmp_path / "downloads"), limiter=limiter, tabs=True)
+        self.init_wait()
+
+    def start_browser(self):
+        self.driver = self.fake_driver
+        self.count_round_trips()
+
+
+def files(connection):
+    return {slot.suffix: open(slot.wait(1)).read() for slot in connection.take_downloads()}
+
+
+def test_both_documents_come_through_tabs_of_one_result_page(tmp_path):
+    driver = TabDriver()
+    limiter = RateLimiter(budget=100)
+    connection = Connector(driver, tmp_path, limiter)
+    saved = METRICS.counters.get("page_loads_saved", 0)
+    assert connection.save_results(1)
+    assert driver.downloaded == ["xml", "pdf"]
+    assert files(connection) == {".xml": "xml", ".pdf": "pdf"}
+    # the tabs are gone and the result page never had to be loaded again
+    assert driver.window_handles == ["results"]
+    assert driver.current_window_handle == "results"
+    assert driver.backs == 0
+    assert METRICS.counters["page_loads_saved"] == saved + 2
+    assert limiter.counts == {"page": 2, "download": 2}
+
+
+def test_link_ignoring_the_target_goes_back_like_without_tabs(tmp_path):
+    driver = TabDriver(tabs=False)
+    limiter = RateLimiter(budget=100)
+    connection = Connector(driver, tmp_path, limiter)
+    connection.save_results(1)
+    assert driver.downloaded == ["xml", "pdf"]
+    assert driver.backs == 2
+    assert driver.windows == {"results": "results.xhtml"}
+    assert limiter.counts == {"page": 4, "download": 2}
+
+
+def test_failed_document_leaves_the_result_page_focused(tmp_path):
+    driver = TabDriver(fail_on="pdf")
+    connection = Connector(driver, tmp_path, RateLimiter(budget=100))
+    with pytest.raises(Exception, match="PDF konnte nicht gespeichert werden"):
+        connection.save_results(1)
+    assert driver.downloaded == ["xml"]
+    assert driver.window_handles == ["results"]
+    assert driver.current_window_handle == "results"
+
+
+@needs_node
+def test_open_in_tab_sets_the_target_only_for_the_click():
+    script = """
+const form = document.body.appendChild(new Element("form", {target: "_self"}));
+const link = form.appendChild(new Element("a", {href: "chargeinfo.xhtml"}));
+link.form = form;
+const seen = [];
+link.onclick = () => seen.push([link.getAttribute("target"), form.getAttribute("target")]);
+"""
+    script += call(OPEN_IN_TAB, "link") + ";\n"
+    script += 'const targets = {link: link.getAttribute("target"), form: form.getAttribute("target")};\n'
+    script += "console.log(JSON.stringify({seen, ...targets}));"
+    assert run_node(script) == {"seen": [["_blank", "_blank"]], "link": None, "form": "_self"}